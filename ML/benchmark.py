@@ -0,0 +1,201 @@
+"""
+Бенчмарк задержек сервиса рекомендаций на синтетической нагрузке.
+
+Генерирует пользователей и мероприятия заданных масштабов из реальных
+AVAILABLE_SKILLS и TARGET_UNIVERSITIES, прогоняет recommend_events напрямую
+(inprocess) и через FastAPI TestClient (http) и пишет p50/p95/p99, пропускную
+способность и пиковый RSS в JSON, чтобы отслеживать регрессии между коммитами.
+
+Без --warm-cache каждый прогон начинается с пустых кэшей сервиса, а каждый запрос
+не находит в них ни модели, ни каталога, ни готового ответа. У каждого прогона
+свой диапазон user_id, чтобы записи прошлых сценариев не попадали в следующие.
+
+Примеры:
+    python benchmark.py
+    python benchmark.py --events 100 1000 --visited 0 50 --iterations 20 --out bench_output.json
+"""
+import argparse
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import sklearn
+
+import max_hack
+from max_hack import Event, EventAttendance, EventCatalog, UserProfile, recommend_events
+from skills import AVAILABLE_SKILLS
+from universities import TARGET_UNIVERSITIES
+
+LEVELS = [None, "начальный", "средний", "продвинутый", "начальный средний продвинутый"]
+CATEGORIES = ["course", "workshop", "hackathon", "lecture", "meetup"]
+
+
+def generate_events(n_events: int, rng: random.Random) -> list:
+    organizers = list(TARGET_UNIVERSITIES) + ["VK Education", "Яндекс", "Сбер"]
+    locations = ["Онлайн"] + sorted({u["city"] for u in TARGET_UNIVERSITIES.values()}) + list(TARGET_UNIVERSITIES)
+    start = datetime(2025, 9, 1, 9, 0)
+    return [
+        Event(
+            event_id=i,
+            title=f"Мероприятие {i}",
+            organizer=rng.choice(organizers),
+            recommended_skills=rng.sample(AVAILABLE_SKILLS, rng.randint(0, 6)),
+            datetime=start + timedelta(hours=rng.randint(0, 24 * 180)),
+            duration_minutes=rng.choice([60, 90, 120, 180, 240]),
+            location=rng.choice(locations),
+            max_participants=rng.randint(10, 300),
+            category=rng.choice(CATEGORIES),
+            уровень=rng.choice(LEVELS),
+        )
+        for i in range(n_events)
+    ]
+
+
+def generate_user(user_id: int, events: list, n_visited: int, rng: random.Random) -> UserProfile:
+    visited = rng.sample(events, min(n_visited, len(events)))
+    return UserProfile(
+        user_id=user_id,
+        interesting_skills=rng.sample(AVAILABLE_SKILLS, rng.randint(1, 8)),
+        education_place=rng.choice(list(TARGET_UNIVERSITIES) + [None]),
+        visited_events=[
+            EventAttendance(event_id=e.event_id, attended=rng.random() > 0.15, rating=rng.randint(1, 5))
+            for e in visited
+        ],
+    )
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss в килобайтах на Linux и в байтах на macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(latencies: list, wall_seconds: float) -> dict:
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "mean_ms": float(latencies_ms.mean()),
+        "throughput_rps": len(latencies) / wall_seconds if wall_seconds > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def clear_request_caches():
+    """
+    Кэши, из которых мог бы быть отдан повторный запрос: модели пользователей,
+    каталоги и готовые ответы RECOMMENDATIONS_IN_FLIGHT.
+    """
+    max_hack.MODEL_CACHE.clear()
+    max_hack.CATALOG_CACHE.clear()
+    if max_hack.RECOMMENDATIONS_IN_FLIGHT.results is not None:
+        max_hack.RECOMMENDATIONS_IN_FLIGHT.results.clear()
+
+
+def reset_caches():
+    clear_request_caches()
+    max_hack.STATS_STORE.clear()
+
+
+def run_inprocess(users: list, events: list, n_recommendations: int, warm_cache: bool) -> dict:
+    latencies = []
+    wall_start = time.perf_counter()
+    for user in users:
+        if not warm_cache:
+            clear_request_caches()
+        start = time.perf_counter()
+        recommend_events(user, EventCatalog(events), {}, n_recommendations)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, time.perf_counter() - wall_start)
+
+
+def run_http(client, users: list, events: list, n_recommendations: int, warm_cache: bool) -> dict:
+    events_payload = [json.loads(e.model_dump_json()) for e in events]
+    latencies = []
+    wall_start = time.perf_counter()
+    for user in users:
+        if not warm_cache:
+            clear_request_caches()
+        body = {
+            "user_profile": json.loads(user.model_dump_json()),
+            "events": events_payload,
+            "n_recommendations": n_recommendations,
+        }
+        start = time.perf_counter()
+        response = client.post("/recommend-events", json=body)
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+    return summarize(latencies, time.perf_counter() - wall_start)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency benchmark for the recommendation service")
+    parser.add_argument("--events", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--visited", type=int, nargs="+", default=[0, 10, 100, 500])
+    parser.add_argument("--modes", nargs="+", choices=["inprocess", "http"], default=["inprocess", "http"])
+    parser.add_argument("--iterations", type=int, default=30, help="requests (distinct users) per scenario")
+    parser.add_argument("--n-recommendations", type=int, default=10)
+    parser.add_argument("--warm-cache", action="store_true", help="keep the service caches between requests and runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_output.json")
+    args = parser.parse_args()
+
+    client = None
+    if "http" in args.modes:
+        from fastapi.testclient import TestClient
+        client = TestClient(max_hack.app)
+
+    results = []
+    next_user_id = 0
+    for n_events in args.events:
+        rng = random.Random(args.seed)
+        events = generate_events(n_events, rng)
+        for n_visited in args.visited:
+            if n_visited > n_events:
+                continue
+            users = [generate_user(i, events, n_visited, rng) for i in range(args.iterations)]
+            for mode in args.modes:
+                run_users = [user.model_copy(update={"user_id": next_user_id + i}) for i, user in enumerate(users)]
+                next_user_id += len(run_users)
+                if not args.warm_cache:
+                    reset_caches()
+                if mode == "inprocess":
+                    stats = run_inprocess(run_users, events, args.n_recommendations, args.warm_cache)
+                else:
+                    stats = run_http(client, run_users, events, args.n_recommendations, args.warm_cache)
+                result = {"mode": mode, "n_events": n_events, "n_visited": n_visited, "iterations": args.iterations, **stats}
+                results.append(result)
+                print(f"{mode:>9} events={n_events:>6} visited={n_visited:>4}  "
+                      f"p50={stats['p50_ms']:8.2f} ms  p95={stats['p95_ms']:8.2f} ms  p99={stats['p99_ms']:8.2f} ms  "
+                      f"rps={stats['throughput_rps']:8.1f}  rss={stats['peak_rss_mb']:.0f} MB")
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "warm_cache": args.warm_cache,
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
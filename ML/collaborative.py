@@ -0,0 +1,178 @@
+"""
+Коллаборативная фильтрация по матрице записей и отзывов пользователей.
+
+Матрица пользователь x мероприятие строится из выгрузки /recommendations/training-data
+(записи на мероприятия и оценки из отзывов) и раскладывается офлайн неявным ALS
+(Hu, Koren, Volinsky): посещение с оценкой 4-5 - положительное предпочтение,
+остальное - отрицательное, а уверенность растёт с оценкой. Факторы пользователей и
+мероприятий сохраняются в артефакт. Новый пользователь получает вектор через
+fold-in: тот же шаг ALS по его истории при зафиксированных факторах мероприятий,
+без переобучения.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Версия формата артефакта. Артефакты другой версии при загрузке игнорируются.
+COLLABORATIVE_VERSION = 1
+DEFAULT_FACTORS = 32
+DEFAULT_ITERATIONS = 15
+DEFAULT_REGULARIZATION = 0.1
+DEFAULT_ALPHA = 10.0
+
+
+def interaction(attended: bool, rating: int) -> tuple:
+    """
+    Предпочтение и вес уверенности одного посещения.
+    """
+    preference = 1.0 if attended and rating >= 4 else 0.0
+    weight = rating / 5.0 if attended else 0.2
+    return preference, weight
+
+
+def interaction_matrices(users: List[dict], event_ids: List[int]):
+    """
+    Разреженные матрицы предпочтений и весов уверенности (одинаковой структуры) по
+    выгрузке пользователей. Посещения мероприятий не из event_ids пропускаются.
+    """
+    # scipy нужен только для обучения, сервис загружает готовые факторы без него.
+    from scipy import sparse
+
+    event_index = {event_id: col for col, event_id in enumerate(event_ids)}
+    user_ids, rows, cols, preferences, weights = [], [], [], [], []
+    for user in users:
+        visits = {}
+        for visit in user.get("visited_events", []):
+            col = event_index.get(visit["event_id"])
+            if col is not None:
+                visits[col] = interaction(visit.get("attended", True), visit["rating"])
+        if not visits:
+            continue
+        row = len(user_ids)
+        user_ids.append(user["user_id"])
+        for col, (preference, weight) in visits.items():
+            rows.append(row)
+            cols.append(col)
+            preferences.append(preference)
+            weights.append(weight)
+
+    shape = (len(user_ids), len(event_ids))
+    preference = sparse.csr_matrix((preferences, (rows, cols)), shape=shape, dtype=np.float64)
+    weight = sparse.csr_matrix((weights, (rows, cols)), shape=shape, dtype=np.float64)
+    return user_ids, preference, weight
+
+
+def _solve_row(fixed: np.ndarray, gram: np.ndarray, cols: np.ndarray, preference: np.ndarray,
+               confidence: np.ndarray) -> np.ndarray:
+    """
+    Один шаг ALS для строки: (Y^T Y + Y_u^T (C_u - I) Y_u + λI) x = Y_u^T C_u p_u.
+    gram уже содержит Y^T Y + λI.
+    """
+    factors = fixed[cols]
+    a = gram + (factors.T * (confidence - 1.0)) @ factors
+    b = factors.T @ (confidence * preference)
+    return np.linalg.solve(a, b)
+
+
+def _als_half_step(preference: "sparse.csr_matrix", weight: "sparse.csr_matrix", fixed: np.ndarray,
+                   regularization: float, alpha: float) -> np.ndarray:
+    gram = fixed.T @ fixed + regularization * np.eye(fixed.shape[1])
+    solved = np.zeros((preference.shape[0], fixed.shape[1]))
+    for row in range(preference.shape[0]):
+        start, end = preference.indptr[row], preference.indptr[row + 1]
+        if start == end:
+            continue
+        solved[row] = _solve_row(
+            fixed, gram, preference.indices[start:end], preference.data[start:end],
+            1.0 + alpha * weight.data[start:end],
+        )
+    return solved
+
+
+class CollaborativeModel:
+    def __init__(self, user_ids: List[int], event_ids: List[int], user_factors: np.ndarray,
+                 event_factors: np.ndarray, regularization: float = DEFAULT_REGULARIZATION,
+                 alpha: float = DEFAULT_ALPHA):
+        self.user_ids = list(user_ids)
+        self.event_ids = list(event_ids)
+        self.user_factors = user_factors
+        self.event_factors = event_factors
+        self.regularization = regularization
+        self.alpha = alpha
+        self.event_index = {event_id: row for row, event_id in enumerate(self.event_ids)}
+        self._gram = event_factors.T @ event_factors + regularization * np.eye(event_factors.shape[1])
+        self.version = None
+        self.trained_at = None
+
+    @classmethod
+    def fit(cls, users: List[dict], event_ids: List[int], factors: int = DEFAULT_FACTORS,
+            iterations: int = DEFAULT_ITERATIONS, regularization: float = DEFAULT_REGULARIZATION,
+            alpha: float = DEFAULT_ALPHA, random_state: int = 42) -> "CollaborativeModel":
+        user_ids, preference, weight = interaction_matrices(users, event_ids)
+        preference_t, weight_t = preference.T.tocsr(), weight.T.tocsr()
+
+        rng = np.random.default_rng(random_state)
+        user_factors = rng.normal(scale=0.01, size=(preference.shape[0], factors))
+        event_factors = rng.normal(scale=0.01, size=(preference.shape[1], factors))
+        for _ in range(iterations):
+            user_factors = _als_half_step(preference, weight, event_factors, regularization, alpha)
+            event_factors = _als_half_step(preference_t, weight_t, user_factors, regularization, alpha)
+        return cls(user_ids, event_ids, user_factors, event_factors, regularization, alpha)
+
+    def fold_in(self, visited_events) -> Optional[np.ndarray]:
+        """
+        Вектор пользователя по его истории (EventAttendance) при фиксированных факторах мероприятий.
+        None, если ни одно посещённое мероприятие не известно модели.
+        """
+        visits = {}
+        for attendance in visited_events:
+            row = self.event_index.get(attendance.event_id)
+            if row is not None:
+                visits[row] = interaction(attendance.attended, attendance.rating)
+        if not visits:
+            return None
+        cols = np.fromiter(visits, dtype=np.int64, count=len(visits))
+        preference = np.array([visits[col][0] for col in cols])
+        confidence = 1.0 + self.alpha * np.array([visits[col][1] for col in cols])
+        return _solve_row(self.event_factors, self._gram, cols, preference, confidence)
+
+    def event_rows(self, event_ids) -> np.ndarray:
+        """
+        Строки event_factors для мероприятий; -1 для мероприятий, появившихся после обучения.
+        """
+        return np.fromiter((self.event_index.get(event_id, -1) for event_id in event_ids), dtype=np.int64)
+
+    def scores(self, user_vector: np.ndarray, event_rows: np.ndarray) -> np.ndarray:
+        """
+        Предсказанное предпочтение: скалярное произведение вектора пользователя и факторов
+        мероприятий-кандидатов. Для неизвестных модели мероприятий - NaN.
+        """
+        known = event_rows >= 0
+        scores = np.full(len(event_rows), np.nan)
+        scores[known] = self.event_factors[event_rows[known]] @ user_vector
+        return scores
+
+    def to_artifact(self) -> Dict:
+        return {
+            "feature_version": COLLABORATIVE_VERSION,
+            "user_ids": np.asarray(self.user_ids, dtype=np.int64),
+            "event_ids": np.asarray(self.event_ids, dtype=np.int64),
+            "user_factors": self.user_factors,
+            "event_factors": self.event_factors,
+            "regularization": self.regularization,
+            "alpha": self.alpha,
+        }
+
+    @classmethod
+    def from_artifact(cls, artifact: Dict) -> "CollaborativeModel":
+        model = cls(
+            user_ids=artifact["user_ids"].tolist(),
+            event_ids=artifact["event_ids"].tolist(),
+            user_factors=artifact["user_factors"],
+            event_factors=artifact["event_factors"],
+            regularization=artifact["regularization"],
+            alpha=artifact["alpha"],
+        )
+        model.version = artifact.get("version")
+        model.trained_at = artifact.get("trained_at")
+        return model
@@ -0,0 +1,164 @@
+"""
+Компиляция обученного RandomForestClassifier в плоские массивы NumPy.
+
+Все деревья леса складываются в общие массивы узлов (признак, порог, левый/правый
+потомок, значение листа), а обход выполняется векторно сразу для всех деревьев и
+всех строк. Результат побитово совпадает с RandomForestClassifier.predict_proba:
+признаки приводятся к float32, как в sklearn, а вероятности деревьев суммируются
+в том же порядке.
+
+Запуск модуля печатает сравнение задержек с sklearn:
+    python forest_compiler.py
+"""
+from typing import Optional
+
+import numpy as np
+
+
+def _leaf_values_are_fractions() -> bool:
+    # До sklearn 1.4 листья хранили счётчики классов и predict_proba нормировал их сам,
+    # начиная с 1.4 в листьях уже лежат доли. sklearn импортируется только здесь:
+    # для инференса скомпилированного леса он не нужен.
+    import sklearn
+    return tuple(int(part) for part in sklearn.__version__.split(".")[:2]) >= (1, 4)
+
+
+class CompiledForest:
+    # Выше этого размера пакета собственный цикл sklearn на C быстрее векторного обхода.
+    MAX_BATCH_ROWS = 256
+
+    # Массивы, из которых лес восстанавливается без пересчёта (см. to_arrays).
+    ARRAYS = ("feature", "threshold", "left", "right", "value", "roots", "children", "is_leaf")
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, children=None, is_leaf=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.children = np.stack([left, right], axis=1) if children is None else children
+        self.is_leaf = left == np.arange(len(left)) if is_leaf is None else is_leaf
+
+    @classmethod
+    def from_sklearn(cls, forest) -> "CompiledForest":
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        leaf_values_are_fractions = _leaf_values_are_fractions()
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(offset, offset + n_nodes)
+            is_leaf = tree.children_left == -1
+
+            # У листьев оба потомка указывают на сам лист, чтобы обход в них останавливался.
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+
+            value = tree.value[:, 0, :].astype(np.float64)
+            if not leaf_values_are_fractions:
+                normalizer = value.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            values.append(value)
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.concatenate(values),
+            roots=np.array(roots, dtype=np.intp),
+            max_depth=max_depth,
+        )
+
+    def to_arrays(self) -> dict:
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, max_depth: int) -> "CompiledForest":
+        """
+        Лес из массивов to_arrays (например, отображённых в память снимка) без копирования.
+        """
+        return cls(max_depth=max_depth, **{name: arrays[name] for name in cls.ARRAYS})
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children, self.value, self.roots, self.is_leaf))
+
+    def apply(self, features: np.ndarray) -> np.ndarray:
+        """
+        Индексы листьев формы (n_trees, n_rows) для каждой строки в каждом дереве.
+        """
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        n_rows, n_features = features.shape
+        flat_features = features.ravel()
+
+        nodes = np.repeat(self.roots, n_rows)
+        row_offsets = np.tile(np.arange(n_rows) * n_features, self.n_trees)
+        # Двигаем вниз только пары (дерево, строка), ещё не дошедшие до листа.
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        while active.size:
+            current = nodes[active]
+            go_right = ~(flat_features[row_offsets[active] + self.feature[current]] <= self.threshold[current])
+            following = self.children[current, go_right.view(np.int8)]
+            nodes[active] = following
+            active = active[~self.is_leaf[following]]
+        return nodes.reshape(self.n_trees, n_rows)
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        leaf_values = self.value[self.apply(features)]
+        probabilities = np.zeros(leaf_values.shape[1:], dtype=np.float64)
+        for tree_values in leaf_values:
+            probabilities += tree_values
+        probabilities /= self.n_trees
+        return probabilities
+
+
+def benchmark(n_samples: int = 200, n_features: Optional[int] = None, batch_sizes=(1, 10, 100, 1000),
+              repeats: int = 50) -> list:
+    """
+    Сравнивает задержку predict_proba sklearn и скомпилированного леса на случайных данных.
+    По умолчанию признаков столько же, сколько у модели рекомендаций (max_hack.N_FEATURES).
+    """
+    import time
+    from sklearn.ensemble import RandomForestClassifier
+
+    if n_features is None:
+        from max_hack import N_FEATURES as n_features
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(n_samples, n_features))
+    y = (X[:, 0] + rng.normal(scale=0.5, size=n_samples) > 0).astype(int)
+    forest = RandomForestClassifier(n_estimators=100, random_state=42).fit(X, y)
+    compiled = CompiledForest.from_sklearn(forest)
+
+    results = []
+    for batch_size in batch_sizes:
+        batch = rng.normal(size=(batch_size, n_features))
+        assert np.array_equal(compiled.predict_proba(batch), forest.predict_proba(batch))
+        timings = {}
+        for name, predict in (("sklearn", forest.predict_proba), ("compiled", compiled.predict_proba)):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                predict(batch)
+            timings[name] = (time.perf_counter() - start) / repeats * 1000
+        results.append({"batch_size": batch_size, "sklearn_ms": timings["sklearn"], "compiled_ms": timings["compiled"]})
+    return results
+
+
+if __name__ == "__main__":
+    for row in benchmark():
+        print(f"batch={row['batch_size']:>5}  sklearn={row['sklearn_ms']:.3f} ms  compiled={row['compiled_ms']:.3f} ms")
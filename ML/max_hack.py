@@ -1,18 +1,185 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Dict
+from typing import List, NamedTuple, Optional, Dict
+import threading
 from datetime import datetime
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager, nullcontext
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
 import numpy as np
-import uvicorn
-from skills import AVAILABLE_SKILLS
+from skills import AVAILABLE_SKILLS, SKILL_INDEX, SKILL_WORDS, is_valid_skill, pack_skill_matrix, popcount, skill_mask, skill_masks, skill_names, unpack_skill_masks
+from skill_taxonomy import skill_affinity, soft_overlap
 from universities import TARGET_UNIVERSITIES
+import metrics
+from collaborative import COLLABORATIVE_VERSION, CollaborativeModel
+import model_store
+from single_flight import SingleFlight
+import snapshot
+from stats_store import StatsStore
+from text_index import TextIndex
+import wire
+from forest_compiler import CompiledForest
 
-app = FastAPI(title="Event Recommendation API", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+# Версия набора признаков create_event_features. Артефакты, обученные
+# на другой версии, при загрузке игнорируются.
+FEATURE_VERSION = 2
+MODEL_DIR = os.environ.get("MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"))
+# Снимки массивов (скомпилированная модель, матрица вузов, каталог), которые
+# процессы подключают через mmap вместо того, чтобы строить их заново (snapshot.py).
+SNAPSHOT_DIR = os.environ.get("RECOMMENDER_SNAPSHOT_DIR", os.path.join(MODEL_DIR, "snapshot"))
+
+# Глобальная модель, обученная офлайн (train_model.py). None - артефакта нет,
+# тогда модель обучается на истории пользователя, как раньше.
+GLOBAL_MODEL: Optional[dict] = None
+
+def load_global_model(model_dir: str = MODEL_DIR, snapshot_dir: str = SNAPSHOT_DIR) -> Optional[dict]:
+    """
+    Загружает последний артефакт. Если для его версии есть снимок скомпилированного
+    леса, берётся он: без распаковки joblib, импорта sklearn и компиляции, а массивы
+    модели общие для всех процессов. Иначе артефакт загружается целиком и снимок
+    записывается для следующих запусков и соседних воркеров.
+    """
+    global GLOBAL_MODEL
+    try:
+        GLOBAL_MODEL = _load_model_snapshot(model_dir, snapshot_dir)
+        if GLOBAL_MODEL is None:
+            GLOBAL_MODEL = model_store.load_latest(model_dir, FEATURE_VERSION)
+            if GLOBAL_MODEL is not None:
+                GLOBAL_MODEL["compiled"] = CompiledForest.from_sklearn(GLOBAL_MODEL["model"])
+                _publish_model_snapshot(GLOBAL_MODEL, snapshot_dir)
+    except Exception as e:
+        logger.warning("Failed to load model artifact from %s: %s", model_dir, e)
+        GLOBAL_MODEL = None
+    if GLOBAL_MODEL is not None:
+        logger.info("Loaded global model version %s", GLOBAL_MODEL["version"])
+    return GLOBAL_MODEL
+
+class FittedScaler:
+    """
+    Среднее и масштаб обученного StandardScaler: всё, что нужно для инференса.
+    """
+    def __init__(self, mean_: np.ndarray, scale_: np.ndarray):
+        self.mean_ = mean_
+        self.scale_ = scale_
+
+_MODEL_SNAPSHOT_META = ("version", "feature_version", "trained_at", "n_samples", "n_users")
+
+def _load_model_snapshot(model_dir: str, snapshot_dir: str) -> Optional[dict]:
+    pointer = model_store.latest_pointer(model_dir)
+    current = snapshot.load_current(snapshot_dir, "model")
+    if pointer is None or current is None:
+        return None
+    _, arrays, meta = current
+    if meta["version"] != pointer["version"] or meta["feature_version"] != FEATURE_VERSION:
+        return None
+    model = {key: meta.get(key) for key in _MODEL_SNAPSHOT_META}
+    model["model"] = None
+    model["scaler"] = FittedScaler(arrays["scaler_mean"], arrays["scaler_scale"])
+    model["compiled"] = CompiledForest.from_arrays(arrays, meta["max_depth"])
+    return model
+
+def _publish_model_snapshot(model: dict, snapshot_dir: str):
+    arrays = model["compiled"].to_arrays()
+    arrays["scaler_mean"] = model["scaler"].mean_
+    arrays["scaler_scale"] = model["scaler"].scale_
+    meta = {key: model.get(key) for key in _MODEL_SNAPSHOT_META}
+    meta["max_depth"] = int(model["compiled"].max_depth)
+    try:
+        with snapshot.locked(snapshot_dir, "model"):
+            snapshot.publish(snapshot_dir, "model", model["version"], arrays, meta)
+    except OSError as e:
+        logger.warning("Failed to write model snapshot to %s: %s", snapshot_dir, e)
+
+# Коллаборативная модель (train_model.py, подкаталог collaborative). Её оценка
+# подмешивается к вероятности с весом COLLABORATIVE_WEIGHT.
+COLLABORATIVE_MODEL: Optional[CollaborativeModel] = None
+COLLABORATIVE_WEIGHT = float(os.environ.get("RECOMMENDER_CF_WEIGHT", "0.3"))
+
+def load_collaborative_model(model_dir: str = os.path.join(MODEL_DIR, "collaborative"),
+                             snapshot_dir: str = SNAPSHOT_DIR) -> Optional[CollaborativeModel]:
+    """
+    Как и load_global_model, сначала пробует снимок факторов той же версии, что и артефакт.
+    """
+    global COLLABORATIVE_MODEL
+    try:
+        artifact = _load_collaborative_snapshot(model_dir, snapshot_dir)
+        if artifact is None:
+            artifact = model_store.load_latest(model_dir, COLLABORATIVE_VERSION)
+            if artifact is not None:
+                _publish_collaborative_snapshot(artifact, snapshot_dir)
+    except Exception as e:
+        logger.warning("Failed to load collaborative model from %s: %s", model_dir, e)
+        artifact = None
+    COLLABORATIVE_MODEL = CollaborativeModel.from_artifact(artifact) if artifact is not None else None
+    if COLLABORATIVE_MODEL is not None:
+        logger.info("Loaded collaborative model version %s", artifact["version"])
+    return COLLABORATIVE_MODEL
+
+_COLLABORATIVE_ARRAYS = ("user_ids", "event_ids", "user_factors", "event_factors")
+
+def _load_collaborative_snapshot(model_dir: str, snapshot_dir: str) -> Optional[dict]:
+    pointer = model_store.latest_pointer(model_dir)
+    current = snapshot.load_current(snapshot_dir, "collaborative")
+    if pointer is None or current is None:
+        return None
+    _, arrays, meta = current
+    if meta["version"] != pointer["version"] or meta["feature_version"] != COLLABORATIVE_VERSION:
+        return None
+    return {**meta, **arrays}
+
+def _publish_collaborative_snapshot(artifact: dict, snapshot_dir: str):
+    arrays = {key: artifact[key] for key in _COLLABORATIVE_ARRAYS}
+    meta = {key: value for key, value in artifact.items() if key not in _COLLABORATIVE_ARRAYS}
+    try:
+        with snapshot.locked(snapshot_dir, "collaborative"):
+            snapshot.publish(snapshot_dir, "collaborative", artifact["version"], arrays, meta)
+    except OSError as e:
+        logger.warning("Failed to write collaborative snapshot to %s: %s", snapshot_dir, e)
+
+def model_version() -> str:
+    """
+    Версия моделей, которыми строятся рекомендации: артефакт глобальной модели
+    (или per-user, если его нет) и коллаборативной, если она подмешивается.
+    """
+    parts = [GLOBAL_MODEL["version"] if GLOBAL_MODEL is not None else "per-user"]
+    if COLLABORATIVE_MODEL is not None and COLLABORATIVE_WEIGHT > 0:
+        parts.append(f"cf-{COLLABORATIVE_MODEL.version}")
+    return "+".join(parts)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    EXECUTOR.start()
+    threading.Thread(target=warm_start, name="warm-start", daemon=True).start()
+    yield
+    EXECUTOR.shutdown()
+
+app = FastAPI(title="Event Recommendation API", version="1.0.0", lifespan=lifespan)
+app.router.route_class = wire.MsgpackRoute
+
+# RECOMMENDER_SERVER_TIMING=1 - добавлять к ответам заголовок Server-Timing с длительностями этапов.
+SERVER_TIMING = os.environ.get("RECOMMENDER_SERVER_TIMING", "0").lower() in ("1", "true", "yes")
+
+@app.middleware("http")
+async def stage_timing_middleware(request: Request, call_next):
+    with metrics.collect() as timings:
+        response = await call_next(request)
+    total = timings.elapsed()
+    route = request.scope.get("route")
+    metrics.observe_request(route.path if route is not None else "unmatched", timings, total)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = timings.server_timing(total)
+    return response
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -45,9 +212,13 @@ class UserProfile(BaseModel):
     education_place: Optional[str] = None
     visited_events: List[EventAttendance] = Field(default_factory=list)
     
+    @validator('interesting_skills', pre=True)
+    def resolve_skill_ids(cls, v):
+        return skill_names(v) if isinstance(v, list) else v
+
     @validator('interesting_skills', each_item=True)
     def validate_skills(cls, v):
-        if v not in AVAILABLE_SKILLS:
+        if not is_valid_skill(v):
             raise ValueError(f"Skill '{v}' is not in the available skills list")
         return v
 
@@ -62,35 +233,617 @@ class Event(BaseModel):
     max_participants: int
     category: str
     уровень: Optional[str] = None
+    description: Optional[str] = None
     
+    @validator('recommended_skills', pre=True)
+    def resolve_skill_ids(cls, v):
+        return skill_names(v) if isinstance(v, list) else v
+
     @validator('recommended_skills', each_item=True)
     def validate_skills(cls, v):
-        if v not in AVAILABLE_SKILLS:
+        if not is_valid_skill(v):
             raise ValueError(f"Skill '{v}' is not in the available skills list")
         return v
 
 class RecommendationRequest(BaseModel):
     user_profile: UserProfile
-    events: List[Event]
+    # Без events используется каталог сервиса (PUT/PATCH /catalog) версии catalog_version.
+    events: Optional[List[Event]] = None
+    catalog_version: Optional[int] = None
+    universities: Optional[Dict[str, List[str]]] = Field(default_factory=dict)
+    n_recommendations: int = Field(default=10, ge=1, le=100)
+    # Бюджет на запрос в миллисекундах от его получения (или заголовок X-Request-Deadline-Ms).
+    deadline_ms: Optional[int] = Field(default=None, ge=1)
+
+class BatchRecommendationRequest(BaseModel):
+    user_profiles: List[UserProfile]
+    events: Optional[List[Event]] = None
+    catalog_version: Optional[int] = None
     universities: Optional[Dict[str, List[str]]] = Field(default_factory=dict)
     n_recommendations: int = Field(default=10, ge=1, le=100)
+    deadline_ms: Optional[int] = Field(default=None, ge=1)
+
+class CatalogReplace(BaseModel):
+    events: List[Event]
+
+class CatalogDelta(BaseModel):
+    base_version: int
+    upsert: List[Event] = Field(default_factory=list)
+    remove: List[int] = Field(default_factory=list)
+
+class Feedback(BaseModel):
+    user_id: int
+    event_id: int
+    attended: bool = True
+    rating: int = Field(4, ge=1, le=5)
+    removed: bool = False
+
+# Число признаков, которые возвращает create_event_features.
+N_FEATURES = 16
+
+def _level_score(level: Optional[str]) -> float:
+    level_score = 0.0
+    if level:
+        level_lower = level.lower()
+        level_score = sum(0.33 for word in ["начальный", "средний"] if word in level_lower) + (0.34 if "продвинутый" in level_lower else 0)
+    return level_score
+
+def _user_locations(user_profile: UserProfile) -> set:
+    """
+    Места, которые считаются "рядом" с пользователем: сам вуз и город вуза.
+    """
+    user_education = user_profile.education_place
+    if not user_education:
+        return set()
+    locations = {user_education}
+    if user_education in TARGET_UNIVERSITIES:
+        city = TARGET_UNIVERSITIES[user_education].get("city")
+        if city is not None:
+            locations.add(city)
+    return locations
+
+class SpecializationMatcher:
+    """
+    Предрассчитанная матрица совпадений "организатор × навык" для признака university_match.
+    Строится один раз для набора данных о вузах и переиспользуется, пока он не изменится.
+    """
+    MAX_CACHED = 16
+    _cache: "OrderedDict[tuple, SpecializationMatcher]" = OrderedDict()
+    # Запросы обслуживаются потоками пула, а get/move_to_end/popitem не атомарны вместе.
+    _cache_lock = threading.Lock()
+
+    def __init__(self, universities: Optional[Dict[str, List[str]]] = None):
+        specs_by_org = {org: data.get("specialization", []) for org, data in TARGET_UNIVERSITIES.items()}
+        for org, specs in (universities or {}).items():
+            if isinstance(specs, dict):
+                specs = specs.get("specialization", [])
+            specs_by_org[org] = specs
+
+        skills_lower = [skill.lower() for skill in AVAILABLE_SKILLS]
+        matrix = np.zeros((len(specs_by_org), len(AVAILABLE_SKILLS)), dtype=bool)
+        for row, specs in enumerate(specs_by_org.values()):
+            for spec in specs or []:
+                spec_lower = spec.lower()
+                matrix[row] |= [spec_lower in skill or skill in spec_lower for skill in skills_lower]
+
+        self.rows = {org: row for row, org in enumerate(specs_by_org)}
+        self.matrix = matrix
+        self.masks = pack_skill_matrix(matrix)
+        self.no_match = np.zeros(SKILL_WORDS, dtype=np.uint64)
+
+    @classmethod
+    def for_universities(cls, universities: Optional[Dict[str, List[str]]]) -> "SpecializationMatcher":
+        key = _universities_key(universities)
+        with cls._cache_lock:
+            matcher = cls._cache.get(key)
+            if matcher is not None:
+                cls._cache.move_to_end(key)
+                return matcher
+        matcher = cls(universities)
+        with cls._cache_lock:
+            matcher = cls._cache.setdefault(key, matcher)
+            cls._cache.move_to_end(key)
+            while len(cls._cache) > cls.MAX_CACHED:
+                cls._cache.popitem(last=False)
+        return matcher
+
+    @classmethod
+    def load_default(cls, snapshot_dir: str) -> "SpecializationMatcher":
+        """
+        Матрица для TARGET_UNIVERSITIES из снимка (или построенная и сохранённая в снимок),
+        чтобы её не строил первый запрос. Снимок привязан к хешу данных о вузах и навыков.
+        """
+        key = hashlib.sha1(json.dumps([TARGET_UNIVERSITIES, AVAILABLE_SKILLS], sort_keys=True).encode("utf-8")).hexdigest()
+        try:
+            current = snapshot.load_current(snapshot_dir, "universities")
+            if current is not None and current[0] == key:
+                _, arrays, meta = current
+                matcher = cls.__new__(cls)
+                matcher.rows = {org: row for row, org in enumerate(meta["organizers"])}
+                matcher.matrix = arrays["matrix"]
+                matcher.masks = arrays["masks"]
+                matcher.no_match = np.zeros(SKILL_WORDS, dtype=np.uint64)
+            else:
+                matcher = cls()
+                with snapshot.locked(snapshot_dir, "universities"):
+                    snapshot.publish(snapshot_dir, "universities", key, {"matrix": matcher.matrix, "masks": matcher.masks},
+                                     {"organizers": list(matcher.rows)})
+        except OSError as e:
+            logger.warning("University snapshot in %s is unavailable: %s", snapshot_dir, e)
+            matcher = cls()
+        with cls._cache_lock:
+            cls._cache[_universities_key(None)] = matcher
+        return matcher
+
+    def organizer_masks(self, organizers: List[str]) -> np.ndarray:
+        """
+        Маски навыков, совпадающих со специализациями каждого организатора (нулевая маска для неизвестных).
+        """
+        masks = np.empty((len(organizers), SKILL_WORDS), dtype=np.uint64)
+        for i, organizer in enumerate(organizers):
+            row = self.rows.get(organizer)
+            masks[i] = self.masks[row] if row is not None else self.no_match
+        return masks
+
+def _universities_key(universities: Optional[Dict[str, List[str]]]) -> tuple:
+    key = []
+    for org, specs in sorted((universities or {}).items()):
+        if isinstance(specs, dict):
+            specs = specs.get("specialization", [])
+        key.append((org, tuple(specs or ())))
+    return tuple(key)
+
+class EventCatalog:
+    """
+    Индекс мероприятий, который строится один раз на запрос: поиск по event_id,
+    предрассчитанные множества навыков и разбор истории пользователя за O(visits).
+    """
+    def __init__(self, events: List[Event]):
+        self.events = list(events)
+        self.skill_sets = [frozenset(e.recommended_skills or []) for e in self.events]
+        self.skill_masks = skill_masks([e.recommended_skills or [] for e in self.events])
+        self.skill_counts = popcount(self.skill_masks)
+
+        organizer_codes = {}
+        self.organizer_codes = np.fromiter(
+            (organizer_codes.setdefault(e.organizer, len(organizer_codes)) for e in self.events),
+            dtype=np.int64, count=len(self.events),
+        )
+        self.organizers = list(organizer_codes)
+        self._university_matches = {}
+        self._collaborative_rows = {}
+        self._inverted_index = None
+
+        location_codes = {}
+        self.location_codes = np.fromiter(
+            (location_codes.setdefault(e.location, len(location_codes)) for e in self.events),
+            dtype=np.int64, count=len(self.events),
+        )
+        self.location_index = location_codes
+        self.is_online = self.location_codes == location_codes.get("Онлайн", -1)
+
+        # Признаки, которые зависят только от мероприятия, считаются один раз на каталог.
+        self.event_features = np.zeros((len(self.events), N_FEATURES), dtype=np.float64)
+        if self.events:
+            weekdays = np.array([e.datetime.weekday() for e in self.events], dtype=np.float64)
+            self.event_features[:, 5] = [e.datetime.hour for e in self.events]
+            self.event_features[:, 6] = weekdays
+            self.event_features[:, 7] = weekdays >= 5
+            self.event_features[:, 9] = self.is_online
+            self.event_features[:, 11] = [e.duration_minutes / 60.0 for e in self.events]
+            self.event_features[:, 12] = [e.max_participants / 100.0 for e in self.events]
+            self.event_features[:, 13] = [_level_score(e.уровень) for e in self.events]
+
+        self.index = {}
+        for row, event in enumerate(self.events):
+            self.index.setdefault(event.event_id, row)
+
+        self.text_index = TextIndex.build((e.title, e.description) for e in self.events)
+
+    # Массивы каталога, которые публикуются в общий снимок (см. CatalogStore).
+    SNAPSHOT_ARRAYS = ("skill_masks", "skill_counts", "organizer_codes", "location_codes", "is_online", "event_features")
+
+    def to_snapshot(self) -> tuple:
+        meta = {
+            "events": [event.model_dump(mode="json") for event in self.events],
+            "organizers": self.organizers,
+            "locations": list(self.location_index),
+            "text_terms": self.text_index.n_terms,
+        }
+        arrays = {name: getattr(self, name) for name in self.SNAPSHOT_ARRAYS}
+        arrays.update(("text_" + name, array) for name, array in self.text_index.to_arrays().items())
+        return arrays, meta
+
+    @classmethod
+    def from_snapshot(cls, arrays: dict, meta: dict) -> "EventCatalog":
+        """
+        Каталог поверх массивов снимка (только чтение, без копирования). Заново
+        разбираются только сами мероприятия.
+        """
+        catalog = cls.__new__(cls)
+        catalog.events = [Event(**event) for event in meta["events"]]
+        catalog.index = {event.event_id: row for row, event in enumerate(catalog.events)}
+        catalog.skill_sets = [frozenset(e.recommended_skills or []) for e in catalog.events]
+        for name in cls.SNAPSHOT_ARRAYS:
+            setattr(catalog, name, arrays[name])
+        catalog.organizers = meta["organizers"]
+        catalog.location_index = {location: code for code, location in enumerate(meta["locations"])}
+        if "text_terms" in meta:
+            catalog.text_index = TextIndex.from_arrays(
+                {name: arrays["text_" + name] for name in TextIndex.ARRAYS}, meta["text_terms"]
+            )
+        else:
+            # Снимок записан до появления текстового индекса.
+            catalog.text_index = TextIndex.build((e.title, e.description) for e in catalog.events)
+        catalog._university_matches = {}
+        catalog._collaborative_rows = {}
+        catalog._inverted_index = None
+        return catalog
+
+    @classmethod
+    def of(cls, events) -> "EventCatalog":
+        if isinstance(events, CatalogRef):
+            return events.resolve()
+        return events if isinstance(events, cls) else cls(events)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def estimated_bytes(self) -> int:
+        """
+        Грубая оценка памяти каталога (для ограничения CATALOG_CACHE): массивы и сами мероприятия.
+        """
+        return (sum(getattr(self, name).nbytes for name in self.SNAPSHOT_ARRAYS) + self.text_index.nbytes
+                + 1024 * len(self.events))
+
+    def get(self, event_id: int) -> Optional[Event]:
+        row = self.index.get(event_id)
+        return self.events[row] if row is not None else None
+
+    @staticmethod
+    def visited_ids(user_profile: UserProfile) -> set:
+        return {att.event_id for att in user_profile.visited_events}
+
+    def visited_rows(self, user_profile: UserProfile) -> List[tuple]:
+        """
+        Пары (посещение, строка каталога) для посещённых мероприятий, которые есть в каталоге.
+        """
+        pairs = []
+        for attendance in user_profile.visited_events:
+            row = self.index.get(attendance.event_id)
+            if row is not None:
+                pairs.append((attendance, row))
+        return pairs
+
+    def university_matches(self, matcher: SpecializationMatcher) -> np.ndarray:
+        """
+        Признак university_match для всех мероприятий каталога: одна выборка строк матрицы и popcount.
+        """
+        matches = self._university_matches.get(matcher)
+        if matches is None:
+            organizer_masks = matcher.organizer_masks(self.organizers)[self.organizer_codes]
+            matches = popcount(organizer_masks & self.skill_masks) > 0
+            self._university_matches[matcher] = matches
+        return matches
+
+    def collaborative_rows(self, model: CollaborativeModel) -> np.ndarray:
+        """
+        Строки факторов коллаборативной модели для мероприятий каталога (-1 - мероприятие ей неизвестно).
+        """
+        rows = self._collaborative_rows.get(model)
+        if rows is None:
+            rows = model.event_rows(e.event_id for e in self.events)
+            self._collaborative_rows[model] = rows
+        return rows
+
+    def near_user(self, user_profile: UserProfile) -> np.ndarray:
+        """
+        Признак same_location для всех мероприятий каталога.
+        """
+        codes = [self.location_index[loc] for loc in _user_locations(user_profile) if loc in self.location_index]
+        return np.isin(self.location_codes, codes)
+
+    def unvisited_rows(self, user_profile: UserProfile) -> List[int]:
+        visited_ids = self.visited_ids(user_profile)
+        return [row for row, event in enumerate(self.events) if event.event_id not in visited_ids]
+
+    def inverted_index(self) -> dict:
+        """
+        Инвертированные индексы навык -> строки, организатор -> строки, место -> строки
+        и строки онлайн-мероприятий. Строятся при первом отборе кандидатов и живут вместе с каталогом.
+        """
+        if self._inverted_index is None:
+            rows, bits = np.nonzero(unpack_skill_masks(self.skill_masks))
+            self._inverted_index = {
+                "skills": _postings(bits, rows, len(AVAILABLE_SKILLS)),
+                "organizers": _postings(self.organizer_codes, np.arange(len(self.events)), len(self.organizers)),
+                "locations": _postings(self.location_codes, np.arange(len(self.events)), len(self.location_index)),
+                "online": np.flatnonzero(self.is_online),
+            }
+        return self._inverted_index
+
+    def candidate_rows(self, user_profile: UserProfile, recall_budget: int, min_candidates: int = 0) -> tuple:
+        """
+        Отбор кандидатов перед скорингом моделью. Из непосещённых мероприятий остаются те,
+        что находятся по индексам: общий навык, организатор из истории, место рядом с
+        пользователем или онлайн. Если их больше recall_budget, остаются recall_budget
+        с наибольшим числом совпадений. recall_budget=0 отключает отбор.
+        Возвращает строки каталога и отчёт: сколько мероприятий отсёк каждый этап.
+        """
+        rows = self.unvisited_rows(user_profile)
+        report = {"catalog": len(self.events), "visited": len(self.events) - len(rows), "retrieval": 0, "budget": 0}
+        if recall_budget <= 0 or len(rows) <= recall_budget:
+            return rows, report
+
+        index = self.inverted_index()
+        hits = np.zeros(len(self.events), dtype=np.int64)
+        for skill in set(user_profile.interesting_skills):
+            hits[_posting(index["skills"], SKILL_INDEX[skill])] += 1
+        organizer_codes = {self.organizer_codes[row] for attendance, row in self.visited_rows(user_profile) if attendance.attended}
+        for code in organizer_codes:
+            hits[_posting(index["organizers"], code)] += 1
+        for location in _user_locations(user_profile):
+            if location in self.location_index:
+                hits[_posting(index["locations"], self.location_index[location])] += 1
+        hits[index["online"]] += 1
+
+        candidates = np.asarray(rows)
+        retrieved = candidates[hits[candidates] > 0]
+        if len(retrieved) >= min_candidates:
+            report["retrieval"] = len(candidates) - len(retrieved)
+            candidates = retrieved
+        if len(candidates) > recall_budget:
+            report["budget"] = len(candidates) - recall_budget
+            candidates = candidates[np.sort(top_k_indices(hits[candidates], recall_budget))]
+        return candidates.tolist(), report
+
+def _postings(codes: np.ndarray, rows: np.ndarray, n_codes: int) -> tuple:
+    """
+    Инвертированный индекс в виде CSR: строки кода c лежат в rows[indptr[c]:indptr[c + 1]].
+    """
+    order = np.argsort(codes, kind="stable")
+    indptr = np.zeros(n_codes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=n_codes), out=indptr[1:])
+    return indptr, rows[order]
+
+def _posting(postings: tuple, code: int) -> np.ndarray:
+    indptr, rows = postings
+    return rows[indptr[code]:indptr[code + 1]]
+
+class CatalogVersionConflict(Exception):
+    def __init__(self, expected: int, current: int):
+        super().__init__(f"Catalog version {expected} does not match current version {current}")
+        self.current = current
+
+class CatalogStore:
+    """
+    Каталог мероприятий, который хранится в сервисе и обновляется дельтами.
+    Запросы рекомендаций ссылаются на него по версии вместо передачи всех мероприятий.
+
+    С shared_dir каталог общий для всех воркеров uvicorn: каждое изменение
+    публикуется снимком (snapshot.py) под межпроцессной блокировкой, а остальные
+    воркеры подключают его массивы через mmap при следующем запросе. Версии в этом
+    режиме сквозные для всех процессов.
+    """
+    def __init__(self, shared_dir: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._events: Dict[int, Event] = {}
+        # Версия и индекс публикуются одним кортежем, чтобы читатели видели согласованную пару.
+        self._snapshot = (0, EventCatalog([]))
+        self.shared_dir = shared_dir
+        self._stamp = None
+
+    @property
+    def version(self) -> int:
+        return self._snapshot[0]
+
+    def snapshot(self, expected_version: Optional[int] = None) -> tuple:
+        if self.shared_dir is not None:
+            self.follow()
+        version, catalog = self._snapshot
+        if expected_version is not None and expected_version != version:
+            raise CatalogVersionConflict(expected_version, version)
+        return version, catalog
+
+    def follow(self):
+        """
+        Подключает снимок, опубликованный другим воркером, если указатель сменился.
+        """
+        stamp = snapshot.pointer_stamp(self.shared_dir, "catalog")
+        if stamp is not None and stamp != self._stamp:
+            with self._lock:
+                self._attach(stamp)
+
+    def replace(self, events: List[Event]) -> int:
+        with self._lock, self._shared_lock():
+            self._events = {event.event_id: event for event in events}
+            return self._publish()
+
+    def apply_delta(self, base_version: int, upsert: List[Event], remove: List[int]) -> int:
+        with self._lock, self._shared_lock():
+            if self.shared_dir is not None:
+                self._attach(snapshot.pointer_stamp(self.shared_dir, "catalog"))
+            if base_version != self.version:
+                raise CatalogVersionConflict(base_version, self.version)
+            for event_id in remove:
+                self._events.pop(event_id, None)
+            for event in upsert:
+                self._events[event.event_id] = event
+            return self._publish()
+
+    def _shared_lock(self):
+        return snapshot.locked(self.shared_dir, "catalog") if self.shared_dir is not None else nullcontext()
+
+    def _attach(self, stamp: Optional[tuple]):
+        current = snapshot.load_current(self.shared_dir, "catalog")
+        if current is not None and current[0] != self.version:
+            version, arrays, meta = current
+            catalog = EventCatalog.from_snapshot(arrays, meta)
+            self._events = {event.event_id: event for event in catalog.events}
+            self._snapshot = (version, catalog)
+        self._stamp = stamp
+
+    def _publish(self) -> int:
+        catalog = EventCatalog(self._events.values())
+        if self.shared_dir is None:
+            version = self.version + 1
+        else:
+            pointer = snapshot.read_pointer(self.shared_dir, "catalog")
+            version = max(self.version, pointer["version"] if pointer else 0) + 1
+            snapshot.publish(self.shared_dir, "catalog", version, *catalog.to_snapshot())
+            self._stamp = snapshot.pointer_stamp(self.shared_dir, "catalog")
+        self._snapshot = (version, catalog)
+        return version
+
+# RECOMMENDER_SHARED_CATALOG=1 - общий каталог для нескольких воркеров uvicorn (снимки в SNAPSHOT_DIR).
+# С пулом процессов (RECOMMENDER_EXECUTOR=process) каталог общий всегда: воркеры пула
+# подключают его снимок сами, а в задачу передаётся только версия (CatalogRef).
+SHARED_CATALOG = os.environ.get("RECOMMENDER_SHARED_CATALOG", "0").lower() in ("1", "true", "yes")
+EXECUTOR_KIND = os.environ.get("RECOMMENDER_EXECUTOR", "thread")
+CATALOG = CatalogStore(shared_dir=SNAPSHOT_DIR if SHARED_CATALOG or EXECUTOR_KIND == "process" else None)
+
+# Суммы по организаторам и навыкам для последних RECOMMENDER_STATS_USERS пользователей.
+STATS_STORE = StatsStore(max_users=int(os.environ.get("RECOMMENDER_STATS_USERS", "100000")))
+
+def catalog_key(events: List[Event]) -> str:
+    """
+    Ключ содержимого списка мероприятий для CATALOG_CACHE: blake2b от полей, записанных
+    в msgpack (однозначная запись, быстрее repr), как в model_cache_key. Встроенный hash
+    не годится: у него есть коллизии (hash(-1) == hash(-2)).
+    """
+    fields = [
+        (e.event_id, e.title, e.organizer, e.recommended_skills, e.datetime, e.duration_minutes,
+         e.location, e.max_participants, e.category, e.уровень, e.description)
+        for e in events
+    ]
+    return hashlib.blake2b(wire.pack(fields), digest_size=16).hexdigest()
+
+def cached_catalog(events: List[Event], key: Optional[str] = None) -> EventCatalog:
+    """
+    Каталог для переданного списка мероприятий. Одинаковые списки (бэкенд шлёт один и тот
+    же каталог для всех пользователей) строятся один раз: признаки мероприятий, маски
+    навыков, совпадения со специализациями вузов и индексы берутся из кэша.
+    """
+    key = key or catalog_key(events)
+    catalog = CATALOG_CACHE.get(key)
+    if catalog is None:
+        catalog = EventCatalog(events)
+        CATALOG_CACHE.put(key, catalog, catalog.estimated_bytes())
+    return catalog
+
+class CatalogRef(NamedTuple):
+    """
+    Каталог в задаче исполнителя вместо самого каталога с его массивами: версия каталога
+    сервиса (воркер пула процессов подключает его снимок) или ключ содержимого с мероприятиями
+    (воркер строит каталог один раз и дальше берёт его из CATALOG_CACHE). Каталог получается
+    уже в воркере, поэтому его построение не занимает event loop.
+    """
+    key: str
+    version: Optional[int] = None
+    events: Optional[List[Event]] = None
+
+    def resolve(self) -> "EventCatalog":
+        if self.events is not None:
+            return cached_catalog(self.events, self.key)
+        # Каталог мог обновиться после проверки версии в запросе: тогда берётся более новый.
+        version, catalog = CATALOG.snapshot()
+        if version < self.version:
+            raise CatalogVersionConflict(self.version, version)
+        return catalog
+
+def resolve_catalog(events: Optional[List[Event]], catalog_version: Optional[int]) -> CatalogRef:
+    """
+    Ссылка на каталог для запроса: переданные мероприятия или каталог сервиса нужной
+    версии (409 при расхождении). Ключ содержимого считается по всем мероприятиям,
+    поэтому эндпоинты вызывают её вне event loop.
+    """
+    if events is not None:
+        return CatalogRef(catalog_key(events), events=events)
+    try:
+        version, _ = CATALOG.snapshot(catalog_version)
+    except CatalogVersionConflict as e:
+        raise HTTPException(status_code=409, detail={"msg": str(e), "catalog_version": e.current})
+    return CatalogRef(f"version:{version}", version=version)
+
+class GaussianNaiveBayes:
+    """
+    Гауссовский наивный байес в замкнутой форме: средние и дисперсии по классам.
+    Используется для очень коротких историй, где лес избыточен.
+    """
+    # На паре примеров дисперсия внутри класса часто нулевая, и вероятности уходят в 0/1.
+    # Поэтому к ней добавляется общая дисперсия признака (плюс единица для константных признаков).
+    VAR_SMOOTHING = 1.0
+
+    def fit(self, features: np.ndarray, labels: np.ndarray):
+        self.classes_ = np.unique(labels)
+        smoothing = self.VAR_SMOOTHING * (features.var(axis=0) + 1.0)
+        self.theta_ = np.array([features[labels == c].mean(axis=0) for c in self.classes_])
+        self.var_ = np.array([features[labels == c].var(axis=0) for c in self.classes_]) + smoothing
+        self.log_prior_ = np.log([np.mean(labels == c) for c in self.classes_])
+        return self
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        features = np.asarray(features, dtype=np.float64)
+        log_likelihood = self.log_prior_ - 0.5 * np.log(2 * np.pi * self.var_).sum(axis=1)
+        log_likelihood = log_likelihood - 0.5 * (((features[:, None, :] - self.theta_) ** 2) / self.var_).sum(axis=2)
+        log_likelihood -= log_likelihood.max(axis=1, keepdims=True)
+        probabilities = np.exp(log_likelihood)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+# Уровни модели по числу размеченных примеров в истории пользователя:
+# меньше NAIVE_BAYES_MAX_SAMPLES - наивный байес, меньше SMALL_FOREST_MAX_SAMPLES - маленький лес,
+# иначе полный лес. Без двух классов в истории остаётся эвристика.
+NAIVE_BAYES_MAX_SAMPLES = 10
+SMALL_FOREST_MAX_SAMPLES = 50
+SMALL_FOREST_PARAMS = {"n_estimators": 20, "max_depth": 6}
+FOREST_PARAMS = {"n_estimators": 100}
+
+def model_tier(n_samples: int) -> str:
+    """
+    Уровень модели для истории из n_samples размеченных примеров.
+    """
+    if n_samples < NAIVE_BAYES_MAX_SAMPLES:
+        return "naive_bayes"
+    if n_samples < SMALL_FOREST_MAX_SAMPLES:
+        return "small_forest"
+    return "forest"
 
 class EventRecommendationModel:
-    def __init__(self, university_specializations: Optional[Dict[str, List[str]]] = None):
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.scaler = StandardScaler()
+    def __init__(self, university_specializations: Optional[Dict[str, List[str]]] = None,
+                 stats_store: Optional[StatsStore] = None):
+        # Модель и нормализация создаются лениво в train: большинству пользователей
+        # с короткой историей RandomForest не нужен.
+        self.model = None
+        self.scaler = None
+        self.compiled = None
+        self.tier = "heuristic"
         self.is_trained = False
         self.organizer_stats = {}
         self.skill_importance = {}
         self.university_specializations = university_specializations or {}
+        self.matcher = SpecializationMatcher.for_universities(self.university_specializations)
+        self.stats_store = STATS_STORE if stats_store is None else stats_store
+
+    @classmethod
+    def from_artifact(cls, artifact: dict, university_specializations: Optional[Dict[str, List[str]]] = None,
+                      stats_store: Optional[StatsStore] = None):
+        """
+        Создаёт модель из заранее обученного артефакта. Такая модель используется только для инференса.
+        """
+        event_model = cls(university_specializations=university_specializations, stats_store=stats_store)
+        event_model.model = artifact["model"]
+        event_model.scaler = artifact["scaler"]
+        event_model.compiled = artifact.get("compiled")
+        event_model.tier = "global"
+        return event_model
         
     def compute_organizer_stats(self, user_profile: UserProfile, events: List[Event]):
+        catalog = EventCatalog.of(events)
         organizer_ratings = defaultdict(list)
         
-        for attendance in user_profile.visited_events:
-            event = next((e for e in events if e.event_id == attendance.event_id), None)
-            if event and attendance.attended:
-                organizer_ratings[event.organizer].append(attendance.rating)
+        for attendance, row in catalog.visited_rows(user_profile):
+            if attendance.attended:
+                organizer_ratings[catalog.events[row].organizer].append(attendance.rating)
         
         for organizer, ratings in organizer_ratings.items():
             self.organizer_stats[organizer] = {
@@ -100,18 +853,36 @@ class EventRecommendationModel:
             }
     
     def compute_skill_importance(self, user_profile: UserProfile, events: List[Event]):
+        catalog = EventCatalog.of(events)
         skill_weights = defaultdict(int)
         
-        for attendance in user_profile.visited_events:
+        for attendance, row in catalog.visited_rows(user_profile):
             if attendance.attended and attendance.rating >= 4:
-                event = next((e for e in events if e.event_id == attendance.event_id), None)
-                if event:
-                    for skill in event.recommended_skills:
-                        skill_weights[skill] += attendance.rating
+                for skill in catalog.events[row].recommended_skills:
+                    skill_weights[skill] += attendance.rating
         
         total_weight = sum(skill_weights.values()) if skill_weights else 1
         self.skill_importance = {skill: weight/total_weight for skill, weight in skill_weights.items()}
     
+    def load_user_stats(self, user_profile: UserProfile, events: List[Event]):
+        """
+        Статистики организаторов и навыков из self.stats_store (те же значения, что дают
+        compute_organizer_stats и compute_skill_importance). Историю с повторяющимися
+        мероприятиями хранилище не ведёт, для неё статистики считаются с нуля.
+        """
+        catalog = EventCatalog.of(events)
+        visited = catalog.visited_rows(user_profile)
+        stats = self.stats_store.user_stats(user_profile.user_id, (
+            (attendance.event_id, attendance.attended, attendance.rating,
+             catalog.events[row].organizer, tuple(catalog.events[row].recommended_skills))
+            for attendance, row in visited
+        ))
+        if stats is None:
+            self.compute_organizer_stats(user_profile, catalog)
+            self.compute_skill_importance(user_profile, catalog)
+            return
+        self.organizer_stats, self.skill_importance = stats
+
     def create_event_features(self, user_profile: UserProfile, event: Event) -> List[float]:
         features = []
         
@@ -149,7 +920,24 @@ class EventRecommendationModel:
         is_online = 1 if event_location == "Онлайн" else 0
         features.append(is_online)
         
-        university_match = 0
+        university_match = self._university_match(organizer, event_skills)
+        features.append(university_match)
+        
+        features.append(event.duration_minutes / 60.0)
+        features.append(event.max_participants / 100.0)
+        
+        level_score = _level_score(event.уровень)
+        features.append(level_score)
+        
+        # Мягкое совпадение навыков по таксономии (skill_taxonomy.py).
+        affinity = skill_affinity(user_profile.interesting_skills)
+        soft = sum(affinity[SKILL_INDEX[skill]] for skill in event_skills)
+        features.append(soft)
+        features.append(soft / len(event_skills) if event_skills else 1.0)
+        
+        return features
+
+    def _organizer_specializations(self, organizer: str) -> Optional[List[str]]:
         org_specializations = None
         if organizer in self.university_specializations:
             org_specializations = self.university_specializations[organizer]
@@ -157,42 +945,68 @@ class EventRecommendationModel:
                 org_specializations = org_specializations.get("specialization", [])
         elif organizer in TARGET_UNIVERSITIES:
             org_specializations = TARGET_UNIVERSITIES[organizer].get("specialization", [])
-        
+        return org_specializations
+
+    def _university_match(self, organizer: str, event_skills) -> int:
+        org_specializations = self._organizer_specializations(organizer)
         if org_specializations:
             event_skills_lower = [s.lower() for s in event_skills]
             for spec in org_specializations:
                 if any(spec.lower() in skill or skill in spec.lower() for skill in event_skills_lower):
-                    university_match = 1
-                    break
-        features.append(university_match)
-        
-        features.append(event.duration_minutes / 60.0)
-        features.append(event.max_participants / 100.0)
-        
-        level_score = 0.0
-        if event.уровень:
-            level_lower = event.уровень.lower()
-            level_score = sum(0.33 for word in ["начальный", "средний"] if word in level_lower) + (0.34 if "продвинутый" in level_lower else 0)
-        features.append(level_score)
-        
+                    return 1
+        return 0
+
+    def create_event_features_batch(self, user_profile: UserProfile, events: List[Event], rows: Optional[List[int]] = None) -> np.ndarray:
+        """
+        Векторизованный аналог create_event_features: матрица признаков (n_events, N_FEATURES)
+        для всего набора мероприятий за один проход. rows - подмножество строк каталога.
+        """
+        catalog = EventCatalog.of(events)
+        if rows is None:
+            rows = slice(None)
+        features = catalog.event_features[rows].copy()
+        n = len(features)
+        if n == 0:
+            return features
+
+        masks, n_event_skills = catalog.skill_masks[rows], catalog.skill_counts[rows]
+        user_mask = skill_mask(user_profile.interesting_skills)
+        n_intersection = popcount(masks & user_mask)
+        n_union = popcount(masks | user_mask)
+
+        features[:, 0] = n_intersection
+        features[:, 1] = np.divide(n_intersection, n_union, out=np.ones(n), where=n_union > 0)
+        features[:, 2] = np.divide(n_intersection, n_event_skills, out=np.ones(n), where=n_event_skills > 0)
+
+        organizer_codes = catalog.organizer_codes[rows]
+        organizer_stats = [self.organizer_stats.get(o, {}) for o in catalog.organizers]
+        features[:, 3] = np.array([stats.get('avg_rating', 3.0) for stats in organizer_stats])[organizer_codes]
+        features[:, 4] = np.array([stats.get('success_rate', 0.5) for stats in organizer_stats])[organizer_codes]
+
+        features[:, 8] = catalog.near_user(user_profile)[rows]
+        features[:, 10] = catalog.university_matches(self.matcher)[rows]
+
+        soft = soft_overlap(masks, skill_affinity(user_profile.interesting_skills))
+        features[:, 14] = soft
+        features[:, 15] = np.divide(soft, n_event_skills, out=np.ones(n), where=n_event_skills > 0)
+
         return features
     
     def collect_training_data(self, user_profile: UserProfile, events: List[Event]):
-        features = []
-        labels = []
+        catalog = EventCatalog.of(events)
         
-        self.compute_organizer_stats(user_profile, events)
-        self.compute_skill_importance(user_profile, events)
+        with metrics.stage("organizer_stats"):
+            self.load_user_stats(user_profile, catalog)
         
-        for attendance in user_profile.visited_events:
-            event = next((e for e in events if e.event_id == attendance.event_id), None)
-            if event:
-                event_features = self.create_event_features(user_profile, event)
-                features.append(event_features)
-                label = 1 if attendance.attended and attendance.rating >= 4 else 0
-                labels.append(label)
+        visited = catalog.visited_rows(user_profile)
+        if not visited:
+            return np.array([]), np.array([])
         
-        return np.array(features), np.array(labels)
+        rows = [row for _, row in visited]
+        labels = [1 if attendance.attended and attendance.rating >= 4 else 0 for attendance, _ in visited]
+        with metrics.stage("features"):
+            features = self.create_event_features_batch(user_profile, catalog, rows)
+        return features, np.array(labels)
     
     def train(self, user_profile: UserProfile, events: List[Event]):
         """
@@ -221,28 +1035,109 @@ class EventRecommendationModel:
             self.is_trained = False
             return False
         
-        features_scaled = self.scaler.fit_transform(features)
-        self.model.fit(features_scaled, labels)
+        self.tier = model_tier(len(labels))
+        start = time.perf_counter()
+        with metrics.stage("fit"):
+            if self.tier == "naive_bayes":
+                self.scaler = None
+                self.compiled = None
+                self.model = GaussianNaiveBayes().fit(features, labels)
+            else:
+                params = SMALL_FOREST_PARAMS if self.tier == "small_forest" else FOREST_PARAMS
+                from sklearn.ensemble import RandomForestClassifier
+                from sklearn.preprocessing import StandardScaler
+                self.scaler = StandardScaler()
+                self.model = RandomForestClassifier(random_state=42, **params)
+                self.model.fit(self.scaler.fit_transform(features), labels)
+                self.compiled = CompiledForest.from_sklearn(self.model)
+        metrics.count_fit(self.tier, time.perf_counter() - start)
         self.is_trained = True
         
         return True
     
+    def prepare_inference(self, user_profile: UserProfile, events: List[Event]) -> bool:
+        """
+        Готовит предобученную модель к инференсу: считает статистики пользователя без обучения.
+        Для пользователей без истории (холодный старт) остаётся эвристика.
+        """
+        if not user_profile.visited_events:
+            self.is_trained = False
+            return False
+
+        with metrics.stage("organizer_stats"):
+            self.load_user_stats(user_profile, events)
+        self.is_trained = True
+        return True
+
+    def estimated_bytes(self) -> int:
+        """
+        Грубая оценка памяти, которую занимает модель (для ограничения кэша).
+        """
+        size = 4096 + 256 * (len(self.organizer_stats) + len(self.skill_importance))
+        for tree in getattr(self.model, "estimators_", ()):
+            size += tree.tree_.node_count * 64 + tree.tree_.value.nbytes
+        if self.compiled is not None:
+            size += self.compiled.nbytes
+        return size
+
+    def _scale(self, features) -> np.ndarray:
+        features = np.asarray(features, dtype=np.float64)
+        if self.scaler is None:
+            return features
+        # То же, что StandardScaler.transform, без накладных расходов на валидацию.
+        return (features - self.scaler.mean_) / self.scaler.scale_
+
+    def _positive_probability(self, features_scaled: np.ndarray) -> np.ndarray:
+        # Глобальная модель из снимка хранит только скомпилированный лес.
+        if self.compiled is not None and (self.model is None or len(features_scaled) <= CompiledForest.MAX_BATCH_ROWS):
+            return self.compiled.predict_proba(features_scaled)[:, 1]
+        return self.model.predict_proba(features_scaled)[:, 1]
+
     def predict_probability(self, user_profile: UserProfile, event: Event) -> float:
         """
         Предсказывает вероятность того, что пользователю понравится мероприятие.
         
-        Если модель обучена (достаточно данных) - использует RandomForest.
+        Если модель обучена (достаточно данных) - использует модель уровня self.tier.
         Если модель не обучена (мало данных) - использует эвристический подход.
         """
         if not self.is_trained:
             return self._heuristic_prediction(user_profile, event)
             
         features = self.create_event_features(user_profile, event)
-        features_scaled = self.scaler.transform([features])
-        probability = self.model.predict_proba(features_scaled)[0][1]
+        features_scaled = self._scale([features])
+        probability = self._positive_probability(features_scaled)[0]
         
         return float(probability)
     
+    def predict_probabilities(self, user_profile: UserProfile, events: List[Event], rows: Optional[List[int]] = None) -> np.ndarray:
+        """
+        Векторизованный аналог predict_probability: один transform и один predict_proba на весь набор.
+        """
+        catalog = EventCatalog.of(events)
+        if not self.is_trained:
+            with metrics.stage("predict"):
+                return self._heuristic_prediction_batch(user_profile, catalog, rows)
+        if len(catalog) == 0 or (rows is not None and len(rows) == 0):
+            return np.empty(0)
+
+        with metrics.stage("features"):
+            features = self.create_event_features_batch(user_profile, catalog, rows)
+        with metrics.stage("predict"):
+            features_scaled = self._scale(features)
+            return self._positive_probability(features_scaled)
+
+    def _heuristic_prediction_batch(self, user_profile: UserProfile, events: List[Event], rows: Optional[List[int]] = None) -> np.ndarray:
+        catalog = EventCatalog.of(events)
+        if rows is None:
+            rows = slice(None)
+        has_common = popcount(catalog.skill_masks[rows] & skill_mask(user_profile.interesting_skills)) > 0
+
+        probs = np.full(len(has_common), 0.5)
+        probs = np.where(has_common, probs + 0.2, probs)
+        probs = np.where(catalog.is_online[rows], probs + 0.1, probs)
+        probs = np.where(catalog.near_user(user_profile)[rows], probs + 0.15, probs)
+        return np.clip(probs, 0.0, 1.0)
+
     def _heuristic_prediction(self, user_profile: UserProfile, event: Event) -> float:
         """
         Эвристическое предсказание для случаев с малым количеством данных.
@@ -269,46 +1164,673 @@ class EventRecommendationModel:
             
         return max(0.0, min(base_prob, 1.0))
 
-def recommend_events(user_profile: UserProfile, events: List[Event], universities: Dict[str, List[str]], n_recommendations: int = 10):
-    event_model = EventRecommendationModel(university_specializations=universities)
-    event_model.train(user_profile, events)
+class ModelCache:
+    """
+    LRU-кэш обученных моделей пользователей с ограничением по числу записей,
+    оценке занимаемой памяти и TTL. Повторный запрос с той же историей не переобучает модель.
+    Тот же класс кэширует каталоги, присланные в запросах (CATALOG_CACHE).
+    """
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.clock() - entry[2] > self.ttl_seconds:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, value, size: int):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, self.clock())
+            self.total_bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+MODEL_CACHE = ModelCache(
+    max_entries=int(os.environ.get("MODEL_CACHE_SIZE", "1024")),
+    max_bytes=int(os.environ.get("MODEL_CACHE_MB", "256")) * 1024 * 1024,
+    ttl_seconds=float(os.environ.get("MODEL_CACHE_TTL", "600")),
+)
+
+CATALOG_CACHE = ModelCache(
+    max_entries=int(os.environ.get("CATALOG_CACHE_SIZE", "16")),
+    max_bytes=int(os.environ.get("CATALOG_CACHE_MB", "128")) * 1024 * 1024,
+    ttl_seconds=float(os.environ.get("CATALOG_CACHE_TTL", "3600")),
+)
+
+def model_cache_key(user_profile: UserProfile, catalog: EventCatalog, universities: Dict[str, List[str]]) -> str:
+    """
+    Отпечаток всего, от чего зависит обучение: пользователь, его история и навыки,
+    содержимое посещённых мероприятий и данные о вузах.
+    """
+    visited_events = []
+    for _, row in catalog.visited_rows(user_profile):
+        event = catalog.events[row]
+        visited_events.append((
+            event.event_id, event.organizer, tuple(event.recommended_skills), event.datetime.isoformat(),
+            event.duration_minutes, event.location, event.max_participants, event.уровень,
+        ))
+    return profile_key(user_profile, universities, tuple(visited_events))
+
+def profile_key(user_profile: UserProfile, universities: Dict[str, List[str]], visited_events: tuple = ()) -> str:
+    """
+    Отпечаток пользователя, его истории и данных о вузах. Без содержимого посещённых
+    мероприятий он годится там, где каталог и так входит в ключ (RECOMMENDATIONS_IN_FLIGHT).
+    """
+    visited = tuple(
+        (attendance.event_id, attendance.attended, attendance.rating)
+        for attendance in user_profile.visited_events
+    )
+    key = (
+        user_profile.user_id,
+        visited,
+        tuple(sorted(set(user_profile.interesting_skills))),
+        user_profile.education_place,
+        visited_events,
+        _universities_key(universities),
+    )
+    return hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).hexdigest()
+
+# Пути построения рекомендаций от самого точного к самому быстрому:
+# full - глобальная модель или обучение модели пользователя, cached - только уже
+# обученная модель из MODEL_CACHE, heuristic - векторная эвристика без модели.
+PATHS = ("full", "cached", "heuristic")
+# Этапы, из которых складывается время каждого пути (оценки в metrics.RECENT_STAGES).
+# К пути full добавляется обучение модели того уровня, который ожидается (см. plan_path).
+PATH_STAGES = {
+    "heuristic": ("queue", "retrieval", "predict", "text", "select", "serialize"),
+    "cached": ("queue", "organizer_stats", "model_cache", "retrieval", "features", "predict", "collaborative", "text", "select", "serialize"),
+}
+PATH_STAGES["full"] = PATH_STAGES["cached"]
+
+def expected_fit(user_profiles: List[UserProfile]) -> Optional[str]:
+    """
+    Уровень модели, которую обучит путь full, по самой длинной истории; None с глобальной
+    моделью (она не обучается в запросе). Число посещений - оценка сверху числа примеров.
+    """
+    if GLOBAL_MODEL is not None or not user_profiles:
+        return None
+    return model_tier(max(len(profile.visited_events) for profile in user_profiles))
+
+def plan_path(deadline: Optional[float], fit_tier: Optional[str] = None) -> str:
+    """
+    Самый точный путь, который по недавним длительностям этапов успевает к сроку
+    deadline (time.perf_counter). Без срока - full. fit_tier - уровень модели, которую
+    обучит путь full (expected_fit), его обучение прибавляется к оценке full.
+    """
+    if deadline is None:
+        return "full"
+    remaining = deadline - time.perf_counter()
+    full_stages = PATH_STAGES["full"] + ((metrics.fit_stage(fit_tier),) if fit_tier is not None else ())
+    if metrics.RECENT_STAGES.estimate(full_stages) <= remaining:
+        return "full"
+    if metrics.RECENT_STAGES.estimate(PATH_STAGES["cached"]) <= remaining:
+        return "cached"
+    return "heuristic"
+
+def select_model(user_profile: UserProfile, catalog: EventCatalog, universities: Dict[str, List[str]], path: str,
+                 model_cache: Optional[ModelCache] = None, stats_store: Optional[StatsStore] = None) -> tuple:
+    """
+    Модель для пути path и путь, который фактически выполнился: модель из кэша
+    отмечается как cached, промах кэша на пути cached - как heuristic.
+    model_cache и stats_store по умолчанию - MODEL_CACHE и STATS_STORE.
+    """
+    model_cache = MODEL_CACHE if model_cache is None else model_cache
+    if path != "heuristic":
+        if GLOBAL_MODEL is not None:
+            event_model = EventRecommendationModel.from_artifact(
+                GLOBAL_MODEL, university_specializations=universities, stats_store=stats_store
+            )
+            event_model.prepare_inference(user_profile, catalog)
+            return event_model, "full"
+        with metrics.stage("model_cache"):
+            key = model_cache_key(user_profile, catalog, universities)
+            event_model = model_cache.get(key)
+        if event_model is not None:
+            return event_model, "cached"
+        if path == "full":
+            event_model = EventRecommendationModel(university_specializations=universities, stats_store=stats_store)
+            event_model.train(user_profile, catalog)
+            model_cache.put(key, event_model, event_model.estimated_bytes())
+            return event_model, "full"
+    return EventRecommendationModel(university_specializations=universities, stats_store=stats_store), "heuristic"
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Индексы k наибольших значений по убыванию за O(n) через argpartition.
+    При равных значениях порядок исходный, как у стабильной сортировки.
+    """
+    n = len(scores)
+    if k >= n:
+        return np.argsort(-scores, kind="stable")
+
+    threshold = scores[np.argpartition(scores, n - k)[n - k]]
+    above = np.flatnonzero(scores > threshold)
+    at_threshold = np.flatnonzero(scores == threshold)[:k - len(above)]
+    selected = np.concatenate([above, at_threshold])
+    return selected[np.argsort(-scores[selected], kind="stable")]
+
+def blend_collaborative(model: CollaborativeModel, user_profile: UserProfile, catalog: EventCatalog,
+                        rows: List[int], probabilities: np.ndarray, weight: float = None) -> np.ndarray:
+    """
+    Подмешивает к вероятностям оценку коллаборативной модели. Вектор пользователя
+    строится fold-in по его истории, поэтому новые пользователи и новые посещения
+    учитываются без переобучения. Мероприятия, неизвестные модели, и пользователи
+    без известных ей посещений остаются с исходной вероятностью.
+    """
+    weight = COLLABORATIVE_WEIGHT if weight is None else weight
+    user_vector = model.fold_in(user_profile.visited_events)
+    if user_vector is None or len(rows) == 0:
+        return probabilities
+    scores = model.scores(user_vector, catalog.collaborative_rows(model)[rows])
+    known = ~np.isnan(scores)
+    blended = probabilities.copy()
+    blended[known] = (1 - weight) * probabilities[known] + weight * np.clip(scores[known], 0.0, 1.0)
+    return blended
+
+# Вес текстовой близости (TF-IDF по названию и описанию) к понравившимся пользователю мероприятиям.
+TEXT_WEIGHT = float(os.environ.get("RECOMMENDER_TEXT_WEIGHT", "0.2"))
+
+def blend_text(user_profile: UserProfile, catalog: EventCatalog, rows: List[int], probabilities: np.ndarray,
+               weight: float = None) -> np.ndarray:
+    """
+    Подмешивает к вероятностям косинусную близость текста кандидатов к профилю
+    пользователя из понравившихся ему мероприятий (посещено, оценка 4-5). Пользователи
+    без таких мероприятий с текстом остаются с исходными вероятностями.
+    """
+    weight = TEXT_WEIGHT if weight is None else weight
+    liked = [(row, attendance.rating / 5.0) for attendance, row in catalog.visited_rows(user_profile)
+             if attendance.attended and attendance.rating >= 4]
+    if not liked or len(rows) == 0:
+        return probabilities
+    liked_rows, ratings = zip(*liked)
+    profile = catalog.text_index.profile(np.array(liked_rows), np.array(ratings))
+    if profile is None:
+        return probabilities
+    return (1 - weight) * probabilities + weight * catalog.text_index.scores(profile, rows)
+
+# Сколько кандидатов после отбора по индексам доходит до скоринга моделью (0 - без отбора).
+RECALL_BUDGET = int(os.environ.get("RECOMMENDER_RECALL_BUDGET", "500"))
+
+def recommend_events(user_profile: UserProfile, events: List[Event], universities: Dict[str, List[str]], n_recommendations: int = 10, compact: bool = False, recall_budget: Optional[int] = None):
+    """
+    Рекомендации одному пользователю: список мероприятий с interest_probability
+    или, при compact=True, пары (event_id, interest_probability).
+    """
+    return recommend_events_with_path(user_profile, events, universities, n_recommendations, compact, recall_budget)[0]
+
+def recommend_events_with_path(user_profile: UserProfile, events: List[Event], universities: Dict[str, List[str]], n_recommendations: int = 10, compact: bool = False, recall_budget: Optional[int] = None,
+                               path: str = "full", deadline: Optional[float] = None,
+                               model_cache: Optional[ModelCache] = None, stats_store: Optional[StatsStore] = None) -> tuple:
+    """
+    Как recommend_events, но возвращает ещё и выполненный путь: (рекомендации, путь).
+    path - самый точный допустимый путь (см. PATHS), deadline - срок запроса
+    (time.perf_counter, на Linux общий для процессов пула). Путь также записывается в metrics.
+    model_cache и stats_store заменяют MODEL_CACHE и STATS_STORE (прогрев).
+    """
+    with metrics.stage("catalog"):
+        catalog = EventCatalog.of(events)
+    if path == "full" and deadline is not None and time.perf_counter() >= deadline:
+        # Срок истёк ещё в очереди: не обучаем, берём модель из кэша или эвристику.
+        path = "cached"
+    event_model, path = select_model(user_profile, catalog, universities, path, model_cache, stats_store)
+    metrics.count_tier(event_model.tier if event_model.is_trained else "heuristic")
+    metrics.count_path(path)
     
-    scored_events = []
-    for event in events:
-        if any(att.event_id == event.event_id for att in user_profile.visited_events):
-            continue
-            
-        probability = event_model.predict_probability(user_profile, event)
-        scored_events.append((probability, event))
+    with metrics.stage("retrieval"):
+        budget = RECALL_BUDGET if recall_budget is None else recall_budget
+        rows, report = catalog.candidate_rows(user_profile, max(budget, n_recommendations) if budget else 0, n_recommendations)
+    metrics.count_candidates(report, len(rows))
+    probabilities = event_model.predict_probabilities(user_profile, catalog, rows)
+    if COLLABORATIVE_MODEL is not None and COLLABORATIVE_WEIGHT > 0 and path != "heuristic":
+        with metrics.stage("collaborative"):
+            probabilities = blend_collaborative(COLLABORATIVE_MODEL, user_profile, catalog, rows, probabilities)
+    if TEXT_WEIGHT > 0:
+        with metrics.stage("text"):
+            probabilities = blend_text(user_profile, catalog, rows, probabilities)
     
-    scored_events.sort(key=lambda x: x[0], reverse=True)
+    with metrics.stage("select"):
+        top = top_k_indices(probabilities, n_recommendations)
     
+    if compact:
+        return [(catalog.events[rows[i]].event_id, float(probabilities[i])) for i in top], path
+
     result = []
-    for prob, event in scored_events[:n_recommendations]:
-        event_dict = event.dict()
-        event_dict["interest_probability"] = float(prob)
-        result.append(event_dict)
+    with metrics.stage("serialize"):
+        for i in top:
+            event_dict = catalog.events[rows[i]].dict()
+            event_dict["interest_probability"] = float(probabilities[i])
+            result.append(event_dict)
     
-    return result
+    return result, path
 
-@app.post("/recommend-events")
-async def get_event_recommendations(request: RecommendationRequest):
+def recommend_events_batch(user_profiles: List[UserProfile], events: List[Event], universities: Dict[str, List[str]], n_recommendations: int = 10, compact: bool = False,
+                           path: str = "full", deadline: Optional[float] = None):
+    """
+    Рекомендации для нескольких пользователей по общему списку мероприятий.
+    Каталог и признаки мероприятий строятся один раз на весь пакет. Пользователи,
+    до которых очередь дошла после срока, получают модель из кэша или эвристику.
+    Возвращает (user_id, рекомендации, путь, ошибка): ошибка одного пользователя
+    не роняет пакет, он получает пустой список, путь None и текст ошибки.
+    """
+    with metrics.stage("catalog"):
+        catalog = EventCatalog.of(events)
+    results = []
+    for user_profile in user_profiles:
+        try:
+            recommendations, user_path = recommend_events_with_path(
+                user_profile, catalog, universities, n_recommendations, compact, path=path, deadline=deadline
+            )
+        except Exception as e:
+            logger.exception("Batch recommendations failed for user %s", user_profile.user_id)
+            results.append((user_profile.user_id, [], None, str(e)))
+        else:
+            results.append((user_profile.user_id, recommendations, user_path, None))
+    return results
+
+def warm_up():
+    """
+    Прогоняет обучение и инференс на крошечном наборе, чтобы импорты и ленивая
+    инициализация sklearn/numpy случились до первого настоящего запроса. Кэш моделей
+    и статистики - одноразовые: выдуманный пользователь не попадает в MODEL_CACHE,
+    STATS_STORE и /stats.
+    """
+    events = [
+        Event(event_id=i, title="warm-up", organizer="warm-up", recommended_skills=AVAILABLE_SKILLS[i:i + 2],
+              datetime=datetime(2025, 1, 1, 10 + i), duration_minutes=60, location="Онлайн",
+              max_participants=10, category="warm-up")
+        for i in range(3)
+    ]
+    user_profile = UserProfile(
+        user_id=0,
+        interesting_skills=AVAILABLE_SKILLS[:1],
+        visited_events=[EventAttendance(event_id=0, attended=True, rating=5), EventAttendance(event_id=1, attended=True, rating=1)],
+    )
+    recommend_events_with_path(
+        user_profile, events, {}, 1,
+        model_cache=ModelCache(max_entries=1, max_bytes=1 << 30, ttl_seconds=60), stats_store=StatsStore(max_users=1),
+    )
+    if GLOBAL_MODEL is None:
+        # Без глобальной модели длинные истории обучают лес прямо в запросе.
+        import sklearn.ensemble  # noqa: F401
+
+
+def load_models():
+    load_global_model()
+    load_collaborative_model()
+    SpecializationMatcher.load_default(SNAPSHOT_DIR)
+
+# Выставляется, когда модели загружены и пул прогрет (GET /ready).
+READY = threading.Event()
+WARM_START_SECONDS: Optional[float] = None
+
+def warm_start():
+    """
+    Загрузка моделей и прогрев после старта, в фоновом потоке: сервер сразу принимает
+    соединения, а балансировщик направляет на него трафик, когда /ready ответит 200.
+    """
+    global WARM_START_SECONDS
+    start = time.perf_counter()
     try:
-        recommendations = recommend_events(
+        load_models()
+        if CATALOG.shared_dir is not None:
+            CATALOG.follow()
+        EXECUTOR.warm()
+    except Exception:
+        logger.exception("Warm start failed")
+        return
+    WARM_START_SECONDS = time.perf_counter() - start
+    READY.set()
+    logger.info("Ready in %.2f s", WARM_START_SECONDS)
+
+def _init_worker():
+    load_models()
+    warm_up()
+
+def _noop():
+    return None
+
+class ExecutorSaturated(Exception):
+    pass
+
+class RecommendationExecutor:
+    """
+    Выполняет обучение и скоринг вне event loop: пул потоков или процессов
+    с ограничением на число выполняющихся и ожидающих задач.
+
+    RECOMMENDER_EXECUTOR - thread (по умолчанию) или process;
+    RECOMMENDER_WORKERS - размер пула; RECOMMENDER_QUEUE - сколько задач может ждать в очереди.
+    В режиме process каждый воркер сам загружает глобальную модель и прогревается.
+    Каталог в задачу передаётся ссылкой (CatalogRef) и получается уже в воркере.
+    """
+    def __init__(self, kind: str, workers: int, max_queue: int):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind '{kind}', expected 'thread' or 'process'")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.rejected = 0
+        self._pool = None
+
+    def start(self):
+        if self._pool is not None:
+            return
+        if self.kind == "process":
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="recommender")
+
+    def warm(self):
+        """
+        Дожидается прогрева пула: в режиме thread прогоняет warm_up, в режиме process
+        ждёт инициализации воркеров (_init_worker выполняется до первой задачи).
+        """
+        self.start()
+        if self.kind == "process":
+            for future in [self._pool.submit(_noop) for _ in range(self.workers)]:
+                future.result()
+        else:
+            self._pool.submit(warm_up).result()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, fn, *args):
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise ExecutorSaturated()
+        self.start()
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            result, worker_timings = await asyncio.get_running_loop().run_in_executor(
+                self._pool, metrics.run_collected, fn, *args
+            )
+        finally:
+            self.in_flight -= 1
+        metrics.merge_worker(worker_timings, time.perf_counter() - start)
+        return result
+
+EXECUTOR = RecommendationExecutor(
+    kind=EXECUTOR_KIND,
+    workers=int(os.environ.get("RECOMMENDER_WORKERS", os.cpu_count() or 1)),
+    max_queue=int(os.environ.get("RECOMMENDER_QUEUE", "32")),
+)
+RETRY_AFTER_SECONDS = int(os.environ.get("RECOMMENDER_RETRY_AFTER", "1"))
+
+# Одинаковые одновременные запросы /recommend-events считаются один раз, а готовый
+# ответ ещё RECOMMENDER_RESULT_TTL секунд отдаётся из кэша (0 - без кэша).
+RESULT_CACHE_TTL = float(os.environ.get("RECOMMENDER_RESULT_TTL", "2"))
+RECOMMENDATIONS_IN_FLIGHT = SingleFlight(
+    results=ModelCache(
+        max_entries=int(os.environ.get("RECOMMENDER_RESULT_CACHE_SIZE", "4096")),
+        max_bytes=int(os.environ.get("RECOMMENDER_RESULT_CACHE_MB", "32")) * 1024 * 1024,
+        ttl_seconds=RESULT_CACHE_TTL,
+    ) if RESULT_CACHE_TTL > 0 else None,
+    # Грубая оценка: пара (event_id, вероятность) или словарь мероприятия на рекомендацию.
+    size=lambda result: 512 * (len(result[0]) + 1),
+)
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Recommendation service is overloaded, retry later"},
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+    )
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+def request_deadline(http_request: Request, deadline_ms: Optional[int]) -> Optional[float]:
+    """
+    Срок запроса (time.perf_counter): deadline_ms из тела или заголовок X-Request-Deadline-Ms,
+    отсчитанные от начала обработки запроса. None - срока нет.
+    """
+    if deadline_ms is None:
+        header = http_request.headers.get(DEADLINE_HEADER)
+        if header is None:
+            return None
+        try:
+            deadline_ms = int(header)
+        except ValueError:
+            deadline_ms = 0
+        if deadline_ms < 1:
+            raise HTTPException(status_code=422, detail=f"{DEADLINE_HEADER} must be a positive integer")
+    return metrics.request_started() + deadline_ms / 1000.0
+
+@app.post("/recommend-events")
+async def get_event_recommendations(request: RecommendationRequest, http_request: Request):
+    metrics.mark_since_start("parse")
+    compact = wire.accepts_msgpack(http_request)
+    deadline = request_deadline(http_request, request.deadline_ms)
+    with metrics.stage("catalog"):
+        catalog_ref = await asyncio.to_thread(resolve_catalog, request.events, request.catalog_version)
+    path = plan_path(deadline, expected_fit([request.user_profile]))
+    key = "{}:{}:{}:{}:{}".format(
+        profile_key(request.user_profile, request.universities),
+        catalog_ref.key, request.n_recommendations, compact, path,
+    )
+
+    async def compute():
+        return await EXECUTOR.run(
+            recommend_events_with_path,
             request.user_profile,
-            request.events,
+            catalog_ref,
             request.universities,
-            request.n_recommendations
+            request.n_recommendations,
+            compact,
+            None,
+            path,
+            deadline,
         )
+
+    try:
+        recommendations, path = await RECOMMENDATIONS_IN_FLIGHT.run(key, compute)
         
-        return {
+        response = {
             "user_id": request.user_profile.user_id,
+            "model_version": model_version(),
+            "path": path,
             "recommendations_count": len(recommendations),
             "recommendations": recommendations
         }
+        if compact:
+            return Response(wire.pack(response), media_type=wire.MSGPACK_MEDIA_TYPE)
+        return response
+    except ExecutorSaturated:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/recommend-events/batch")
+async def get_batch_event_recommendations(request: BatchRecommendationRequest, http_request: Request):
+    metrics.mark_since_start("parse")
+    compact = wire.accepts_msgpack(http_request)
+    deadline = request_deadline(http_request, request.deadline_ms)
+    with metrics.stage("catalog"):
+        catalog_ref = await asyncio.to_thread(resolve_catalog, request.events, request.catalog_version)
+    try:
+        results = await EXECUTOR.run(
+            recommend_events_batch,
+            request.user_profiles,
+            catalog_ref,
+            request.universities,
+            request.n_recommendations,
+            compact,
+            plan_path(deadline, expected_fit(request.user_profiles)),
+            deadline,
+        )
+
+        response = {
+            "model_version": model_version(),
+            # Сколько списков построено каждым путём (full, cached, heuristic).
+            "paths": metrics.paths(),
+            "results": [
+                {
+                    "user_id": user_id,
+                    "path": path,
+                    "recommendations_count": len(recommendations),
+                    "recommendations": recommendations,
+                    **({"error": error} if error is not None else {}),
+                }
+                for user_id, recommendations, path, error in results
+            ]
+        }
+        if compact:
+            return Response(wire.pack(response), media_type=wire.MSGPACK_MEDIA_TYPE)
+        return response
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/ready")
+async def get_readiness():
+    if not READY.is_set():
+        return JSONResponse(status_code=503, content={"ready": False})
+    return {
+        "ready": True,
+        "warm_start_seconds": WARM_START_SECONDS,
+        "model_version": model_version(),
+        "catalog_version": CATALOG.version,
+    }
+
+@app.get("/catalog")
+async def get_catalog():
+    version, catalog = CATALOG.snapshot()
+    return {"version": version, "events_count": len(catalog)}
+
+# Каталог и его индексы перестраиваются целиком (сотни миллисекунд на 10 тыс. мероприятий),
+# поэтому изменения применяются в потоке, а не в event loop.
+@app.put("/catalog")
+async def replace_catalog(request: CatalogReplace):
+    version = await asyncio.to_thread(CATALOG.replace, request.events)
+    return {"version": version, "events_count": len(request.events)}
+
+@app.patch("/catalog")
+async def update_catalog(request: CatalogDelta):
+    try:
+        version = await asyncio.to_thread(CATALOG.apply_delta, request.base_version, request.upsert, request.remove)
+    except CatalogVersionConflict as e:
+        raise HTTPException(status_code=409, detail={"msg": str(e), "catalog_version": e.current})
+    return {"version": version}
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return {
+        "model_cache": MODEL_CACHE.stats(),
+        "catalog_cache": CATALOG_CACHE.stats(),
+        "stats_store": STATS_STORE.stats(),
+        "single_flight": RECOMMENDATIONS_IN_FLIGHT.stats(),
+    }
+
+@app.post("/feedback")
+async def record_feedback(request: Feedback):
+    """
+    Новая запись на мероприятие, отзыв или отмена записи: обновляет суммы пользователя
+    в STATS_STORE без пересчёта истории. Пользователи, которых ещё нет в хранилище,
+    пропускаются (updated=false). В режиме RECOMMENDER_EXECUTOR=process обновляется
+    только хранилище главного процесса, воркеры пересобирают записи по истории из
+    запроса (см. stats_store.py).
+    """
+    if request.removed:
+        return {"updated": STATS_STORE.remove(request.user_id, request.event_id)}
+    _, catalog = CATALOG.snapshot()
+    event = catalog.get(request.event_id)
+    if event is None:
+        raise HTTPException(status_code=404, detail=f"Event {request.event_id} is not in the catalog")
+    updated = STATS_STORE.record(
+        request.user_id, request.event_id, request.attended, request.rating,
+        event.organizer, tuple(event.recommended_skills),
+    )
+    return {"updated": updated}
+
+@app.get("/stats")
+async def get_global_stats():
+    """
+    Общие статистики организаторов и навыков по пользователям в STATS_STORE.
+    """
+    organizer_stats, skill_importance = STATS_STORE.global_stats()
+    return {"organizers": organizer_stats, "skills": skill_importance, **STATS_STORE.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    cache = MODEL_CACHE.stats()
+    catalogs = CATALOG_CACHE.stats()
+    stats = STATS_STORE.stats()
+    flights = RECOMMENDATIONS_IN_FLIGHT.stats()
+    results = flights.get("results", {})
+    extra = (
+        metrics.render_value("recommender_model_cache_entries", "Models in the per-user model cache.", "gauge", cache["entries"])
+        + metrics.render_value("recommender_model_cache_bytes", "Estimated size of the per-user model cache.", "gauge", cache["bytes"])
+        + metrics.render_value("recommender_model_cache_hits_total", "Per-user model cache hits.", "counter", cache["hits"])
+        + metrics.render_value("recommender_model_cache_misses_total", "Per-user model cache misses.", "counter", cache["misses"])
+        + metrics.render_value("recommender_model_cache_evictions_total", "Per-user model cache evictions.", "counter", cache["evictions"])
+        + metrics.render_value("recommender_catalog_cache_entries", "Event lists in the content-addressed catalog cache.", "gauge", catalogs["entries"])
+        + metrics.render_value("recommender_catalog_cache_bytes", "Estimated size of the catalog cache.", "gauge", catalogs["bytes"])
+        + metrics.render_value("recommender_catalog_cache_hits_total", "Requests whose events were already featurized.", "counter", catalogs["hits"])
+        + metrics.render_value("recommender_catalog_cache_misses_total", "Requests whose events had to be featurized.", "counter", catalogs["misses"])
+        + metrics.render_value("recommender_executor_in_flight", "Tasks running or queued in the executor.", "gauge", EXECUTOR.in_flight)
+        + metrics.render_value("recommender_executor_rejected_total", "Requests rejected with 503 because the executor was full.", "counter", EXECUTOR.rejected)
+        + metrics.render_value("recommender_single_flight_in_flight", "Distinct recommendation requests being computed.", "gauge", flights["in_flight"])
+        + metrics.render_value("recommender_single_flight_computed_total", "Recommendation requests computed by the executor.", "counter", flights["computed"])
+        + metrics.render_value("recommender_single_flight_coalesced_total", "Requests that awaited an identical in-flight request.", "counter", flights["coalesced"])
+        + metrics.render_value("recommender_result_cache_hits_total", "Requests answered from the short-lived result cache.", "counter", results.get("hits", 0))
+        + metrics.render_value("recommender_stats_store_users", "Users with incremental organizer and skill statistics.", "gauge", stats["users"])
+        + metrics.render_value("recommender_stats_store_hits_total", "Requests served from stored per-user statistics.", "counter", stats["hits"])
+        + metrics.render_value("recommender_stats_store_rebuilds_total", "Per-user statistics rebuilt from the request history.", "counter", stats["rebuilds"])
+        + metrics.render_value("recommender_stats_store_updates_total", "Incremental statistics updates from /feedback.", "counter", stats["updates"])
+        + metrics.render_value("recommender_catalog_version", "Version of the in-memory event catalog.", "gauge", CATALOG.version)
+        + metrics.render_value("recommender_ready", "1 once models are loaded and the executor is warm.", "gauge", int(READY.is_set()))
+        + metrics.render_value("recommender_global_model_loaded", "1 if an offline-trained model artifact is loaded.", "gauge", int(GLOBAL_MODEL is not None))
+    )
+    return PlainTextResponse(metrics.render(extra), media_type="text/plain; version=0.0.4")
+
 @app.get("/skills")
 async def get_available_skills():
     return {"skills": AVAILABLE_SKILLS}
@@ -317,5 +1839,30 @@ async def get_available_skills():
 async def get_universities():
     return {"universities": TARGET_UNIVERSITIES}
 
+@app.get("/model")
+async def get_model_info():
+    collaborative = {"loaded": False}
+    if COLLABORATIVE_MODEL is not None:
+        collaborative = {
+            "loaded": True,
+            "version": COLLABORATIVE_MODEL.version,
+            "trained_at": COLLABORATIVE_MODEL.trained_at,
+            "n_users": len(COLLABORATIVE_MODEL.user_ids),
+            "n_events": len(COLLABORATIVE_MODEL.event_ids),
+            "weight": COLLABORATIVE_WEIGHT,
+        }
+    if GLOBAL_MODEL is None:
+        return {"loaded": False, "feature_version": FEATURE_VERSION, "collaborative": collaborative}
+    return {
+        "loaded": True,
+        "version": GLOBAL_MODEL["version"],
+        "feature_version": GLOBAL_MODEL["feature_version"],
+        "trained_at": GLOBAL_MODEL.get("trained_at"),
+        "n_samples": GLOBAL_MODEL.get("n_samples"),
+        "n_users": GLOBAL_MODEL.get("n_users"),
+        "collaborative": collaborative,
+    }
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
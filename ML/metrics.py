@@ -0,0 +1,363 @@
+"""
+Метрики сервиса рекомендаций в текстовом формате Prometheus.
+
+Таймеры этапов (stage) складывают длительности в StageTimings текущего запроса,
+по окончании запроса они попадают в гистограммы. Пока StageTimings не активен,
+таймер ничего не измеряет, поэтому recommend_events можно вызывать напрямую
+(тесты, бенчмарк) без накладных расходов.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, label: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                # Счётчики по корзинам (последняя - +Inf), сумма и количество наблюдений.
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_value, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for upper, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    labels = _format_labels({self.label: label_value, "le": _format_value(upper)})
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels({self.label: label_value})
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: Dict[tuple, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: int = 1):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(dict(zip(self.labels, label_values)))} {value}")
+        return lines
+
+
+def render_value(name: str, documentation: str, kind: str, value, labels: Optional[Dict[str, str]] = None) -> List[str]:
+    """
+    Одно значение (gauge или counter), которое хранится не в реестре, а снимается при запросе /metrics.
+    """
+    return [
+        f"# HELP {name} {documentation}",
+        f"# TYPE {name} {kind}",
+        f"{name}{_format_labels(labels or {})} {_format_value(value)}",
+    ]
+
+
+STAGE_SECONDS = Histogram("recommender_stage_duration_seconds", "Time spent in each stage of a request.", "stage")
+REQUEST_SECONDS = Histogram("recommender_request_duration_seconds", "Total request handling time.", "endpoint")
+CANDIDATES_PRUNED = Counter(
+    "recommender_candidates_pruned_total",
+    "Events removed before model scoring, by stage (visited, retrieval, budget).",
+    ("stage",),
+)
+CANDIDATES_SCORED = Counter("recommender_candidates_scored_total", "Events scored by the model.", ())
+RECOMMENDATIONS = Counter(
+    "recommender_recommendations_total",
+    "Recommendation lists built, by model kind (trained or heuristic) and tier.",
+    ("model", "tier"),
+)
+PATHS = Counter(
+    "recommender_paths_total",
+    "Recommendation lists by path chosen under the request deadline (full, cached, heuristic).",
+    ("path",),
+)
+
+
+class RecentStages:
+    """
+    Скользящие (экспоненциальные) средние длительностей этапов в расчёте на один
+    список рекомендаций. По ним выбирается путь, который успевает к сроку запроса.
+    Учитываются только запросы, где этап был; обучение учитывается отдельно по
+    уровню модели (fit.<tier>) как стоимость одного обучения.
+
+    Дорогой этап перестаёт выбираться и поэтому перестаёт измеряться. Чтобы одна
+    перегрузка не отключала его навсегда, оценка без новых измерений дольше max_age
+    секунд пропускается одним запросом (проба), а следующее измерение заменяет её
+    целиком, а не усредняется с ней. clock подменяется в тестах.
+    """
+    def __init__(self, alpha: float = 0.2, max_age: float = 30.0, clock=time.monotonic):
+        self.alpha = alpha
+        self.max_age = max_age
+        self.clock = clock
+        # name -> [среднее, время последнего измерения, время последней пробы]
+        self._values: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            now = self.clock()
+            entry = self._values.get(name)
+            if entry is None or now - entry[1] > self.max_age:
+                self._values[name] = [seconds, now, now]
+            else:
+                entry[0] += self.alpha * (seconds - entry[0])
+                entry[1] = now
+
+    def estimate(self, names) -> float:
+        """
+        Ожидаемая длительность набора этапов; неизвестные этапы считаются бесплатными,
+        как и устаревший этап для запроса, который его проверит.
+        """
+        with self._lock:
+            now = self.clock()
+            total = 0.0
+            for name in names:
+                entry = self._values.get(name)
+                if entry is None:
+                    continue
+                if now - entry[1] > self.max_age and now - entry[2] > self.max_age:
+                    entry[2] = now
+                    continue
+                total += entry[0]
+            return total
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+RECENT_STAGES = RecentStages()
+
+
+def fit_stage(tier: str) -> str:
+    """
+    Имя оценки обучения модели уровня tier в RECENT_STAGES.
+    """
+    return "fit." + tier
+# Этапы, которые проходят один раз на запрос, а не на каждый список рекомендаций в пакете.
+PER_REQUEST_STAGES = ("parse", "catalog", "queue")
+
+
+class StageTimings:
+    """
+    Длительности этапов одного запроса. Повторяющийся этап (например, features
+    при обучении и при скоринге) суммируется.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = defaultdict(float)
+        self.tiers: Dict[str, int] = defaultdict(int)
+        self.pruned: Dict[str, int] = defaultdict(int)
+        self.paths: Dict[str, int] = defaultdict(int)
+        # Уровень модели -> [число обучений, их суммарная длительность].
+        self.fits: Dict[str, list] = defaultdict(lambda: [0, 0.0])
+        self.scored = 0
+
+    def add(self, name: str, seconds: float):
+        self.stages[name] += seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> dict:
+        return {
+            "stages": dict(self.stages),
+            "tiers": dict(self.tiers),
+            "pruned": dict(self.pruned),
+            "paths": dict(self.paths),
+            "fits": dict(self.fits),
+            "scored": self.scored,
+            "elapsed": self.elapsed(),
+        }
+
+    def merge(self, worker: dict, wall_seconds: float):
+        """
+        Добавляет этапы, измеренные в воркере. Разница между временем ожидания
+        результата и временем работы воркера - это ожидание в очереди пула.
+        """
+        for name, seconds in worker["stages"].items():
+            self.stages[name] += seconds
+        for tier, count in worker["tiers"].items():
+            self.tiers[tier] += count
+        for name, count in worker["pruned"].items():
+            self.pruned[name] += count
+        for path, count in worker["paths"].items():
+            self.paths[path] += count
+        for tier, (count, seconds) in worker["fits"].items():
+            self.fits[tier][0] += count
+            self.fits[tier][1] += seconds
+        self.scored += worker["scored"]
+        self.stages["queue"] += max(wall_seconds - worker["elapsed"], 0.0)
+
+    def server_timing(self, total: float) -> str:
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+_CURRENT: "contextvars.ContextVar[Optional[StageTimings]]" = contextvars.ContextVar("stage_timings", default=None)
+
+
+@contextmanager
+def collect():
+    timings = StageTimings()
+    token = _CURRENT.set(timings)
+    try:
+        yield timings
+    finally:
+        _CURRENT.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    timings = _CURRENT.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def mark_since_start(name: str):
+    """
+    Записывает время от начала запроса до текущего момента как отдельный этап
+    (разбор и валидация тела происходят до вызова обработчика).
+    """
+    timings = _CURRENT.get()
+    if timings is not None:
+        timings.add(name, timings.elapsed())
+
+
+def count_tier(tier: str):
+    timings = _CURRENT.get()
+    if timings is not None:
+        timings.tiers[tier] += 1
+
+
+def count_fit(tier: str, seconds: float):
+    timings = _CURRENT.get()
+    if timings is not None:
+        timings.fits[tier][0] += 1
+        timings.fits[tier][1] += seconds
+
+
+def count_path(path: str):
+    timings = _CURRENT.get()
+    if timings is not None:
+        timings.paths[path] += 1
+
+
+def paths() -> Dict[str, int]:
+    """
+    Пути, которыми строились списки в текущем запросе (с учётом воркеров пула).
+    """
+    timings = _CURRENT.get()
+    return dict(timings.paths) if timings is not None else {}
+
+
+def request_started() -> float:
+    """
+    Момент начала обработки запроса (time.perf_counter); от него отсчитывается срок запроса.
+    """
+    timings = _CURRENT.get()
+    return timings.started if timings is not None else time.perf_counter()
+
+
+def count_candidates(report: dict, n_scored: int):
+    timings = _CURRENT.get()
+    if timings is not None:
+        for name in ("visited", "retrieval", "budget"):
+            timings.pruned[name] += report[name]
+        timings.scored += n_scored
+
+
+def merge_worker(worker: dict, wall_seconds: float):
+    timings = _CURRENT.get()
+    if timings is not None:
+        timings.merge(worker, wall_seconds)
+
+
+def run_collected(fn, *args):
+    """
+    Выполняется в воркере пула: вызывает fn и возвращает его результат вместе с
+    измеренными этапами, чтобы метрики работали и в режиме process.
+    """
+    with collect() as timings:
+        result = fn(*args)
+    return result, timings.as_dict()
+
+
+def observe_request(endpoint: str, timings: StageTimings, total: float):
+    REQUEST_SECONDS.observe(endpoint, total)
+    for name, seconds in timings.stages.items():
+        STAGE_SECONDS.observe(name, seconds)
+    for tier, count in timings.tiers.items():
+        RECOMMENDATIONS.inc("heuristic" if tier == "heuristic" else "trained", tier, amount=count)
+    for name, count in timings.pruned.items():
+        CANDIDATES_PRUNED.inc(name, amount=count)
+    for path, count in timings.paths.items():
+        PATHS.inc(path, amount=count)
+    lists = sum(timings.tiers.values())
+    if lists:
+        for name, seconds in timings.stages.items():
+            RECENT_STAGES.observe(name, seconds if name in PER_REQUEST_STAGES else seconds / lists)
+    for tier, (count, seconds) in timings.fits.items():
+        RECENT_STAGES.observe(fit_stage(tier), seconds / count)
+    if timings.scored:
+        CANDIDATES_SCORED.inc(amount=timings.scored)
+
+
+def render(extra: List[str] = ()) -> str:
+    lines = (
+        REQUEST_SECONDS.render() + STAGE_SECONDS.render() + RECOMMENDATIONS.render() + PATHS.render()
+        + CANDIDATES_PRUNED.render() + CANDIDATES_SCORED.render() + list(extra)
+    )
+    return "\n".join(lines) + "\n"
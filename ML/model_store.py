@@ -0,0 +1,54 @@
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+LATEST_POINTER = "LATEST"
+
+
+def save_artifact(artifact: dict, model_dir: str, prefix: str = "recommender") -> str:
+    """
+    Сохраняет артефакт модели под новой версией и переключает указатель LATEST.
+    Возвращает путь к сохранённому файлу.
+    """
+    import joblib
+
+    os.makedirs(model_dir, exist_ok=True)
+    version = artifact.setdefault("version", datetime.utcnow().strftime("%Y%m%d%H%M%S"))
+    filename = f"{prefix}-{version}.joblib"
+    path = os.path.join(model_dir, filename)
+    joblib.dump(artifact, path)
+
+    pointer_tmp = os.path.join(model_dir, LATEST_POINTER + ".tmp")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "file": filename}, f)
+    os.replace(pointer_tmp, os.path.join(model_dir, LATEST_POINTER))
+    return path
+
+
+def load_latest(model_dir: str, feature_version: int) -> Optional[dict]:
+    """
+    Загружает последний артефакт из model_dir.
+    Возвращает None, если артефакта нет или он обучен на другой версии признаков.
+    joblib (и sklearn при распаковке) импортируются только здесь, а не при старте сервиса.
+    """
+    import joblib
+
+    pointer = latest_pointer(model_dir)
+    if pointer is None:
+        return None
+    artifact = joblib.load(os.path.join(model_dir, pointer["file"]))
+    if artifact.get("feature_version") != feature_version:
+        return None
+    return artifact
+
+
+def latest_pointer(model_dir: str) -> Optional[dict]:
+    """
+    Указатель LATEST ({"version", "file"}) без загрузки самого артефакта.
+    """
+    pointer_path = os.path.join(model_dir, LATEST_POINTER)
+    if not os.path.exists(pointer_path):
+        return None
+    with open(pointer_path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,70 @@
+"""
+Объединение одновременных одинаковых вычислений (single-flight).
+
+Повторное нажатие и несколько открытых вкладок присылают один и тот же запрос
+рекомендаций с разницей в миллисекунды. Первый запрос с ключом запускает
+вычисление, остальные ждут его future и получают тот же результат (или ту же
+ошибку), не обучая модель заново. Готовый результат можно ещё недолго отдавать
+из кэша (объект с get/put, например ModelCache).
+
+Работает в одном цикле событий, поэтому обходится без блокировок.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    def __init__(self, results=None, size: Callable[[object], int] = lambda result: 1):
+        self.results = results
+        self.size = size
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.computed = 0
+        self.coalesced = 0
+
+    async def run(self, key: str, compute: Callable[[], Awaitable]):
+        """
+        Результат compute() для ключа key: из кэша результатов, из уже идущего
+        вычисления или новым вычислением.
+        """
+        while True:
+            if self.results is not None:
+                cached = self.results.get(key)
+                if cached is not None:
+                    return cached
+            future = self._in_flight.get(key)
+            if future is None:
+                break
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Отменили первый запрос, а не этот: вычисляем заново.
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.computed += 1
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Ждущих может не быть: помечаем ошибку прочитанной, чтобы asyncio не логировал её.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if self.results is not None:
+                self.results.put(key, result, self.size(result))
+            return result
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> dict:
+        stats = {"in_flight": len(self._in_flight), "computed": self.computed, "coalesced": self.coalesced}
+        if self.results is not None:
+            stats["results"] = self.results.stats()
+        return stats
@@ -0,0 +1,192 @@
+"""
+Таксономия навыков и матрица их близости для «мягкого» совпадения.
+
+Точное совпадение навыков не видит, что «Machine Learning» близко к «AI», а «React» -
+к «Frontend». Здесь у навыков есть родители (React -> Frontend, JavaScript) и
+связанные навыки (iOS - Android), и по ним при импорте один раз строится плотная
+матрица близости |навыков| x |навыков|:
+
+    тот же навык                      1
+    родитель или потомок              3/4
+    через поколение, связанный навык  1/2
+    общий родитель                    1/4
+
+Значения кратны 1/4, поэтому суммы близостей считаются в float64 точно и не
+зависят от порядка сложения: матричное произведение по всем мероприятиям совпадает
+с построчным расчётом в create_event_features.
+"""
+from collections import defaultdict
+from itertools import combinations
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+from skills import AVAILABLE_SKILLS, SKILL_INDEX, unpack_skill_masks
+
+PARENT_SIMILARITY = 0.75
+GRANDPARENT_SIMILARITY = 0.5
+RELATED_SIMILARITY = 0.5
+SIBLING_SIMILARITY = 0.25
+
+_LANGUAGES = ("Python", "JavaScript", "TypeScript", "Java", "C#", "C++", "Go", "Rust", "Swift", "Kotlin", "PHP",
+              "Ruby", "Perl", "Scala")
+
+SKILL_PARENTS: Dict[str, Tuple[str, ...]] = {
+    **{language: ("Programming",) for language in _LANGUAGES},
+    "TypeScript": ("Programming", "JavaScript"),
+    "Programming": ("Software Development",),
+    "Software Development": ("Software Engineering",),
+    "Software Engineering": ("Computer Science", "Engineering"),
+    "Computer Science": ("IT",),
+    "Git": ("Software Development",), "SVN": ("Software Development",), "Mercurial": ("Software Development",),
+
+    "Frontend": ("Software Development",), "Backend": ("Software Development",),
+    "Full Stack": ("Frontend", "Backend"),
+    "HTML": ("Frontend",), "CSS": ("Frontend",),
+    "Sass": ("CSS",), "Less": ("CSS",), "Tailwind CSS": ("CSS",), "Bootstrap": ("CSS",),
+    "React": ("Frontend", "JavaScript"), "Vue": ("Frontend", "JavaScript"),
+    "Angular": ("Frontend", "TypeScript"), "Svelte": ("Frontend", "JavaScript"),
+    "Next.js": ("React",), "Gatsby": ("React",), "Redux": ("React",), "MobX": ("React",),
+    "Nuxt.js": ("Vue",), "Vuex": ("Vue",),
+    "Node.js": ("Backend", "JavaScript"), "Express": ("Node.js",),
+    "Django": ("Backend", "Python"), "Flask": ("Backend", "Python"), "FastAPI": ("Backend", "Python"),
+    "Spring Boot": ("Backend", "Java"), "Ruby on Rails": ("Backend", "Ruby"),
+    "ASP.NET": ("Backend", "C#"), "Laravel": ("Backend", "PHP"),
+    "REST API": ("Backend",), "GraphQL": ("Backend",), "gRPC": ("Backend",), "Microservices": ("Backend",),
+    "Event-Driven Architecture": ("System Design",), "Serverless": ("Cloud Computing",),
+
+    "SQL": ("Backend",), "PostgreSQL": ("SQL",), "MySQL": ("SQL",),
+    "MongoDB": ("Backend",), "Redis": ("Backend",), "Elasticsearch": ("Backend",),
+    "Cassandra": ("Big Data",), "Kafka": ("Event-Driven Architecture",), "RabbitMQ": ("Event-Driven Architecture",),
+    "Big Data": ("Data Science",), "Data Warehousing": ("Big Data",), "ETL": ("Data Warehousing",),
+
+    "DevOps": ("Software Engineering",),
+    "Linux": ("DevOps",), "Windows Server": ("DevOps",), "Docker": ("DevOps",), "Kubernetes": ("DevOps",),
+    "OpenShift": ("Kubernetes",), "Terraform": ("DevOps",), "Ansible": ("DevOps",), "Puppet": ("DevOps",),
+    "Chef": ("DevOps",), "CI/CD": ("DevOps",),
+    "Jenkins": ("CI/CD",), "GitLab CI": ("CI/CD",), "GitHub Actions": ("CI/CD",), "Travis CI": ("CI/CD",),
+    "Argo CD": ("CI/CD",),
+    "Cloud Computing": ("IT",),
+    "AWS": ("Cloud Computing",), "Azure": ("Cloud Computing",), "GCP": ("Cloud Computing",),
+    "Heroku": ("Cloud Computing",), "Netlify": ("Cloud Computing",), "Vercel": ("Cloud Computing",),
+
+    "AI": ("Computer Science",),
+    "Machine Learning": ("AI", "Data Science"), "Deep Learning": ("Machine Learning",),
+    "Reinforcement Learning": ("Machine Learning",), "Computer Vision": ("AI",), "NLP": ("AI",),
+    "Pandas": ("Data Science", "Python"), "NumPy": ("Data Science", "Python"),
+    "Scikit-learn": ("Machine Learning", "Python"),
+    "TensorFlow": ("Deep Learning",), "PyTorch": ("Deep Learning",), "Keras": ("Deep Learning",),
+    "OpenCV": ("Computer Vision",), "NLTK": ("NLP",), "SpaCy": ("NLP",),
+    "Robotics": ("Engineering", "AI"),
+
+    "Algorithms": ("Computer Science",), "Data Structures": ("Computer Science",),
+    "Networking": ("Computer Science",), "System Design": ("Software Engineering",),
+    "Security": ("Cybersecurity",), "Cryptography": ("Cybersecurity", "Mathematics"),
+    "Blockchain": ("Cryptography",), "Cybersecurity": ("IT",),
+    "Linear Algebra": ("Mathematics",), "Calculus": ("Mathematics",), "Statistics": ("Mathematics",),
+    "Probability": ("Mathematics",), "Discrete Mathematics": ("Mathematics",),
+    "Indexing": ("Optimization",), "Performance Tuning": ("Optimization",),
+    "Scalability": ("System Design",), "High Availability": ("System Design",), "Load Balancing": ("System Design",),
+
+    "Agile": ("Project Management",), "Scrum": ("Agile",), "Kanban": ("Agile",),
+    "Jira": ("Project Management",), "Confluence": ("Project Management",),
+    "Project Management": ("Management",), "Product Management": ("Management",),
+    "IT Management": ("Management", "IT"), "Change Management": ("Management",),
+    "Digital Transformation": ("Management", "Digital"),
+
+    "A/B Testing": ("Analytics",), "Business Intelligence": ("Analytics",), "Data Visualization": ("Analytics",),
+    "Tableau": ("Business Intelligence",), "Power BI": ("Business Intelligence",),
+    "Business Analytics": ("Analytics",), "Business Analysis": ("Business Analytics",),
+    "Marketing Analytics": ("Analytics", "Digital Marketing"), "Digital Marketing": ("Digital",),
+
+    "SwiftUI": ("iOS", "Swift"), "Xcode": ("iOS",),
+    "Jetpack Compose": ("Android", "Kotlin"), "Android SDK": ("Android",),
+    "React Native": ("React",), "Xamarin": ("C#",),
+
+    "Game Design": ("Design",), "Unity": ("Game Design",), "Unreal Engine": ("Game Design",),
+    "WebGL": ("OpenGL", "Frontend"),
+    "UX/UI Design": ("Design",),
+    "Figma": ("UX/UI Design",), "Adobe XD": ("UX/UI Design",), "Sketch": ("UX/UI Design",),
+    "InVision": ("UX/UI Design",), "User Research": ("UX/UI Design",), "Wireframing": ("UX/UI Design",),
+    "Prototyping": ("UX/UI Design",),
+
+    "QA": ("Software Engineering",), "Testing": ("QA",),
+    "Automation Testing": ("Testing",), "Manual Testing": ("Testing",),
+
+    "Electronics": ("Engineering",), "Telecommunications": ("Engineering",), "Marine Technology": ("Engineering",),
+    "Aerospace Engineering": ("Engineering",), "Automotive": ("Engineering",),
+
+    "Presentation Skills": ("Communication",), "Public Speaking": ("Communication",),
+    "Negotiation": ("Communication",), "Technical Writing": ("Communication",),
+    "Leadership": ("Management",),
+}
+
+RELATED_SKILLS: Tuple[Tuple[str, str], ...] = (
+    ("Data Science", "Statistics"), ("Machine Learning", "Statistics"), ("Machine Learning", "Linear Algebra"),
+    ("Statistics", "Probability"), ("Analytics", "Data Science"), ("Data Visualization", "Business Intelligence"),
+    ("iOS", "Android"), ("iOS", "Swift"), ("Android", "Kotlin"), ("Android", "Java"),
+    ("React Native", "iOS"), ("React Native", "Android"), ("Flutter", "iOS"), ("Flutter", "Android"),
+    ("Xamarin", "iOS"), ("Xamarin", "Android"),
+    ("Docker", "Kubernetes"), ("Docker", "Microservices"), ("Serverless", "Microservices"),
+    ("Cloud Computing", "DevOps"), ("Linux", "Networking"),
+    ("Security", "Networking"), ("Telecommunications", "Networking"), ("Electronics", "Robotics"),
+    ("Indexing", "SQL"), ("Indexing", "Elasticsearch"), ("Performance Tuning", "Scalability"),
+    ("Load Balancing", "High Availability"),
+    ("OpenGL", "Game Design"), ("DirectX", "Game Design"), ("OpenGL", "DirectX"),
+    ("Biotechnology", "Genetics"), ("Biotechnology", "Chemistry"), ("Physics", "Mathematics"),
+    ("Economics", "Finance"), ("Finance", "Business Analytics"),
+    ("Teamwork", "Communication"), ("Leadership", "Teamwork"), ("Problem Solving", "Critical Thinking"),
+    ("Creativity", "Design"), ("Time Management", "Project Management"), ("Adaptability", "Change Management"),
+    ("Digital", "IT"), ("Programming", "Algorithms"),
+)
+
+
+def _index(skill: str) -> int:
+    if skill not in SKILL_INDEX:
+        raise ValueError(f"Skill '{skill}' in the taxonomy is not in the available skills list")
+    return SKILL_INDEX[skill]
+
+
+def build_similarity(parents: Dict[str, Iterable[str]], related: Iterable[Tuple[str, str]]) -> np.ndarray:
+    similarity = np.zeros((len(AVAILABLE_SKILLS), len(AVAILABLE_SKILLS)))
+
+    def link(a: int, b: int, value: float):
+        similarity[a, b] = similarity[b, a] = max(similarity[a, b], value)
+
+    parent_rows = {_index(skill): [_index(parent) for parent in skill_parents] for skill, skill_parents in parents.items()}
+    children = defaultdict(list)
+    for child, child_parents in parent_rows.items():
+        for parent in child_parents:
+            children[parent].append(child)
+            link(child, parent, PARENT_SIMILARITY)
+            for grandparent in parent_rows.get(parent, ()):
+                link(child, grandparent, GRANDPARENT_SIMILARITY)
+    for a, b in related:
+        link(_index(a), _index(b), RELATED_SIMILARITY)
+    for siblings in children.values():
+        for a, b in combinations(siblings, 2):
+            link(a, b, SIBLING_SIMILARITY)
+    np.fill_diagonal(similarity, 1.0)
+    return similarity
+
+
+SKILL_SIMILARITY = build_similarity(SKILL_PARENTS, RELATED_SKILLS)
+SKILL_SIMILARITY.setflags(write=False)
+
+
+def skill_affinity(skills) -> np.ndarray:
+    """
+    Близость каждого навыка к ближайшему из skills (навыки пользователя); нули, если skills пуст.
+    """
+    rows = [SKILL_INDEX[skill] for skill in set(skills)]
+    if not rows:
+        return np.zeros(len(AVAILABLE_SKILLS))
+    return SKILL_SIMILARITY[rows].max(axis=0)
+
+
+def soft_overlap(masks: np.ndarray, affinity: np.ndarray) -> np.ndarray:
+    """
+    «Мягкое» число общих навыков для каждой маски мероприятия: сумма близостей его
+    навыков к навыкам пользователя, одно матричное произведение на все мероприятия.
+    """
+    return unpack_skill_masks(masks) @ affinity
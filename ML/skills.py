@@ -1,3 +1,5 @@
+import numpy as np
+
 AVAILABLE_SKILLS = [
     "Python", "JavaScript", "TypeScript", "Java", "C#", "C++", "Go", "Rust", "Swift", "Kotlin", "PHP", "Ruby", "Perl", "Scala",
     "HTML", "CSS", "Sass", "Less", "Tailwind CSS", "Bootstrap",
@@ -29,3 +31,77 @@ AVAILABLE_SKILLS = [
     "Time Management", "Adaptability", "Negotiation", "Presentation Skills", "Public Speaking"
 ]
 
+# Скомпилированный словарь навыков: каждому навыку соответствует стабильный номер бита.
+# Новые навыки добавляются только в конец AVAILABLE_SKILLS, чтобы номера не сдвигались.
+SKILL_INDEX = {skill: bit for bit, skill in enumerate(AVAILABLE_SKILLS)}
+SKILL_WORDS = (len(AVAILABLE_SKILLS) + 63) // 64
+
+def is_valid_skill(skill: str) -> bool:
+    return skill in SKILL_INDEX
+
+def skill_names(skills) -> list:
+    """
+    Заменяет номера навыков (индексы в AVAILABLE_SKILLS) их названиями, названия оставляет как есть.
+    """
+    names = []
+    for skill in skills:
+        if isinstance(skill, int) and not isinstance(skill, bool):
+            if not 0 <= skill < len(AVAILABLE_SKILLS):
+                raise ValueError(f"Skill id {skill} is out of range")
+            skill = AVAILABLE_SKILLS[skill]
+        names.append(skill)
+    return names
+
+def skill_mask(skills) -> np.ndarray:
+    """
+    Маска навыков одного пользователя или мероприятия: массив uint64 длины SKILL_WORDS.
+    """
+    mask = np.zeros(SKILL_WORDS, dtype=np.uint64)
+    for skill in skills:
+        bit = SKILL_INDEX[skill]
+        mask[bit >> 6] |= np.uint64(1 << (bit & 63))
+    return mask
+
+def skill_masks(skill_lists) -> np.ndarray:
+    """
+    Маски для набора мероприятий: матрица uint64 формы (n, SKILL_WORDS).
+    """
+    bits = [[SKILL_INDEX[skill] for skill in skills] for skills in skill_lists]
+    masks = np.zeros((len(bits), SKILL_WORDS), dtype=np.uint64)
+    rows = np.repeat(np.arange(len(bits)), [len(b) for b in bits])
+    flat = np.fromiter((bit for b in bits for bit in b), dtype=np.int64, count=len(rows))
+    np.bitwise_or.at(masks, (rows, flat >> 6), np.left_shift(np.uint64(1), (flat & 63).astype(np.uint64)))
+    return masks
+
+if hasattr(np, "bitwise_count"):
+    def popcount(masks: np.ndarray) -> np.ndarray:
+        """
+        Число установленных битов в каждой маске (по последней оси).
+        """
+        return np.bitwise_count(masks).sum(axis=-1, dtype=np.int64)
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount(masks: np.ndarray) -> np.ndarray:
+        """
+        Число установленных битов в каждой маске (по последней оси).
+        """
+        masks = np.ascontiguousarray(masks)
+        as_bytes = masks.view(np.uint8).reshape(masks.shape[:-1] + (-1,))
+        return _POPCOUNT_TABLE[as_bytes].sum(axis=-1, dtype=np.int64)
+
+def pack_skill_matrix(matrix: np.ndarray) -> np.ndarray:
+    """
+    Упаковывает булеву матрицу (n, len(AVAILABLE_SKILLS)) в маски uint64 формы (n, SKILL_WORDS).
+    """
+    padded = np.zeros((matrix.shape[0], SKILL_WORDS * 64), dtype=np.uint64)
+    padded[:, :matrix.shape[1]] = matrix
+    weights = np.left_shift(np.uint64(1), np.arange(64, dtype=np.uint64))
+    return (padded.reshape(-1, SKILL_WORDS, 64) * weights).sum(axis=-1, dtype=np.uint64)
+
+def unpack_skill_masks(masks: np.ndarray) -> np.ndarray:
+    """
+    Обратное к pack_skill_matrix: матрица 0/1 (uint8) формы (n, len(AVAILABLE_SKILLS)).
+    """
+    masks = np.ascontiguousarray(masks, dtype="<u8")
+    return np.unpackbits(masks.view(np.uint8), axis=-1, bitorder="little")[:, :len(AVAILABLE_SKILLS)]
@@ -0,0 +1,123 @@
+"""
+Снимки предрассчитанных массивов на диске, которые процессы подключают через mmap.
+
+Снимок - каталог <name>-<version> с файлами .npy и meta.json; повторная публикация
+той же версии пишет в новый каталог <name>-<version>.<n>, а не поверх файлов,
+которые читатели могут держать через mmap. Указатель
+<name>.CURRENT переключается атомарно (os.replace), поэтому читатель всегда видит
+целиком записанный снимок. Массивы открываются только для чтения
+(np.load(mmap_mode="r")): несколько воркеров uvicorn делят одни и те же страницы
+файлового кэша, и память не растёт с числом воркеров. Старые снимки удаляются,
+но уже подключённые к ним процессы продолжают читать их до переключения.
+"""
+import fcntl
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+
+POINTER_SUFFIX = ".CURRENT"
+KEEP_SNAPSHOTS = 3
+
+
+def _pointer_path(directory: str, name: str) -> str:
+    return os.path.join(directory, name + POINTER_SUFFIX)
+
+
+@contextmanager
+def locked(directory: str, name: str):
+    """
+    Межпроцессная блокировка на запись снимков name (выдача версий, публикация).
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name + ".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def read_pointer(directory: str, name: str) -> Optional[dict]:
+    """
+    Указатель на текущий снимок: {"version", "path"}; None, если снимков ещё нет.
+    """
+    try:
+        with open(_pointer_path(directory, name), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def pointer_stamp(directory: str, name: str) -> Optional[tuple]:
+    """
+    Дешёвая проверка смены указателя без чтения файла: os.replace меняет inode.
+    """
+    try:
+        stat = os.stat(_pointer_path(directory, name))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def publish(directory: str, name: str, version, arrays: Dict[str, np.ndarray], meta: dict) -> str:
+    """
+    Записывает снимок и переключает на него указатель. Возвращает путь к снимку.
+    Вызывается под locked(directory, name).
+    """
+    os.makedirs(directory, exist_ok=True)
+    final_path = os.path.join(directory, f"{name}-{version}")
+    attempt = 0
+    while os.path.exists(final_path):
+        attempt += 1
+        final_path = os.path.join(directory, f"{name}-{version}.{attempt}")
+    tmp_path = f"{final_path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for key, array in arrays.items():
+        np.save(os.path.join(tmp_path, key + ".npy"), np.ascontiguousarray(array), allow_pickle=False)
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({**meta, "arrays": sorted(arrays)}, f, ensure_ascii=False)
+    os.rename(tmp_path, final_path)
+
+    pointer_tmp = _pointer_path(directory, name) + f".tmp-{os.getpid()}"
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "path": os.path.basename(final_path)}, f)
+    os.replace(pointer_tmp, _pointer_path(directory, name))
+    _prune(directory, name, os.path.basename(final_path))
+    return final_path
+
+
+def attach(directory: str, pointer: dict) -> tuple:
+    """
+    Подключает снимок по указателю: (массивы только для чтения через mmap, meta).
+    """
+    path = os.path.join(directory, pointer["path"])
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    arrays = {}
+    for key in meta.pop("arrays"):
+        arrays[key] = np.load(os.path.join(path, key + ".npy"), mmap_mode="r")
+    return arrays, meta
+
+
+def load_current(directory: str, name: str) -> Optional[tuple]:
+    pointer = read_pointer(directory, name)
+    if pointer is None:
+        return None
+    arrays, meta = attach(directory, pointer)
+    return pointer["version"], arrays, meta
+
+
+def _prune(directory: str, name: str, current: str):
+    snapshots = []
+    for entry in os.listdir(directory):
+        prefix = entry.rpartition("-")[0]
+        if prefix == name and entry != current:
+            path = os.path.join(directory, entry)
+            snapshots.append((os.path.getmtime(path), path))
+    for _, path in sorted(snapshots)[:max(len(snapshots) - (KEEP_SNAPSHOTS - 1), 0)]:
+        shutil.rmtree(path, ignore_errors=True)
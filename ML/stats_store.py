@@ -0,0 +1,195 @@
+"""
+Инкрементальные статистики организаторов и навыков по посещениям пользователей.
+
+Для каждого пользователя хранятся суммы по организаторам (число посещений, сумма
+оценок, число успешных посещений с оценкой 4-5) и веса навыков, а также общие суммы
+по всем пользователям в хранилище. Новое посещение или изменённая оценка меняют
+суммы за O(навыков мероприятия), поэтому признаки читаются из готовых агрегатов
+вместо пересчёта всей истории.
+
+Запись пользователя актуальна, пока её отпечаток совпадает с отпечатком истории из
+запроса. Отпечаток - сумма 64-битных хешей посещений по модулю 2^64: он не зависит
+от порядка посещений, а record/remove поправляют его за O(1) вместе с суммами.
+Запрос хеширует свою историю (дёшево по сравнению с пересчётом статистик), поэтому
+любая замена одного посещения другим, новая оценка без /feedback или чужая история
+под тем же user_id приводят к пересборке записи.
+
+В режиме RECOMMENDER_EXECUTOR=process у каждого процесса пула своё хранилище, а
+/feedback обновляет только хранилище главного процесса; воркеры пересобирают запись
+по несовпавшему отпечатку.
+"""
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, Optional
+
+_HASH_MASK = (1 << 64) - 1
+
+
+def visit_hash(event_id: int, visit: tuple) -> int:
+    """
+    64-битный хеш посещения (event_id, attended, rating, organizer, skills).
+    """
+    digest = hashlib.blake2b(repr((event_id, *visit)).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def fingerprint(visits: Iterable[tuple]) -> int:
+    """
+    Отпечаток истории из кортежей (event_id, attended, rating, organizer, skills).
+    """
+    return sum(visit_hash(event_id, tuple(visit)) for event_id, *visit in visits) & _HASH_MASK
+
+
+class _Aggregates:
+    """
+    Суммы по организаторам и навыкам. В расчёт идут только посещённые мероприятия
+    (attended), в веса навыков - только успешные, как в compute_organizer_stats и
+    compute_skill_importance.
+    """
+    def __init__(self):
+        self.organizers: Dict[str, list] = defaultdict(lambda: [0, 0, 0])
+        self.skill_weights: Dict[str, int] = defaultdict(int)
+        self.total_skill_weight = 0
+
+    def apply(self, attended: bool, rating: int, organizer: str, skills: tuple, sign: int):
+        if not attended:
+            return
+        success = rating >= 4
+        counts = self.organizers[organizer]
+        counts[0] += sign
+        counts[1] += sign * rating
+        counts[2] += sign * success
+        if counts[0] == 0:
+            del self.organizers[organizer]
+        if success:
+            for skill in skills:
+                self.skill_weights[skill] += sign * rating
+                if self.skill_weights[skill] == 0:
+                    del self.skill_weights[skill]
+            self.total_skill_weight += sign * rating * len(skills)
+
+    def organizer_stats(self) -> Dict[str, dict]:
+        return {
+            organizer: {
+                'avg_rating': rating_sum / count,
+                'attendance_count': count,
+                'success_rate': success / count,
+            }
+            for organizer, (count, rating_sum, success) in self.organizers.items()
+        }
+
+    def skill_importance(self) -> Dict[str, float]:
+        total_weight = self.total_skill_weight or 1
+        return {skill: weight / total_weight for skill, weight in self.skill_weights.items()}
+
+
+class _UserStats(_Aggregates):
+    def __init__(self):
+        super().__init__()
+        # event_id -> (attended, rating, organizer, skills)
+        self.visits: Dict[int, tuple] = {}
+        self.fingerprint = 0
+
+
+class StatsStore:
+    """
+    Потокобезопасное хранилище агрегатов с вытеснением давно не использованных
+    пользователей (LRU) сверх max_users.
+    """
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._users: "OrderedDict[int, _UserStats]" = OrderedDict()
+        self._global = _Aggregates()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.rebuilds = 0
+        self.updates = 0
+
+    def user_stats(self, user_id: int, visits: Iterable[tuple]) -> Optional[tuple]:
+        """
+        (organizer_stats, skill_importance) пользователя по истории из запроса в виде
+        (event_id, attended, rating, organizer, skills). Запись пересобирается, если её
+        отпечаток не совпал с отпечатком истории. None, если в истории есть повторяющиеся
+        мероприятия: такую историю хранилище не ведёт.
+        """
+        visits = [(event_id, *visit) for event_id, *visit in visits]
+        if len({visit[0] for visit in visits}) != len(visits):
+            return None
+        key = fingerprint(visits)
+        with self._lock:
+            stats = self._users.get(user_id)
+            if stats is not None and stats.fingerprint == key:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return stats.organizer_stats(), stats.skill_importance()
+            self.rebuilds += 1
+            stats = self._rebuild(user_id, visits)
+            return stats.organizer_stats(), stats.skill_importance()
+
+    def record(self, user_id: int, event_id: int, attended: bool, rating: int, organizer: str, skills: tuple) -> bool:
+        """
+        Добавляет или обновляет одно посещение. Пользователи, которых нет в хранилище,
+        пропускаются: их запись соберётся из истории при первом запросе.
+        """
+        with self._lock:
+            stats = self._users.get(user_id)
+            if stats is None:
+                return False
+            self._remove_visit(stats, event_id)
+            self._add_visit(stats, event_id, (attended, rating, organizer, tuple(skills)))
+            self.updates += 1
+            return True
+
+    def remove(self, user_id: int, event_id: int) -> bool:
+        with self._lock:
+            stats = self._users.get(user_id)
+            if stats is None:
+                return False
+            removed = self._remove_visit(stats, event_id)
+            self.updates += removed
+            return removed
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+            self._global = _Aggregates()
+
+    def global_stats(self) -> tuple:
+        with self._lock:
+            return self._global.organizer_stats(), self._global.skill_importance()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"users": len(self._users), "hits": self.hits, "rebuilds": self.rebuilds, "updates": self.updates}
+
+    def _rebuild(self, user_id: int, visits: list) -> _UserStats:
+        old = self._users.pop(user_id, None)
+        if old is not None:
+            for event_id in list(old.visits):
+                self._remove_visit(old, event_id)
+        stats = _UserStats()
+        for event_id, *visit in visits:
+            self._remove_visit(stats, event_id)
+            self._add_visit(stats, event_id, tuple(visit))
+        self._users[user_id] = stats
+        while len(self._users) > self.max_users:
+            _, evicted = self._users.popitem(last=False)
+            for event_id in list(evicted.visits):
+                self._remove_visit(evicted, event_id)
+        return stats
+
+    def _add_visit(self, stats: _UserStats, event_id: int, visit: tuple):
+        stats.visits[event_id] = visit
+        stats.fingerprint = (stats.fingerprint + visit_hash(event_id, visit)) & _HASH_MASK
+        stats.apply(*visit, sign=1)
+        self._global.apply(*visit, sign=1)
+
+    def _remove_visit(self, stats: _UserStats, event_id: int) -> bool:
+        visit = stats.visits.pop(event_id, None)
+        if visit is None:
+            return False
+        stats.fingerprint = (stats.fingerprint - visit_hash(event_id, visit)) & _HASH_MASK
+        stats.apply(*visit, sign=-1)
+        self._global.apply(*visit, sign=-1)
+        return True
@@ -0,0 +1,62 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import max_hack
+from test_features import make_events, make_profile
+
+
+def batch_body(events, profiles):
+    return {
+        "user_profiles": [json.loads(profile.json()) for profile in profiles],
+        "events": [json.loads(event.json()) for event in events],
+        "n_recommendations": 5,
+    }
+
+
+def make_profiles(events):
+    profiles = []
+    for user_id, n_visited in ((1, 0), (2, 3), (3, 30)):
+        profile = make_profile(events, n_visited, seed=user_id)
+        profile.user_id = user_id
+        profiles.append(profile)
+    return profiles
+
+
+def test_batch_matches_single_user_endpoint():
+    events = make_events(80)
+    profiles = make_profiles(events)
+    client = TestClient(max_hack.app)
+
+    response = client.post("/recommend-events/batch", json=batch_body(events, profiles))
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["user_id"] for result in results] == [1, 2, 3]
+    for profile, result in zip(profiles, results):
+        single = client.post("/recommend-events", json={
+            "user_profile": json.loads(profile.json()),
+            "events": batch_body(events, [])["events"],
+            "n_recommendations": 5,
+        }).json()
+        assert "error" not in result
+        assert result["recommendations"] == single["recommendations"]
+
+
+def test_failing_user_does_not_fail_the_batch(monkeypatch):
+    events = make_events(80)
+    profiles = make_profiles(events)
+    recommend = max_hack.recommend_events_with_path
+
+    def fail_for_second_user(user_profile, *args, **kwargs):
+        if user_profile.user_id == 2:
+            raise ValueError("broken profile")
+        return recommend(user_profile, *args, **kwargs)
+
+    monkeypatch.setattr(max_hack, "recommend_events_with_path", fail_for_second_user)
+    response = TestClient(max_hack.app).post("/recommend-events/batch", json=batch_body(events, profiles))
+    assert response.status_code == 200
+    failed, = [result for result in response.json()["results"] if "error" in result]
+    assert failed == {
+        "user_id": 2, "path": None, "recommendations_count": 0, "recommendations": [], "error": "broken profile",
+    }
+    assert all(result["recommendations_count"] == 5 for result in response.json()["results"] if result["user_id"] != 2)
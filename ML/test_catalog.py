@@ -0,0 +1,58 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import max_hack
+from max_hack import CatalogStore
+from test_features import make_events, make_profile
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(max_hack, "CATALOG", CatalogStore())
+    return TestClient(max_hack.app)
+
+
+def as_json(events):
+    return [json.loads(event.json()) for event in events]
+
+
+def test_put_replaces_catalog_and_bumps_version(client):
+    events = make_events(30)
+    assert client.get("/catalog").json() == {"version": 0, "events_count": 0}
+    assert client.put("/catalog", json={"events": as_json(events[:20])}).json() == {"version": 1, "events_count": 20}
+    assert client.put("/catalog", json={"events": as_json(events[10:])}).json() == {"version": 2, "events_count": 20}
+    _, catalog = max_hack.CATALOG.snapshot()
+    assert sorted(e.event_id for e in catalog.events) == [e.event_id for e in events[10:]]
+
+
+def test_patch_applies_delta_on_top_of_current_version(client):
+    events = make_events(30)
+    client.put("/catalog", json={"events": as_json(events[:20])})
+    changed = events[5].copy(update={"title": "Новое название"})
+
+    response = client.patch("/catalog", json={
+        "base_version": 1, "upsert": as_json([changed] + events[20:]), "remove": [events[0].event_id],
+    })
+    assert response.json() == {"version": 2}
+    version, catalog = max_hack.CATALOG.snapshot()
+    assert version == 2
+    assert sorted(e.event_id for e in catalog.events) == [e.event_id for e in events[1:]]
+    assert next(e for e in catalog.events if e.event_id == changed.event_id).title == "Новое название"
+
+
+def test_stale_versions_are_rejected_with_409(client):
+    events = make_events(30)
+    client.put("/catalog", json={"events": as_json(events[:20])})
+    client.patch("/catalog", json={"base_version": 1, "remove": [events[0].event_id]})
+
+    response = client.patch("/catalog", json={"base_version": 1, "upsert": as_json(events[20:])})
+    assert response.status_code == 409
+    assert response.json()["detail"]["catalog_version"] == 2
+    assert client.get("/catalog").json() == {"version": 2, "events_count": 19}
+
+    profile = json.loads(make_profile(events[1:20], 5).json())
+    response = client.post("/recommend-events", json={"user_profile": profile, "catalog_version": 1})
+    assert response.status_code == 409
+    assert response.json()["detail"]["catalog_version"] == 2
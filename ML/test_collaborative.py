@@ -0,0 +1,43 @@
+import numpy as np
+
+from collaborative import CollaborativeModel
+from max_hack import EventAttendance
+
+
+def clustered_users(n_users=40, seed=0):
+    # Две группы: одни ходят на мероприятия 0-9, другие на 10-19.
+    rng = np.random.default_rng(seed)
+    users = []
+    for user_id in range(n_users):
+        group = user_id % 2
+        visited = rng.choice(10, size=5, replace=False) + 10 * group
+        users.append({
+            "user_id": user_id,
+            "visited_events": [{"event_id": int(e), "attended": True, "rating": 5} for e in visited],
+        })
+    return users
+
+
+def test_fold_in_prefers_events_of_similar_users():
+    model = CollaborativeModel.fit(clustered_users(), list(range(20)), factors=4, iterations=10)
+
+    user_vector = model.fold_in([EventAttendance(event_id=e, attended=True, rating=5) for e in (0, 1, 2)])
+    scores = model.scores(user_vector, model.event_rows(range(20)))
+    assert scores[3:10].mean() > scores[10:20].mean() + 0.3
+
+
+def test_unknown_events_and_users():
+    model = CollaborativeModel.fit(clustered_users(), list(range(20)), factors=4, iterations=5)
+
+    assert model.fold_in([EventAttendance(event_id=100, attended=True, rating=5)]) is None
+    rows = model.event_rows([0, 100])
+    assert rows.tolist() == [0, -1]
+    scores = model.scores(np.ones(4), rows)
+    assert not np.isnan(scores[0]) and np.isnan(scores[1])
+
+
+def test_artifact_round_trip():
+    model = CollaborativeModel.fit(clustered_users(), list(range(20)), factors=4, iterations=3)
+    restored = CollaborativeModel.from_artifact(model.to_artifact())
+    visits = [EventAttendance(event_id=12, attended=True, rating=4)]
+    assert np.array_equal(restored.fold_in(visits), model.fold_in(visits))
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import pickle
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import max_hack
+from max_hack import CatalogRef, CatalogStore, ExecutorSaturated, RecommendationExecutor, catalog_key, recommend_events_with_path
+from test_features import make_events, make_profile
+
+
+def test_full_executor_rejects_new_tasks():
+    executor = RecommendationExecutor("thread", workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def main():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(release.wait)
+        release.set()
+        return await running
+
+    try:
+        assert asyncio.run(main()) is True
+    finally:
+        executor.shutdown()
+    assert executor.rejected == 1 and executor.in_flight == 0
+
+
+def test_saturated_executor_answers_503_with_retry_after(monkeypatch):
+    executor = RecommendationExecutor("thread", workers=1, max_queue=0)
+    executor.in_flight = 1
+    monkeypatch.setattr(max_hack, "EXECUTOR", executor)
+    events = make_events(20)
+    body = {
+        "user_profile": json.loads(make_profile(events, 5).json()),
+        "events": [json.loads(event.json()) for event in events],
+    }
+
+    response = TestClient(max_hack.app).post("/recommend-events", json=body)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(max_hack.RETRY_AFTER_SECONDS)
+
+
+def test_process_pool_matches_thread_pool_without_shipping_the_catalog(tmp_path, monkeypatch):
+    # Воркеры пула читают настройки из окружения при импорте max_hack.
+    monkeypatch.setenv("RECOMMENDER_EXECUTOR", "process")
+    monkeypatch.setenv("RECOMMENDER_SNAPSHOT_DIR", str(tmp_path / "snapshot"))
+    monkeypatch.setenv("MODEL_DIR", str(tmp_path / "models"))
+    events = make_events(120)
+    profile = make_profile(events, 30)
+    version = CatalogStore(str(tmp_path / "snapshot")).replace(events)
+    by_version = CatalogRef(f"version:{version}", version=version)
+    by_content = CatalogRef(catalog_key(events), events=events)
+    assert len(pickle.dumps(by_version)) < 200
+
+    threads = RecommendationExecutor("thread", workers=1, max_queue=0)
+    processes = RecommendationExecutor("process", workers=1, max_queue=1)
+
+    async def main():
+        expected = await threads.run(recommend_events_with_path, profile, max_hack.EventCatalog(events), {}, 5)
+        return expected, [
+            await processes.run(recommend_events_with_path, profile, ref, {}, 5) for ref in (by_version, by_content)
+        ]
+
+    try:
+        expected, actual = asyncio.run(main())
+    finally:
+        threads.shutdown()
+        processes.shutdown()
+    # Второй запрос в том же воркере берёт обученную модель из его MODEL_CACHE.
+    assert [path for _, path in actual] == ["full", "cached"]
+    assert [recommendations for recommendations, _ in actual] == [expected[0], expected[0]]
+
+
+def test_catalog_is_built_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(max_hack, "CATALOG", CatalogStore())
+    calls = []
+
+    def record(name, fn):
+        def wrapper(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                calls.append((name, "event loop"))
+            except RuntimeError:
+                calls.append((name, "worker"))
+            return fn(*args, **kwargs)
+        return wrapper
+
+    for name in ("catalog_key", "cached_catalog"):
+        monkeypatch.setattr(max_hack, name, record(name, getattr(max_hack, name)))
+    monkeypatch.setattr(CatalogStore, "_publish", record("_publish", CatalogStore._publish))
+    events = make_events(40, seed=7)
+    as_json = [json.loads(event.json()) for event in events]
+    profile = json.loads(make_profile(events, 5).json())
+    client = TestClient(max_hack.app)
+
+    assert client.post("/recommend-events", json={"user_profile": profile, "events": as_json}).status_code == 200
+    assert client.put("/catalog", json={"events": as_json}).status_code == 200
+    assert client.patch("/catalog", json={"base_version": 1, "remove": [events[0].event_id]}).status_code == 200
+    assert {name for name, _ in calls} == {"catalog_key", "cached_catalog", "_publish"}
+    assert {where for _, where in calls} == {"worker"}
@@ -0,0 +1,193 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from max_hack import (
+    Event, EventAttendance, EventCatalog, EventRecommendationModel, SpecializationMatcher, UserProfile, cached_catalog, catalog_key,
+    top_k_indices,
+)
+from skills import AVAILABLE_SKILLS
+from universities import TARGET_UNIVERSITIES
+
+UNIVERSITIES = {
+    "МФТИ": ["Machine Learning", "Data Science", "Computer Vision"],
+    "VK Education": ["Web Development", "Data Science", "Mobile Development"],
+}
+ORGANIZERS = ["МФТИ", "ИТМО", "VK Education", "Test Org"]
+LOCATIONS = ["Онлайн", "МФТИ", "Долгопрудный", "Москва", "Санкт-Петербург"]
+LEVELS = [None, "начальный", "средний", "продвинутый", "начальный средний продвинутый"]
+
+
+def make_events(n, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, 9, 0)
+    return [
+        Event(
+            event_id=i,
+            title=f"Мероприятие {i}",
+            organizer=rng.choice(ORGANIZERS),
+            recommended_skills=rng.sample(AVAILABLE_SKILLS, rng.randint(0, 4)),
+            datetime=start + timedelta(hours=rng.randint(0, 24 * 60)),
+            duration_minutes=rng.choice([60, 90, 180]),
+            location=rng.choice(LOCATIONS),
+            max_participants=rng.randint(10, 200),
+            category="course",
+            уровень=rng.choice(LEVELS),
+        )
+        for i in range(n)
+    ]
+
+
+def make_profile(events, n_visited, seed=0, education_place="МФТИ"):
+    rng = random.Random(seed)
+    visited = rng.sample(events, n_visited)
+    return UserProfile(
+        user_id=1,
+        interesting_skills=["Machine Learning", "Python", "Data Science"],
+        education_place=education_place,
+        visited_events=[
+            EventAttendance(event_id=e.event_id, attended=rng.random() > 0.2, rating=rng.randint(1, 5))
+            for e in visited
+        ],
+    )
+
+
+def test_batch_features_match_per_row():
+    events = make_events(300)
+    for education_place in ["МФТИ", "ИТМО", "Неизвестный вуз", None]:
+        profile = make_profile(events, 20, education_place=education_place)
+        model = EventRecommendationModel(university_specializations=UNIVERSITIES)
+        model.compute_organizer_stats(profile, events)
+
+        expected = np.array([model.create_event_features(profile, e) for e in events], dtype=np.float64)
+        actual = model.create_event_features_batch(profile, events)
+
+        assert actual.shape == expected.shape
+        assert np.array_equal(actual, expected)
+
+
+def test_batch_features_with_target_universities():
+    events = make_events(100, seed=1)
+    profile = make_profile(events, 5, seed=1, education_place=next(iter(TARGET_UNIVERSITIES)))
+    model = EventRecommendationModel()
+
+    expected = np.array([model.create_event_features(profile, e) for e in events], dtype=np.float64)
+    assert np.array_equal(model.create_event_features_batch(profile, events), expected)
+
+
+def test_batch_probabilities_match_per_row():
+    events = make_events(200, seed=2)
+    profile = make_profile(events, 40, seed=2)
+    model = EventRecommendationModel(university_specializations=UNIVERSITIES)
+    assert model.train(profile, events)
+
+    expected = np.array([model.predict_probability(profile, e) for e in events])
+    assert np.array_equal(model.predict_probabilities(profile, events), expected)
+
+
+def test_batch_heuristic_matches_per_row():
+    events = make_events(200, seed=3)
+    profile = make_profile(events, 0, seed=3)
+    model = EventRecommendationModel()
+
+    expected = np.array([model._heuristic_prediction(profile, e) for e in events])
+    assert np.array_equal(model.predict_probabilities(profile, events), expected)
+
+
+def test_top_k_matches_full_sort():
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        scores = rng.integers(0, 5, rng.integers(0, 60)) / 4.0
+        k = int(rng.integers(1, 70))
+        expected = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:k]
+        assert list(top_k_indices(scores, k)) == expected
+
+
+def test_candidate_rows_keep_indexed_events_within_budget():
+    events = make_events(400, seed=6)
+    profile = make_profile(events, 30, seed=6)
+    catalog = EventCatalog(events)
+    unvisited = catalog.unvisited_rows(profile)
+
+    rows, report = catalog.candidate_rows(profile, recall_budget=0)
+    assert rows == unvisited and report["retrieval"] == report["budget"] == 0
+
+    rows, report = catalog.candidate_rows(profile, recall_budget=50)
+    assert len(rows) == 50 and rows == sorted(rows) and set(rows) <= set(unvisited)
+    assert report["visited"] + report["retrieval"] + report["budget"] + len(rows) == len(events)
+
+    user_skills = set(profile.interesting_skills)
+    near = catalog.near_user(profile)
+    organizers = {catalog.events[row].organizer for attendance, row in catalog.visited_rows(profile) if attendance.attended}
+    for row in rows:
+        event = catalog.events[row]
+        assert user_skills & catalog.skill_sets[row] or near[row] or catalog.is_online[row] or event.organizer in organizers
+
+
+def test_identical_event_lists_share_cached_catalog():
+    events = make_events(50, seed=7)
+    catalog = cached_catalog(events)
+    # Те же мероприятия, заново разобранные из JSON, как в следующем запросе.
+    assert cached_catalog([Event(**e.model_dump()) for e in events]) is catalog
+
+    changed = events[:-1] + [events[-1].model_copy(update={"max_participants": events[-1].max_participants + 1})]
+    assert cached_catalog(changed) is not catalog
+
+
+def test_catalog_key_distinguishes_nearly_identical_lists():
+    events = make_events(3, seed=7)
+    # Встроенный hash(-1) == hash(-2): ключ не должен на этом совпадать.
+    first = [events[0].model_copy(update={"event_id": -1})] + events[1:]
+    second = [events[0].model_copy(update={"event_id": -2})] + events[1:]
+    assert catalog_key(first) != catalog_key(second)
+    assert cached_catalog(first) is not cached_catalog(second)
+
+    retitled = events[:-1] + [events[-1].model_copy(update={"title": events[-1].title + " "})]
+    assert catalog_key(retitled) != catalog_key(events)
+
+
+def test_matcher_cache_is_safe_across_threads():
+    skills = [skill for skill in AVAILABLE_SKILLS if skill.isalpha()][:SpecializationMatcher.MAX_CACHED * 2]
+
+    def lookup(i):
+        skill = skills[i % len(skills)]
+        matcher = SpecializationMatcher.for_universities({"Test Org": [skill]})
+        return matcher.matrix[matcher.rows["Test Org"], AVAILABLE_SKILLS.index(skill)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert all(pool.map(lookup, range(100)))
+    assert len(SpecializationMatcher._cache) <= SpecializationMatcher.MAX_CACHED
+
+
+def test_catalog_indexes_match_naive_scans():
+    events = make_events(200, seed=9)
+    catalog = EventCatalog(events)
+    profile = make_profile(events, 25, seed=9)
+    profile.visited_events.append(EventAttendance(event_id=10_000, attended=True, rating=5))
+
+    for event_id in [e.event_id for e in events[::7]] + [10_000]:
+        assert catalog.get(event_id) is next((e for e in events if e.event_id == event_id), None)
+    assert [(attendance, catalog.events[row]) for attendance, row in catalog.visited_rows(profile)] == [
+        (attendance, next(e for e in events if e.event_id == attendance.event_id))
+        for attendance in profile.visited_events
+        if any(e.event_id == attendance.event_id for e in events)
+    ]
+    visited_ids = [attendance.event_id for attendance in profile.visited_events]
+    assert catalog.unvisited_rows(profile) == [row for row, e in enumerate(events) if e.event_id not in visited_ids]
+
+    index = catalog.inverted_index()
+    for skill in AVAILABLE_SKILLS[:40] + [skill for e in events[:20] for skill in e.recommended_skills]:
+        indptr, rows = index["skills"]
+        bit = AVAILABLE_SKILLS.index(skill)
+        assert sorted(rows[indptr[bit]:indptr[bit + 1]]) == [
+            row for row, e in enumerate(events) if skill in e.recommended_skills
+        ]
+    for field, postings in (("organizer", index["organizers"]), ("location", index["locations"])):
+        indptr, rows = postings
+        values = list(dict.fromkeys(getattr(e, field) for e in events))
+        for code, value in enumerate(values):
+            assert sorted(rows[indptr[code]:indptr[code + 1]]) == [
+                row for row, e in enumerate(events) if getattr(e, field) == value
+            ]
@@ -0,0 +1,32 @@
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from forest_compiler import CompiledForest
+from max_hack import N_FEATURES, EventRecommendationModel
+from test_features import UNIVERSITIES, make_events, make_profile
+
+
+def test_compiled_forest_is_bit_identical():
+    rng = np.random.default_rng(0)
+    for seed, params in enumerate([{"n_estimators": 100}, {"n_estimators": 20, "max_depth": 6}, {"n_estimators": 5}]):
+        X = rng.normal(size=(300, N_FEATURES))
+        y = (X[:, 0] - X[:, 3] + rng.normal(scale=0.7, size=300) > 0).astype(int)
+        forest = RandomForestClassifier(random_state=seed, **params).fit(X, y)
+        compiled = CompiledForest.from_sklearn(forest)
+
+        for batch_size in (1, 7, 256):
+            batch = rng.normal(size=(batch_size, N_FEATURES))
+            assert np.array_equal(compiled.predict_proba(batch), forest.predict_proba(batch))
+
+
+def test_model_scoring_matches_sklearn():
+    events = make_events(300, seed=4)
+    profile = make_profile(events, 80, seed=4)
+    model = EventRecommendationModel(university_specializations=UNIVERSITIES)
+    assert model.train(profile, events)
+    assert model.compiled is not None
+
+    rows = list(range(CompiledForest.MAX_BATCH_ROWS))
+    features = model.create_event_features_batch(profile, events, rows)
+    expected = model.model.predict_proba(model.scaler.transform(features))[:, 1]
+    assert np.array_equal(model.predict_probabilities(profile, events, rows), expected)
@@ -0,0 +1,84 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import max_hack
+import metrics
+from max_hack import recommend_events
+from test_features import make_events, make_profile
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Test.", "stage", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe("fit", value)
+    lines = histogram.render()
+    assert 'test_seconds_bucket{stage="fit",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{stage="fit",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{stage="fit",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{stage="fit"} 4' in lines
+
+
+def test_recommend_events_reports_stages_and_tier():
+    events = make_events(100, seed=4)
+    profile = make_profile(events, 30, seed=4)
+    result, timings = metrics.run_collected(recommend_events, profile, events, {}, 5)
+
+    assert len(result) == 5
+    assert {"catalog", "features", "fit", "predict", "select", "serialize"} <= set(timings["stages"])
+    assert timings["tiers"] == {"small_forest": 1}
+
+
+def test_stage_is_noop_without_collector():
+    with metrics.stage("features"):
+        pass
+    assert metrics._CURRENT.get() is None
+
+
+def test_deadline_picks_cheaper_path():
+    events = [json.loads(e.model_dump_json()) for e in make_events(60, seed=8)]
+    profile = json.loads(make_profile(make_events(60, seed=8), 20, seed=8).model_dump_json())
+    profile["user_id"] = 8001
+    client = TestClient(max_hack.app)
+
+    def path(user_profile, **headers):
+        body = {"user_profile": user_profile, "events": events}
+        return client.post("/recommend-events", json=body, headers=headers).json()["path"]
+
+    try:
+        assert path(profile) == "full"
+        # Обучение леса заведомо не укладывается в срок: остаются кэш и эвристика.
+        metrics.RECENT_STAGES.observe(metrics.fit_stage(max_hack.model_tier(20)), 10.0)
+        assert path(profile, **{"X-Request-Deadline-Ms": "1000"}) == "cached"
+        assert path(dict(profile, user_id=8002), **{"X-Request-Deadline-Ms": "1000"}) == "heuristic"
+        # Короткую историю учит наивный байес, его цена не зависит от цены леса.
+        short = dict(profile, user_id=8003, visited_events=profile["visited_events"][:3])
+        assert path(short, **{"X-Request-Deadline-Ms": "1000"}) == "full"
+        assert client.post("/recommend-events", json={"user_profile": profile, "events": events},
+                           headers={"X-Request-Deadline-Ms": "soon"}).status_code == 422
+    finally:
+        metrics.RECENT_STAGES.clear()
+
+
+def test_stale_estimate_is_probed_once_and_then_replaced():
+    now = [0.0]
+    stages = metrics.RecentStages(max_age=30.0, clock=lambda: now[0])
+    stages.observe("fit.forest", 5.0)
+    assert stages.estimate(["fit.forest"]) == 5.0
+
+    # Без новых измерений один запрос пробует этап, остальные видят старую оценку.
+    now[0] = 31.0
+    assert stages.estimate(["fit.forest"]) == 0.0
+    assert stages.estimate(["fit.forest"]) == 5.0
+    # Измерение пробы заменяет устаревшее среднее, а не усредняется с ним.
+    stages.observe("fit.forest", 0.2)
+    assert stages.estimate(["fit.forest"]) == 0.2
+    stages.observe("fit.forest", 0.4)
+    assert abs(stages.estimate(["fit.forest"]) - 0.24) < 1e-12
+
+
+def test_fits_are_estimated_per_tier():
+    events = make_events(60, seed=8)
+    with metrics.collect() as timings:
+        recommend_events(make_profile(events, 5, seed=8), events, {}, 3)
+    assert list(timings.fits) == ["naive_bayes"] and timings.fits["naive_bayes"][0] == 1
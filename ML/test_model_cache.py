@@ -0,0 +1,48 @@
+from max_hack import ModelCache
+
+
+def test_hits_and_misses_are_counted():
+    cache = ModelCache(max_entries=4, max_bytes=1024, ttl_seconds=60)
+    assert cache.get("a") is None
+    cache.put("a", "model", 10)
+    assert cache.get("a") == "model"
+    assert cache.get("a") == "model"
+    assert cache.stats() == {"entries": 1, "bytes": 10, "hits": 2, "misses": 1, "evictions": 0}
+
+
+def test_least_recently_used_entries_are_evicted_over_the_byte_limit():
+    cache = ModelCache(max_entries=10, max_bytes=100, ttl_seconds=60)
+    cache.put("a", "a", 40)
+    cache.put("b", "b", 40)
+    cache.get("a")
+    cache.put("c", "c", 40)
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" and cache.get("c") == "c"
+    assert cache.stats()["bytes"] == 80 and cache.stats()["evictions"] == 1
+
+    cache.put("a", "a", 90)
+    assert cache.get("c") is None
+    assert cache.stats()["entries"] == 1 and cache.stats()["bytes"] == 90
+
+
+def test_entry_limit_evicts_in_lru_order():
+    cache = ModelCache(max_entries=2, max_bytes=1024, ttl_seconds=60)
+    for key in "abc":
+        cache.put(key, key, 1)
+    assert cache.get("a") is None
+    assert cache.get("b") == "b" and cache.get("c") == "c"
+
+
+def test_entries_expire_after_ttl():
+    now = [0.0]
+    cache = ModelCache(max_entries=4, max_bytes=1024, ttl_seconds=60, clock=lambda: now[0])
+    cache.put("a", "model", 10)
+    now[0] = 60.0
+    assert cache.get("a") == "model"
+    now[0] = 60.5
+    assert cache.get("a") is None
+    assert cache.stats() == {"entries": 0, "bytes": 0, "hits": 1, "misses": 1, "evictions": 0}
+
+    cache.put("a", "retrained", 10)
+    now[0] = 100.0
+    assert cache.get("a") == "retrained"
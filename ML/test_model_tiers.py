@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from sklearn.naive_bayes import GaussianNB
+
+from max_hack import (
+    FOREST_PARAMS, NAIVE_BAYES_MAX_SAMPLES, SMALL_FOREST_MAX_SAMPLES, SMALL_FOREST_PARAMS, EventAttendance,
+    EventCatalog, EventRecommendationModel, GaussianNaiveBayes, UserProfile,
+)
+from test_features import make_events
+
+
+def labeled_profile(events, n_visited):
+    return UserProfile(
+        user_id=1000 + n_visited,
+        interesting_skills=["Python"],
+        visited_events=[
+            EventAttendance(event_id=e.event_id, attended=True, rating=5 if i % 2 else 1)
+            for i, e in enumerate(events[:n_visited])
+        ],
+    )
+
+
+@pytest.mark.parametrize("n_visited, tier", [
+    (2, "naive_bayes"),
+    (NAIVE_BAYES_MAX_SAMPLES - 1, "naive_bayes"),
+    (NAIVE_BAYES_MAX_SAMPLES, "small_forest"),
+    (SMALL_FOREST_MAX_SAMPLES - 1, "small_forest"),
+    (SMALL_FOREST_MAX_SAMPLES, "forest"),
+])
+def test_tier_follows_history_size(n_visited, tier):
+    catalog = EventCatalog(make_events(SMALL_FOREST_MAX_SAMPLES + 20))
+    model = EventRecommendationModel()
+    assert model.train(labeled_profile(catalog.events, n_visited), catalog)
+    assert model.tier == tier
+    if tier == "naive_bayes":
+        assert isinstance(model.model, GaussianNaiveBayes) and model.compiled is None
+    else:
+        params = SMALL_FOREST_PARAMS if tier == "small_forest" else FOREST_PARAMS
+        assert model.model.n_estimators == params["n_estimators"]
+
+    probabilities = model.predict_probabilities(labeled_profile(catalog.events, n_visited), catalog)
+    assert probabilities.shape == (len(catalog),)
+    assert np.all((probabilities >= 0) & (probabilities <= 1))
+
+
+def test_single_class_history_stays_heuristic():
+    catalog = EventCatalog(make_events(20))
+    profile = labeled_profile(catalog.events, 4)
+    for attendance in profile.visited_events:
+        attendance.rating = 5
+    model = EventRecommendationModel()
+    assert not model.train(profile, catalog)
+    assert model.tier == "heuristic"
+
+
+def test_naive_bayes_matches_sklearn_with_the_same_variances():
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(8, 5))
+    labels = np.array([0, 1, 0, 1, 1, 0, 1, 1])
+    batch = rng.normal(size=(50, 5))
+
+    model = GaussianNaiveBayes().fit(features, labels)
+    reference = GaussianNB().fit(features, labels)
+    assert np.allclose(model.theta_, reference.theta_)
+    assert np.allclose(np.exp(model.log_prior_), reference.class_prior_)
+    reference.var_ = model.var_
+    assert np.allclose(model.predict_proba(batch), reference.predict_proba(batch))
+
+
+def test_naive_bayes_separates_distinct_classes():
+    features = np.array([[0.0, 0.0], [0.1, -0.1], [5.0, 5.0], [5.1, 4.9]])
+    model = GaussianNaiveBayes().fit(features, np.array([0, 0, 1, 1]))
+    probabilities = model.predict_proba(np.array([[0.0, 0.1], [5.0, 5.1]]))
+    assert probabilities[0, 0] > 0.9 and probabilities[1, 1] > 0.9
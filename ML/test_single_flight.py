@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from max_hack import ModelCache
+from single_flight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_computation():
+    flights = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        call = len(calls)
+        await asyncio.sleep(0.01)
+        return call
+
+    async def main():
+        return await asyncio.gather(*(flights.run("user:1", compute) for _ in range(5)), flights.run("user:2", compute))
+
+    assert asyncio.run(main()) == [1, 1, 1, 1, 1, 2]
+    assert flights.stats() == {"in_flight": 0, "computed": 2, "coalesced": 4}
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    flights = SingleFlight(results=ModelCache(max_entries=8, max_bytes=1024, ttl_seconds=60))
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(flights.run("key", fail), flights.run("key", fail), return_exceptions=True)
+
+    assert [type(e) for e in asyncio.run(main())] == [ValueError, ValueError]
+    with pytest.raises(ValueError):
+        asyncio.run(flights.run("key", fail))
+    assert flights.computed == 2
+
+
+def test_result_cache_answers_repeated_calls():
+    flights = SingleFlight(results=ModelCache(max_entries=8, max_bytes=1024, ttl_seconds=60))
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return "recommendations"
+
+    assert asyncio.run(flights.run("key", compute)) == "recommendations"
+    assert asyncio.run(flights.run("key", compute)) == "recommendations"
+    assert len(calls) == 1
+    assert flights.stats()["results"]["hits"] == 1
@@ -0,0 +1,29 @@
+import numpy as np
+
+from skill_taxonomy import SKILL_SIMILARITY, skill_affinity, soft_overlap
+from skills import SKILL_INDEX, skill_masks
+
+
+def similarity(a, b):
+    return SKILL_SIMILARITY[SKILL_INDEX[a], SKILL_INDEX[b]]
+
+
+def test_similarity_is_symmetric_with_unit_diagonal():
+    assert np.array_equal(SKILL_SIMILARITY, SKILL_SIMILARITY.T)
+    assert np.all(np.diag(SKILL_SIMILARITY) == 1.0)
+    assert similarity("Machine Learning", "AI") == 0.75
+    assert similarity("React", "Frontend") == 0.75
+    assert similarity("Next.js", "Frontend") == 0.5
+    assert similarity("iOS", "Android") == 0.5
+    assert similarity("Django", "Flask") == 0.25
+    assert similarity("Chemistry", "React") == 0.0
+
+
+def test_soft_overlap_matches_per_event_sum():
+    events = [["AI", "Frontend"], ["Python"], [], ["Chemistry"], ["Machine Learning", "React", "Python"]]
+    affinity = skill_affinity(["Machine Learning", "React"])
+
+    expected = [sum(affinity[SKILL_INDEX[skill]] for skill in skills) for skills in events]
+    assert soft_overlap(skill_masks(events), affinity).tolist() == expected
+    assert expected[0] == 1.5 and expected[3] == 0.0
+    assert not skill_affinity([]).any()
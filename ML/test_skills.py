@@ -0,0 +1,32 @@
+import random
+
+import numpy as np
+
+from skills import AVAILABLE_SKILLS, pack_skill_matrix, popcount, skill_mask, skill_masks, unpack_skill_masks
+
+
+def random_skill_lists(n, seed=0):
+    rng = random.Random(seed)
+    return [rng.sample(AVAILABLE_SKILLS, rng.randint(0, 12)) for _ in range(n)]
+
+
+def test_popcount_overlap_matches_set_intersection():
+    skill_lists = random_skill_lists(300)
+    masks = skill_masks(skill_lists)
+    for user_skills in random_skill_lists(20, seed=1) + [[], AVAILABLE_SKILLS[-3:]]:
+        user_mask = skill_mask(user_skills)
+        assert popcount(masks & user_mask).tolist() == [len(set(user_skills) & set(s)) for s in skill_lists]
+        assert popcount(masks | user_mask).tolist() == [len(set(user_skills) | set(s)) for s in skill_lists]
+    assert popcount(masks).tolist() == [len(set(s)) for s in skill_lists]
+
+
+def test_masks_round_trip_through_the_dense_matrix():
+    skill_lists = random_skill_lists(100, seed=2)
+    masks = skill_masks(skill_lists)
+    assert np.array_equal(np.stack([skill_mask(s) for s in skill_lists]), masks)
+
+    matrix = unpack_skill_masks(masks)
+    assert [[AVAILABLE_SKILLS[bit] for bit in np.flatnonzero(row)] for row in matrix] == [
+        sorted(set(s), key=AVAILABLE_SKILLS.index) for s in skill_lists
+    ]
+    assert np.array_equal(pack_skill_matrix(matrix.astype(bool)), masks)
@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+import max_hack
+import model_store
+import snapshot
+from forest_compiler import CompiledForest
+from max_hack import CatalogStore, EventCatalog, EventRecommendationModel, N_FEATURES, top_k_indices
+from stats_store import StatsStore
+from test_features import make_events, make_profile
+
+
+def test_global_model_snapshot_matches_artifact(tmp_path):
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(200, N_FEATURES))
+    labels = (features[:, 0] > 0).astype(int)
+    scaler = StandardScaler()
+    forest = RandomForestClassifier(n_estimators=10, random_state=42).fit(scaler.fit_transform(features), labels)
+    model_store.save_artifact(
+        {"feature_version": max_hack.FEATURE_VERSION, "model": forest, "scaler": scaler}, str(tmp_path / "models")
+    )
+
+    try:
+        from_artifact = max_hack.load_global_model(str(tmp_path / "models"), str(tmp_path / "snapshot"))
+        from_snapshot = max_hack.load_global_model(str(tmp_path / "models"), str(tmp_path / "snapshot"))
+    finally:
+        max_hack.GLOBAL_MODEL = None
+    assert from_artifact["model"] is not None and from_snapshot["model"] is None
+    assert isinstance(from_snapshot["compiled"].value, np.memmap)
+
+    batch = rng.normal(size=(300, N_FEATURES))
+    expected = EventRecommendationModel.from_artifact(from_artifact)
+    actual = EventRecommendationModel.from_artifact(from_snapshot)
+    assert np.array_equal(
+        actual._positive_probability(actual._scale(batch)), expected._positive_probability(expected._scale(batch))
+    )
+
+
+def test_global_model_ranking_matches_naive_per_event_scoring():
+    rng = np.random.default_rng(1)
+    features = rng.normal(size=(300, N_FEATURES))
+    labels = (features[:, 1] + features[:, 14] > 0).astype(int)
+    scaler = StandardScaler()
+    forest = RandomForestClassifier(n_estimators=20, random_state=42).fit(scaler.fit_transform(features), labels)
+    artifact = {"model": forest, "scaler": scaler, "compiled": CompiledForest.from_sklearn(forest)}
+    events = make_events(150, seed=4)
+    catalog = EventCatalog(events)
+    profile = make_profile(events, 20, seed=4)
+
+    model = EventRecommendationModel.from_artifact(artifact, stats_store=StatsStore(max_users=1))
+    assert model.prepare_inference(profile, catalog)
+    rows = catalog.unvisited_rows(profile)
+    probabilities = model.predict_probabilities(profile, catalog, rows)
+
+    naive = [
+        forest.predict_proba(scaler.transform([model.create_event_features(profile, catalog.events[row])]))[0, 1]
+        for row in rows
+    ]
+    assert np.allclose(probabilities, naive)
+    top = top_k_indices(probabilities, 10)
+    assert np.allclose(probabilities[top], sorted(naive, reverse=True)[:10])
+
+
+def test_shared_catalog_follows_other_workers(tmp_path):
+    events = make_events(40)
+    first, second = CatalogStore(str(tmp_path)), CatalogStore(str(tmp_path))
+
+    version = first.replace(events[:30])
+    seen_version, catalog = second.snapshot(version)
+    assert seen_version == version
+    assert np.array_equal(catalog.event_features, first.snapshot()[1].event_features)
+    assert isinstance(catalog.skill_masks, np.memmap)
+    assert isinstance(catalog.text_index.data, np.memmap)
+    assert np.array_equal(catalog.text_index.data, first.snapshot()[1].text_index.data)
+
+    delta_version = second.apply_delta(version, upsert=events[30:], remove=[events[0].event_id])
+    assert delta_version == version + 1
+    latest_version, latest = first.snapshot()
+    assert latest_version == delta_version
+    assert sorted(e.event_id for e in latest.events) == sorted(e.event_id for e in events[1:])
+
+
+def test_republishing_a_version_keeps_attached_snapshot_readable(tmp_path):
+    with snapshot.locked(str(tmp_path), "model"):
+        first_path = snapshot.publish(str(tmp_path), "model", 1, {"values": np.arange(4)}, {})
+    attached, _ = snapshot.attach(str(tmp_path), snapshot.read_pointer(str(tmp_path), "model"))
+
+    with snapshot.locked(str(tmp_path), "model"):
+        second_path = snapshot.publish(str(tmp_path), "model", 1, {"values": np.arange(4) * 2}, {})
+    assert second_path != first_path and os.path.isdir(first_path)
+    assert np.array_equal(attached["values"], np.arange(4))
+    version, arrays, _ = snapshot.load_current(str(tmp_path), "model")
+    assert version == 1 and np.array_equal(arrays["values"], np.arange(4) * 2)
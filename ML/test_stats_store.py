@@ -0,0 +1,87 @@
+from max_hack import MODEL_CACHE, STATS_STORE, EventAttendance, EventCatalog, EventRecommendationModel, warm_up
+from stats_store import StatsStore
+from test_features import make_events, make_profile
+
+
+def reference_stats(profile, catalog):
+    model = EventRecommendationModel()
+    model.compute_organizer_stats(profile, catalog)
+    model.compute_skill_importance(profile, catalog)
+    return model.organizer_stats, model.skill_importance
+
+
+def stored_stats(profile, catalog):
+    model = EventRecommendationModel()
+    model.load_user_stats(profile, catalog)
+    return model.organizer_stats, model.skill_importance
+
+
+def test_incremental_updates_match_recomputed_stats():
+    catalog = EventCatalog(make_events(60))
+    profile = make_profile(catalog.events, 20)
+    assert stored_stats(profile, catalog) == reference_stats(profile, catalog)
+
+    # Новая запись, изменённая оценка и отмена записи через record/remove.
+    new_event, rerated, removed = catalog.events[50], profile.visited_events[0], profile.visited_events[1]
+    for event_id, rating in ((new_event.event_id, 5), (rerated.event_id, 1)):
+        event = catalog.get(event_id)
+        assert STATS_STORE.record(profile.user_id, event_id, True, rating, event.organizer, tuple(event.recommended_skills))
+    assert STATS_STORE.remove(profile.user_id, removed.event_id)
+
+    visits = [v for v in profile.visited_events if v.event_id not in (rerated.event_id, removed.event_id)]
+    visits += [EventAttendance(event_id=rerated.event_id, attended=True, rating=1),
+               EventAttendance(event_id=new_event.event_id, attended=True, rating=5)]
+    updated = profile.model_copy(update={"visited_events": visits})
+
+    hits = STATS_STORE.stats()["hits"]
+    assert stored_stats(updated, catalog) == reference_stats(updated, catalog)
+    assert STATS_STORE.stats()["hits"] == hits + 1
+
+
+def test_stale_history_is_rebuilt():
+    catalog = EventCatalog(make_events(30))
+    profile = make_profile(catalog.events, 10, seed=1)
+    profile = profile.model_copy(update={"user_id": 1001})
+    stored_stats(profile, catalog)
+
+    shorter = profile.model_copy(update={"visited_events": profile.visited_events[:4]})
+    assert stored_stats(shorter, catalog) == reference_stats(shorter, catalog)
+    assert not STATS_STORE.record(424242, 0, True, 5, "ИТМО", ())
+
+
+def test_history_with_same_length_but_other_events_is_rebuilt():
+    store = StatsStore(max_users=10)
+    history = [(0, True, 5, "org0", ("Python",)), (1, True, 1, "org1", ())]
+    store.user_stats(7, history)
+    # Тот же набор в другом порядке - та же запись.
+    assert store.user_stats(7, history[::-1]) == store.user_stats(7, history)
+    assert store.stats()["rebuilds"] == 1
+
+    swapped = [(2, True, 5, "org2", ("Python",)), (3, True, 1, "org3", ())]
+    assert set(store.user_stats(7, swapped)[0]) == {"org2", "org3"}
+    # Новая оценка без /feedback тоже меняет отпечаток.
+    rerated = [(2, True, 2, "org2", ("Python",)), swapped[1]]
+    assert store.user_stats(7, rerated)[0]["org2"]["avg_rating"] == 2
+    assert store.stats()["rebuilds"] == 3
+
+    assert store.user_stats(8, [history[0], history[0]]) is None
+
+
+def test_record_and_remove_keep_the_fingerprint_current():
+    store = StatsStore(max_users=10)
+    history = [(0, True, 5, "org0", ("Python",)), (1, True, 1, "org1", ())]
+    store.user_stats(7, history)
+    store.record(7, 1, True, 4, "org1", ())
+    store.record(7, 2, True, 5, "org2", ("Go",))
+    store.remove(7, 0)
+
+    assert store.user_stats(7, [(1, True, 4, "org1", ()), (2, True, 5, "org2", ("Go",))])[0]["org1"]["avg_rating"] == 4
+    assert store.stats()["hits"] == 1 and store.stats()["rebuilds"] == 1
+
+
+def test_warm_up_leaves_production_stores_untouched():
+    stats, cached, global_stats = STATS_STORE.stats(), MODEL_CACHE.stats(), STATS_STORE.global_stats()
+    warm_up()
+    assert STATS_STORE.stats() == stats
+    assert MODEL_CACHE.stats() == cached
+    assert STATS_STORE.global_stats() == global_stats
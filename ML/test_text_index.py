@@ -0,0 +1,47 @@
+import numpy as np
+
+from max_hack import EventAttendance, UserProfile, blend_text, cached_catalog
+from test_features import make_events
+from text_index import TextIndex, tokenize
+
+TEXTS = [
+    ("Машинное обучение на Python", "Введение в нейронные сети"),
+    ("Основы машинного обучения", "Практикум по нейронным сетям"),
+    ("Хакатон по веб-разработке", None),
+    ("Турнир по шахматам", "Блиц и рапид"),
+    ("", None),
+]
+
+
+def test_tokenize_folds_russian_inflections():
+    assert tokenize("Машинное обучение, нейронные сети") == tokenize("машинного обучения и нейронных сетей")
+    assert tokenize("Ёлка") == tokenize("елки")
+    assert tokenize(None) == []
+
+
+def test_scores_rank_similar_texts_first():
+    index = TextIndex.build(TEXTS)
+    profile = index.profile(np.array([0]), np.array([1.0]))
+    scores = index.scores(profile, np.arange(len(TEXTS)))
+
+    assert scores[0] == max(scores)
+    assert scores[1] > scores[2] == scores[3] == scores[4] == 0
+    assert index.profile(np.array([4]), np.array([1.0])) is None
+
+    restored = TextIndex.from_arrays(index.to_arrays(), index.n_terms)
+    assert np.array_equal(restored.scores(profile, np.array([3, 1])), scores[[3, 1]])
+
+
+def test_blend_text_prefers_events_like_liked_ones():
+    events = make_events(len(TEXTS))
+    for event, (title, description) in zip(events, TEXTS):
+        event.title, event.description = title or "-", description
+    catalog = cached_catalog(events)
+    rows = [1, 2, 3]
+    probabilities = np.full(len(rows), 0.5)
+    liked = UserProfile(user_id=1, visited_events=[EventAttendance(event_id=0, attended=True, rating=5)])
+
+    blended = blend_text(liked, catalog, rows, probabilities, weight=0.5)
+    assert blended[0] > blended[1] == blended[2]
+    disliked = UserProfile(user_id=1, visited_events=[EventAttendance(event_id=0, attended=True, rating=2)])
+    assert blend_text(disliked, catalog, rows, probabilities) is probabilities
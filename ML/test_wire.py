@@ -0,0 +1,37 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import max_hack
+import wire
+from skills import SKILL_INDEX
+from test_features import make_events, make_profile
+
+
+def test_msgpack_request_returns_compact_pairs():
+    events = make_events(50, seed=5)
+    profile = json.loads(make_profile(events, 20, seed=5).model_dump_json())
+    events_payload = [json.loads(e.model_dump_json()) for e in events]
+    client = TestClient(max_hack.app)
+
+    expected = client.post("/recommend-events", json={"user_profile": profile, "events": events_payload}).json()
+
+    body = wire.pack({
+        "user_profile": dict(profile, interesting_skills=[SKILL_INDEX[s] for s in profile["interesting_skills"]]),
+        "events": [dict(e, recommended_skills=[SKILL_INDEX[s] for s in e["recommended_skills"]]) for e in events_payload],
+    })
+    response = client.post(
+        "/recommend-events",
+        content=body,
+        headers={"Content-Type": wire.MSGPACK_MEDIA_TYPE, "Accept": wire.MSGPACK_MEDIA_TYPE},
+    )
+
+    assert response.headers["content-type"] == wire.MSGPACK_MEDIA_TYPE
+    pairs = wire.unpack(response.content)["recommendations"]
+    assert pairs == [[r["event_id"], r["interest_probability"]] for r in expected["recommendations"]]
+
+
+def test_unknown_skill_id_is_rejected():
+    body = wire.pack({"user_profile": {"user_id": 1, "interesting_skills": [10 ** 6]}, "events": []})
+    response = TestClient(max_hack.app).post("/recommend-events", content=body, headers={"Content-Type": wire.MSGPACK_MEDIA_TYPE})
+    assert response.status_code == 422
@@ -0,0 +1,149 @@
+"""
+Текстовый индекс мероприятий: TF-IDF по названию и описанию.
+
+Индекс строится один раз на версию каталога (вместе с остальными массивами
+EventCatalog) и хранится как разреженная CSR-матрица мероприятие x термин из трёх
+плоских массивов, поэтому публикуется в снимок каталога и подключается через mmap.
+Строки нормированы, так что скалярное произведение - косинусная близость.
+
+Профиль пользователя - сумма строк понравившихся ему мероприятий (посещено, оценка
+4-5) с весом оценки. Оценка кандидатов - разреженное произведение их строк на профиль.
+
+Токенизация без внешних словарей: нижний регистр, ё -> е, стоп-слова и грубое
+отсечение русских окончаний, чтобы «машинное обучение» и «машинного обучения»
+давали одни и те же термины.
+"""
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[0-9a-zа-я]+")
+# Слова названия весят больше слов описания.
+TITLE_WEIGHT = 2
+MIN_STEM = 3
+
+STOP_WORDS = frozenset("""
+и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только ее мне было
+вот от меня еще нет о об из ему когда даже ну ли если уже или ни быть был него до вас опять уж вам
+там потом себя ничего ей может они тут где есть надо ней для мы тебя их чем была сам чтоб без чего
+раз тоже себе под будет ж тогда кто этот того этого какой здесь этом один мой тем чтобы нее были
+всех можно при два другой после над больше тот через эти нас про всего них какая много три эту
+моя свою этой перед том такой им более всегда между это наш ваш вашей нашей
+the a an and or of to in on for with by is are be at from as this that it your our you we
+""".split())
+
+# Окончания проверяются от длинных к коротким, отсекается первое подошедшее.
+ENDINGS = frozenset("""
+иями ями ами ией ием иях ого его ому ему ыми ими ых их ым им ая яя ое ее ые ие ый ий ой ей ую юю ия ии ию
+ов ев ах ях ам ям ом ем ть ться ет ют ут ит ат ят а я ы и о е у ю ь
+""".split())
+_ENDING_LENGTHS = sorted({len(ending) for ending in ENDINGS}, reverse=True)
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    for length in _ENDING_LENGTHS:
+        if len(word) - length >= MIN_STEM and word[-length:] in ENDINGS:
+            return word[:-length]
+    return word
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [
+        stem(word)
+        for word in TOKEN_RE.findall(text.lower().replace("ё", "е"))
+        if len(word) > 1 and word not in STOP_WORDS
+    ]
+
+
+def _gather(indptr: np.ndarray, rows: np.ndarray) -> tuple:
+    """
+    Позиции ненулевых элементов строк rows в data/indices и номер строки (в rows) для каждой.
+    """
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    owners = np.repeat(np.arange(len(rows)), lengths)
+    offsets = np.cumsum(lengths) - lengths
+    positions = np.arange(int(lengths.sum())) - np.repeat(offsets, lengths) + np.repeat(starts, lengths)
+    return positions, owners
+
+
+class TextIndex:
+    # Массивы, которые сохраняются в снимок.
+    ARRAYS = ("indptr", "indices", "data")
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, n_terms: int):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.n_terms = n_terms
+
+    @classmethod
+    def build(cls, documents: Iterable[tuple]) -> "TextIndex":
+        """
+        Индекс по парам (название, описание) в порядке строк каталога.
+        """
+        vocabulary: Dict[str, int] = {}
+        indptr, indices, counts = [0], [], []
+        for title, description in documents:
+            terms = Counter()
+            for token in tokenize(title):
+                terms[token] += TITLE_WEIGHT
+            terms.update(tokenize(description))
+            for term, count in terms.items():
+                indices.append(vocabulary.setdefault(term, len(vocabulary)))
+                counts.append(count)
+            indptr.append(len(indices))
+
+        indptr = np.asarray(indptr, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int32)
+        n_docs = len(indptr) - 1
+        document_frequency = np.bincount(indices, minlength=len(vocabulary))
+        idf = np.log((1.0 + n_docs) / (1.0 + document_frequency)) + 1.0
+        data = (1.0 + np.log(np.asarray(counts, dtype=np.float64))) * idf[indices]
+
+        rows = np.repeat(np.arange(n_docs), np.diff(indptr))
+        norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=n_docs))
+        data /= np.where(norms > 0, norms, 1.0)[rows]
+        return cls(indptr, indices, data.astype(np.float32), len(vocabulary))
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes
+
+    def profile(self, rows: np.ndarray, weights: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Нормированный вектор пользователя по строкам понравившихся мероприятий;
+        None, если у них нет ни одного термина.
+        """
+        positions, owners = _gather(self.indptr, np.asarray(rows, dtype=np.int64))
+        if len(positions) == 0:
+            return None
+        vector = np.bincount(
+            self.indices[positions], weights=self.data[positions] * np.asarray(weights)[owners], minlength=self.n_terms
+        )
+        norm = math.sqrt(float(vector @ vector))
+        return vector / norm if norm > 0 else None
+
+    def scores(self, profile: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """
+        Косинусная близость строк rows к профилю (0 для мероприятий без текста).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        positions, owners = _gather(self.indptr, rows)
+        return np.bincount(
+            owners, weights=self.data[positions] * profile[self.indices[positions]], minlength=len(rows)
+        )
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], n_terms: int) -> "TextIndex":
+        return cls(arrays["indptr"], arrays["indices"], arrays["data"], n_terms)
@@ -0,0 +1,117 @@
+"""
+Офлайн-обучение глобальной модели рекомендаций.
+
+Собирает обучающую выборку по всем пользователям (записи на мероприятия и отзывы),
+обучает один RandomForest и коллаборативную модель (ALS по матрице записей и отзывов)
+и сохраняет версионированные артефакты, которые сервис загружает при старте.
+
+Примеры:
+    python train_model.py --data training_data.json
+    python train_model.py --backend-url http://backend:8000
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+from typing import List, Tuple
+
+import numpy as np
+import requests
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+import model_store
+from collaborative import DEFAULT_FACTORS, CollaborativeModel
+from max_hack import FEATURE_VERSION, MODEL_DIR, Event, EventCatalog, EventRecommendationModel, UserProfile
+
+
+def load_dataset(data_path: str = None, backend_url: str = None) -> dict:
+    if data_path:
+        with open(data_path, encoding="utf-8") as f:
+            return json.load(f)
+    response = requests.get(f"{backend_url}/recommendations/training-data", timeout=300)
+    response.raise_for_status()
+    return response.json()
+
+
+def build_training_set(users: List[UserProfile], events: List[Event], universities: dict) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Строит признаки так же, как при обучении на истории одного пользователя,
+    но объединяет выборки всех пользователей.
+    """
+    catalog = EventCatalog(events)
+    all_features = []
+    all_labels = []
+    n_users = 0
+
+    for user_profile in users:
+        if not user_profile.visited_events:
+            continue
+        event_model = EventRecommendationModel(university_specializations=universities)
+        features, labels = event_model.collect_training_data(user_profile, catalog)
+        if len(features) == 0:
+            continue
+        all_features.append(features)
+        all_labels.append(labels)
+        n_users += 1
+
+    if not all_features:
+        return np.empty((0, 0)), np.empty(0), 0
+    return np.vstack(all_features), np.concatenate(all_labels), n_users
+
+
+def train(dataset: dict, model_dir: str, n_estimators: int = 100) -> str:
+    users = [UserProfile(**u) for u in dataset.get("users", [])]
+    events = [Event(**e) for e in dataset.get("events", [])]
+    universities = dataset.get("universities", {})
+
+    features, labels, n_users = build_training_set(users, events, universities)
+    if len(features) == 0 or len(np.unique(labels)) < 2:
+        raise SystemExit("Недостаточно данных для обучения: нужны положительные и отрицательные примеры")
+
+    scaler = StandardScaler()
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=42)
+    model.fit(scaler.fit_transform(features), labels)
+
+    artifact = {
+        "feature_version": FEATURE_VERSION,
+        "trained_at": datetime.utcnow().isoformat(),
+        "n_samples": int(len(labels)),
+        "n_users": n_users,
+        "model": model,
+        "scaler": scaler,
+    }
+    return model_store.save_artifact(artifact, model_dir)
+
+
+def train_collaborative(dataset: dict, model_dir: str, factors: int = DEFAULT_FACTORS) -> str:
+    users = dataset.get("users", [])
+    event_ids = [e["event_id"] for e in dataset.get("events", [])]
+    model = CollaborativeModel.fit(users, event_ids, factors=factors)
+    if not model.user_ids:
+        raise SystemExit("Недостаточно данных для коллаборативной модели: нет посещений")
+
+    artifact = model.to_artifact()
+    artifact["trained_at"] = datetime.utcnow().isoformat()
+    return model_store.save_artifact(artifact, os.path.join(model_dir, "collaborative"), prefix="collaborative")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the global event recommendation model")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data", help="JSON file with users, events and universities")
+    source.add_argument("--backend-url", help="Backend base URL to fetch training data from")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--factors", type=int, default=DEFAULT_FACTORS, help="collaborative model latent factors")
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.data, args.backend_url)
+    path = train_collaborative(dataset, args.model_dir, args.factors)
+    print(f"Коллаборативная модель сохранена: {path}")
+    path = train(dataset, args.model_dir, args.n_estimators)
+    print(f"Модель сохранена: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Бинарный формат обмена с бэкендом (msgpack) поверх тех же схем, что и JSON.
+
+Запрос с Content-Type: application/msgpack декодируется и проходит ту же
+валидацию Pydantic, что и JSON. Навыки в нём можно передавать номерами из
+/skills (индекс в AVAILABLE_SKILLS). Если клиент присылает Accept: application/msgpack,
+рекомендации возвращаются компактно: пары (event_id, interest_probability) без полей мероприятия.
+"""
+from datetime import date, datetime
+
+import msgpack
+from fastapi import Request
+from fastapi.routing import APIRoute
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_SUBTYPES = ("msgpack", "x-msgpack", "vnd.msgpack")
+
+
+def _media_types(header: str) -> list:
+    return [part.split(";")[0].strip().lower() for part in header.split(",")] if header else []
+
+
+def is_msgpack(content_type: str) -> bool:
+    return any(media_type == f"application/{subtype}" for media_type in _media_types(content_type) for subtype in _MSGPACK_SUBTYPES)
+
+
+def accepts_msgpack(request: Request) -> bool:
+    return is_msgpack(request.headers.get("accept", ""))
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__} to msgpack")
+
+
+def pack(payload) -> bytes:
+    return msgpack.packb(payload, default=_default, use_bin_type=True)
+
+
+def unpack(data: bytes):
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+class MsgpackRequest(Request):
+    async def json(self):
+        if not hasattr(self, "_json"):
+            self._json = unpack(await self.body())
+        return self._json
+
+
+class MsgpackRoute(APIRoute):
+    """
+    Маршрут, принимающий тело как в JSON, так и в msgpack. FastAPI разбирает тело
+    только для JSON-типов, поэтому для msgpack запрос подменяется на MsgpackRequest
+    с JSON-типом, а декодирование делает MsgpackRequest.json.
+    """
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            if is_msgpack(request.headers.get("content-type", "")):
+                scope = dict(request.scope)
+                scope["headers"] = [
+                    (name, value) for name, value in request.scope["headers"] if name != b"content-type"
+                ] + [(b"content-type", b"application/json")]
+                request = MsgpackRequest(scope, request.receive)
+            return await handler(request)
+
+        return route_handler
@@ -6,14 +6,16 @@ new events. Creating an event does not require authentication in this
 demo application but would normally be restricted.
 """
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, BackgroundTasks, Depends, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from .. import models  # needed for update_event annotations
 
 from ..crud import event as crud
+from ..crud import recommendation as recommendation_crud
 from .. import schemas
+from ..core.ml_client import catalog_sync, ml_event, send_feedback, visit_feedback
 from .deps import get_db
 
 class UserEventPayload(schemas.BaseModel):
@@ -35,38 +37,52 @@ def list_events(user_id: int | None = None, db: Session = Depends(get_db)) -> li
 
 
 @router.post("", response_model=schemas.EventOut, status_code=status.HTTP_201_CREATED)
-def create_event_endpoint(event: schemas.EventBase, db: Session = Depends(get_db)) -> schemas.EventOut:
+def create_event_endpoint(event: schemas.EventBase, background_tasks: BackgroundTasks, db: Session = Depends(get_db)) -> schemas.EventOut:
     """Create a new event and return it.
 
     The creator ID is ignored in this version, so the event is
     created anonymously. In a real system, the authenticated user ID
-    would be stored separately.
+    would be stored separately. The ML service catalog receives the new
+    event as a delta once the response is sent.
     """
-    return crud.create_event(db, event)
+    created = crud.create_event(db, event)
+    background_tasks.add_task(catalog_sync.push_delta, upsert=[ml_event(created)])
+    return created
 
 
 @router.post("/{event_id}/signup", status_code=status.HTTP_200_OK)
-def signup_event(event_id: int, payload: UserEventPayload, db: Session = Depends(get_db)) -> dict[str, bool]:
+def signup_event(event_id: int, payload: UserEventPayload, background_tasks: BackgroundTasks, db: Session = Depends(get_db)) -> dict[str, bool]:
     """Sign up a user for an event.
 
     Returns a JSON object indicating whether a new sign‑up was recorded.
+    The ML service's running statistics are updated once the response is sent.
     """
     success = crud.signup_for_event(db, event_id=event_id, user_id=payload.user_id)
+    if success:
+        _schedule_feedback(background_tasks, db, payload.user_id, event_id)
     return {"success": success}
 
 
 @router.post("/{event_id}/unsubscribe", status_code=status.HTTP_200_OK)
-def unsubscribe_event(event_id: int, payload: UserEventPayload, db: Session = Depends(get_db)) -> dict[str, bool]:
+def unsubscribe_event(event_id: int, payload: UserEventPayload, background_tasks: BackgroundTasks, db: Session = Depends(get_db)) -> dict[str, bool]:
     """Remove a user's sign‑up for an event.
 
     Returns a JSON object indicating whether a sign‑up was removed.
     """
     success = crud.unsubscribe_event(db, event_id=event_id, user_id=payload.user_id)
+    if success:
+        _schedule_feedback(background_tasks, db, payload.user_id, event_id)
     return {"success": success}
 
 
+def _schedule_feedback(background_tasks: BackgroundTasks, db: Session, user_id: int, event_id: int) -> None:
+    """Send the user's current visit of the event to the ML service after the response."""
+    signed_up, review_rating = recommendation_crud.get_user_event_visit(db, user_id=user_id, event_id=event_id)
+    background_tasks.add_task(send_feedback, visit_feedback(user_id, event_id, signed_up, review_rating))
+
+
 @router.put("/{event_id}", response_model=schemas.EventOut)
-def update_event_endpoint(event_id: int, payload: schemas.EventUpdate, user_id: int | None = None, db: Session = Depends(get_db)) -> schemas.EventOut:
+def update_event_endpoint(event_id: int, payload: schemas.EventUpdate, background_tasks: BackgroundTasks, user_id: int | None = None, db: Session = Depends(get_db)) -> schemas.EventOut:
     """Update an existing event.
 
     Accepts partial fields via EventUpdate and returns the updated event.
@@ -76,6 +92,7 @@ def update_event_endpoint(event_id: int, payload: schemas.EventUpdate, user_id:
     if updated is None:
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Event not found")
+    background_tasks.add_task(catalog_sync.push_delta, upsert=[ml_event(updated)])
     
     # Annotate with sign-up info for the given user, if provided
     signup_count = db.query(func.count(models.EventSignup.id)).filter(models.EventSignup.event_id == event_id).scalar()
@@ -1,100 +1,110 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 import httpx
 from typing import List, Dict, Optional
 
 from ..crud import user as user_crud
 from ..crud import event as event_crud
-from .. import schemas
+from ..crud import recommendation as recommendation_crud
+from .. import models, schemas
+from ..core.ml_client import (
+    ML_REQUEST_DEADLINE_MS,
+    ML_SERVICE_URL,
+    catalog_sync,
+    decode_response,
+    history_fingerprint,
+    ml_event,
+    ml_user_profile,
+    msgpack_body,
+    skill_ids,
+)
 from .deps import get_db
 
 router = APIRouter(prefix="/recommendations", tags=["recommendations"])
 
-ML_SERVICE_URL = "http://ml_service:8000"
+
+@router.get("/training-data")
+def get_training_data(db: Session = Depends(get_db)) -> Dict:
+    """Export every user's sign-ups and reviews for offline model training.
+
+    Reviews provide the rating; sign-ups without a review are treated as
+    attended with DEFAULT_SIGNUP_RATING, mirroring the online request.
+    """
+    events = db.query(models.Event).all()
+    users = db.query(models.User).options(
+        joinedload(models.User.university),
+        joinedload(models.User.event_signups),
+        joinedload(models.User.event_reviews),
+    ).all()
+
+    ml_users = [ml_user_profile(user) for user in users]
+    return {"users": ml_users, "events": [ml_event(event) for event in events]}
 
 @router.get("/{user_id}", response_model=List[schemas.EventOut])
 async def get_recommendations(user_id: int, db: Session = Depends(get_db)):
-    # 1. Fetch user profile from local DB
-    user_profile_db = user_crud.get_profile(db, user_id=user_id)
-    if not user_profile_db:
+    """Serve the user's precomputed recommendations.
+
+    Rows written by the nightly batch job (app/jobs/precompute_recommendations.py)
+    are returned as long as the user's sign-ups and reviews have not changed
+    since. Otherwise the recommendations are computed by the ML service now
+    and stored for the next request.
+    """
+    # 1. Fetch user with sign-ups and reviews from local DB
+    user_db = user_crud.get_user_with_history(db, user_id=user_id)
+    if not user_db:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
+    # Map our DB schema to the ML service's UserProfile.
+    ml_user_profile_payload = ml_user_profile(user_db)
+    fingerprint = history_fingerprint(ml_user_profile_payload)
+
+    precomputed = recommendation_crud.get_user_recommendations(db, user_id)
+    if precomputed and precomputed[0][0].history_fingerprint == fingerprint:
+        return [event_out for _, event_out in precomputed]
+
+    # History changed since the last batch run (or the user is new): refresh on demand.
     # 2. Fetch all events from local DB
     all_events_db = event_crud.get_events(db, user_id=user_id) # Pass user_id to get signed_up status
 
-    # 3. Fetch universities data from ML service
-    try:
-        universities_response = await httpx.AsyncClient().get(f"{ML_SERVICE_URL}/universities")
-        universities_response.raise_for_status()
-        universities_data = universities_response.json().get("universities", {})
-    except httpx.HTTPStatusError as e:
-        raise HTTPException(status_code=e.response.status_code, detail=f"ML service error fetching universities: {e.response.text}")
-    except httpx.RequestError as e:
-        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Could not connect to ML service for universities: {e}")
-
-    # 4. Prepare UserProfile for ML service
-    # Note: The ML service's UserProfile expects 'interesting_skills' as List[str]
-    # and 'visited_events' as List[EventAttendance>.
-    # We need to map our DB schema to the ML service's schema.
-
-    # Using a static set of skills for all users as a "hacky" method to ensure recommendations are generated
-    ml_user_skills = ["Python", "JavaScript", "Data Science", "Machine Learning", "FastAPI", "React"]
-    
-    # Assuming user_profile_db.event_signups contains event attendance info
-    ml_visited_events = []
-    for signup in user_profile_db.event_signups:
-        # We need to know if the user actually attended and rated the event.
-        # The current schema only has signup. For a real system, we'd need
-        # a separate 'attendance' and 'rating' mechanism in the backend DB.
-        # For now, we'll simulate attendance and rating for signed-up events.
-        # This is a simplification for demonstration purposes.
-        ml_visited_events.append({
-            "event_id": signup.event_id,
-            "attended": True, # Assuming signed-up means attended for ML model
-            "rating": 4 # Default rating for ML model
-        })
-    
-    ml_user_profile = {
-        "user_id": user_profile_db.id,
-        "interesting_skills": list(set(ml_user_skills)), # Remove duplicates
-        "education_place": user_profile_db.university.name if user_profile_db.university else None,
-        "visited_events": ml_visited_events
-    }
-
-    # 5. Prepare Events for ML service
-    ml_events = []
-    for event_db in all_events_db:
-        ml_events.append({
-            "event_id": event_db.id,
-            "title": event_db.title,
-            "organizer": event_db.organizer,
-            "recommended_skills": event_db.recommended_skills.split(",") if event_db.recommended_skills else [],
-            "datetime": event_db.event_time.isoformat(),
-            "duration_minutes": event_db.duration_hours * 60, # Convert hours to minutes
-            "location": event_db.auditorium if event_db.auditorium else "Онлайн",
-            "max_participants": event_db.max_participants,
-            "category": event_db.category,
-            "уровень": event_db.уровень
-        })
-
-    # 6. Construct RecommendationRequest payload
+    # 3. Construct RecommendationRequest payload. Events are not sent: the ML
+    # service keeps its own catalog, which we reference by version. Universities
+    # are not sent either: the ML service falls back to its own TARGET_UNIVERSITIES.
     recommendation_request_payload = {
-        "user_profile": ml_user_profile,
-        "events": ml_events,
-        "universities": universities_data,
+        "user_profile": ml_user_profile_payload,
+        "catalog_version": None,
         "n_recommendations": 10 # Or a dynamic number
     }
 
-    # 7. Call ML service for recommendations
+    # 4-5. Make sure the ML catalog is in sync and call ML service for recommendations
     ml_recommendations = []
     try:
-        ml_response = await httpx.AsyncClient().post(
-            f"{ML_SERVICE_URL}/recommend-events",
-            json=recommendation_request_payload,
-            timeout=30.0 # Increased timeout for ML processing
-        )
+        async with httpx.AsyncClient() as client:
+            await skill_ids.load(client)
+            ml_user_profile_payload["interesting_skills"] = skill_ids.encode(ml_user_profile_payload["interesting_skills"])
+            recommendation_request_payload["catalog_version"] = await catalog_sync.ensure(client, all_events_db)
+            ml_response = await client.post(
+                f"{ML_SERVICE_URL}/recommend-events",
+                **msgpack_body(recommendation_request_payload, ML_REQUEST_DEADLINE_MS),
+                timeout=30.0 # Increased timeout for ML processing
+            )
+            if ml_response.status_code == status.HTTP_409_CONFLICT:
+                # Catalog changed on the ML side (restart or another worker); resync and retry once.
+                recommendation_request_payload["catalog_version"] = await catalog_sync.push_full(client, all_events_db)
+                ml_response = await client.post(
+                    f"{ML_SERVICE_URL}/recommend-events",
+                    **msgpack_body(recommendation_request_payload, ML_REQUEST_DEADLINE_MS),
+                    timeout=30.0
+                )
         ml_response.raise_for_status()
-        ml_recommendations = ml_response.json().get("recommendations", [])
+        # (event_id, interest_probability) pairs, best first.
+        ml_body = decode_response(ml_response)
+        ml_recommendations = ml_body.get("recommendations", [])
+        # Results from a degraded path (cached model or heuristic, picked to meet the
+        # deadline) are served but not stored, so the next request tries the full model.
+        if ml_recommendations and ml_body.get("path") == "full":
+            recommendation_crud.replace_user_recommendations(
+                db, user_id, ml_recommendations, ml_body.get("model_version"), fingerprint
+            )
     except (httpx.HTTPStatusError, httpx.RequestError) as e:
         print(f"Warning: ML service call failed or returned error: {e}. Using fallback recommendations.")
         # Fallback: Log the error and proceed to use fallback recommendations
@@ -124,18 +134,15 @@ async def get_recommendations(user_id: int, db: Session = Depends(get_db)):
             fallback_event_ids = existing_event_ids[:num_fallback]
         
         # Construct mock ml_recommendations for the fallback
-        ml_recommendations = [{"event_id": eid, "interest_probability": 0.5} for eid in fallback_event_ids]
+        ml_recommendations = [(eid, 0.5) for eid in fallback_event_ids]
 
 
-    # 8. Map ML recommendations back to our EventOut schema
-    # The ML service returns events with an added 'interest_probability'.
-    # We need to find the original event objects to return them in our schema.
-    recommended_event_ids = {rec["event_id"] for rec in ml_recommendations}
+    # 6. Map ML recommendations back to our EventOut schema
+    # The ML service returns only event ids with scores, best first; keep that
+    # order so the response matches what precomputed rows return.
+    events_by_id = {event_db.id: event_db for event_db in all_events_db}
     final_recommendations = [
-        event_db for event_db in all_events_db if event_db.id in recommended_event_ids
+        events_by_id[event_id] for event_id, _ in ml_recommendations if event_id in events_by_id
     ]
-    
-    # Optionally, sort by interest_probability if needed, but the ML service already sorts
-    # For now, we just return the original event objects that were recommended.
-    
+
     return final_recommendations
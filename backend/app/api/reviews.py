@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 
 from .. import schemas, crud, models
 from ..api import deps
+from ..core.ml_client import send_feedback, visit_feedback
 
 router = APIRouter()
 
@@ -11,6 +12,7 @@ router = APIRouter()
 def create_event_review(
     event_id: int,
     review_create: schemas.EventReviewCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(deps.get_db)
 ):
     event = crud.event.get_event(db, event_id=event_id)
@@ -22,6 +24,8 @@ def create_event_review(
         raise HTTPException(status_code=404, detail="User not found")
 
     db_review = crud.review.create_event_review(db, review=review_create)
+    signed_up, review_rating = crud.recommendation.get_user_event_visit(db, user_id=user.id, event_id=db_review.event_id)
+    background_tasks.add_task(send_feedback, visit_feedback(user.id, db_review.event_id, signed_up, review_rating))
     
     # Populate user_name for the response
     review_out = schemas.ReviewOut.model_validate(db_review)
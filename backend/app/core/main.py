@@ -85,6 +85,7 @@ app.include_router(university_router)
 app.include_router(profile_router)
 app.include_router(reviews_router)
 app.include_router(auth_router)
+app.include_router(recommendations_router)
 
 
 @app.get("/", tags=["root"])
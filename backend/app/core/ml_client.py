@@ -0,0 +1,223 @@
+"""Helpers for talking to the ML recommendation service.
+
+The ML service keeps its own in-memory copy of the event catalog. This
+module maps DB events to the ML schema and keeps that copy in sync: the
+full catalog is pushed with `PUT /catalog` when the service's version is
+unknown or stale, and individual event changes are sent as `PATCH
+/catalog` deltas. Recommendation requests then only carry the catalog
+version the service last acknowledged.
+
+Requests are sent as msgpack with skills encoded as the ML service's skill
+ids (positions in its `/skills` list). Recommendation replies then come
+back as compact `(event_id, interest_probability)` pairs.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+import msgpack
+
+logger = logging.getLogger(__name__)
+
+ML_SERVICE_URL = os.environ.get("ML_SERVICE_URL", "http://ml_service:8000")
+# Time budget for on-demand recommendations. The ML service degrades to a cached
+# or heuristic model rather than run past it.
+ML_REQUEST_DEADLINE_MS = int(os.environ.get("ML_REQUEST_DEADLINE_MS", "1000"))
+
+# Using a static set of skills for all users as a "hacky" method to ensure recommendations are generated
+ML_USER_SKILLS = ["Python", "JavaScript", "Data Science", "Machine Learning", "FastAPI", "React"]
+
+# Rating assumed for a sign-up that has no review yet.
+DEFAULT_SIGNUP_RATING = 4
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+
+def msgpack_body(payload: Dict, deadline_ms: Optional[int] = None) -> Dict:
+    """httpx request kwargs that send `payload` as msgpack and ask for a msgpack reply.
+
+    With `deadline_ms` the ML service is told how long the caller will wait.
+    """
+    headers = {"Content-Type": MSGPACK_MEDIA_TYPE, "Accept": MSGPACK_MEDIA_TYPE}
+    if deadline_ms is not None:
+        headers["X-Request-Deadline-Ms"] = str(deadline_ms)
+    return {"content": msgpack.packb(payload, use_bin_type=True), "headers": headers}
+
+
+def decode_response(response: httpx.Response):
+    """Decode an ML service reply, whichever format it came back in."""
+    if response.headers.get("content-type", "").startswith(MSGPACK_MEDIA_TYPE):
+        return msgpack.unpackb(response.content, raw=False, strict_map_key=False)
+    return response.json()
+
+
+def ml_event(event) -> Dict:
+    """Map a DB event (ORM row or EventOut) to the ML service's Event schema."""
+    skills = event.recommended_skills
+    if isinstance(skills, str):
+        skills = skills.split(",") if skills else []
+    return {
+        "event_id": event.id,
+        "title": event.title,
+        "organizer": event.organizer,
+        "recommended_skills": skills or [],
+        "datetime": event.event_time.isoformat(),
+        "duration_minutes": event.duration_hours * 60, # Convert hours to minutes
+        "location": event.auditorium if event.auditorium else "Онлайн",
+        "max_participants": event.max_participants,
+        "category": event.category,
+        "уровень": event.уровень,
+        "description": event.description,
+    }
+
+
+def ml_user_profile(user) -> Dict:
+    """Map a User row (with university, event_signups and event_reviews loaded) to the ML UserProfile.
+
+    Reviews provide the rating; sign-ups without a review are treated as
+    attended with DEFAULT_SIGNUP_RATING.
+    """
+    visits = {signup.event_id: DEFAULT_SIGNUP_RATING for signup in user.event_signups}
+    for review in user.event_reviews:
+        visits[review.event_id] = review.rating
+    return {
+        "user_id": user.id,
+        "interesting_skills": ML_USER_SKILLS,
+        "education_place": user.university.name if user.university else None,
+        "visited_events": [
+            {"event_id": event_id, "attended": True, "rating": rating}
+            for event_id, rating in sorted(visits.items())
+        ],
+    }
+
+
+def history_fingerprint(profile: Dict) -> str:
+    """Stable hash of everything in an ML user profile that affects its recommendations."""
+    key = json.dumps(
+        [profile["interesting_skills"], profile["education_place"], profile["visited_events"]],
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+class MLSkillIds:
+    """Maps skill names to the ML service's skill ids.
+
+    The id list is fetched once from `/skills`. Skills the service does not
+    know are sent as names, so the service still reports them as invalid.
+    """
+
+    def __init__(self) -> None:
+        self._ids: Optional[Dict[str, int]] = None
+
+    async def load(self, client: httpx.AsyncClient) -> None:
+        if self._ids is not None:
+            return
+        response = await client.get(f"{ML_SERVICE_URL}/skills")
+        response.raise_for_status()
+        self._ids = {skill: skill_id for skill_id, skill in enumerate(response.json()["skills"])}
+
+    def encode(self, skills: Iterable[str]) -> List:
+        ids = self._ids or {}
+        return [ids.get(skill, skill) for skill in skills]
+
+    def encode_event(self, event: Dict) -> Dict:
+        return {**event, "recommended_skills": self.encode(event["recommended_skills"])}
+
+
+skill_ids = MLSkillIds()
+
+
+class MLCatalogSync:
+    """Tracks the catalog version acknowledged by the ML service.
+
+    `version` is None until the first full push, and is reset to None
+    whenever a delta is rejected, so the next recommendation request
+    re-pushes the full catalog from the database.
+    """
+
+    def __init__(self) -> None:
+        self.version: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    async def ensure(self, client: httpx.AsyncClient, events: Iterable) -> int:
+        """Return a catalog version the ML service has, pushing the catalog if needed."""
+        if self.version is None:
+            return await self.push_full(client, events)
+        return self.version
+
+    async def push_full(self, client: httpx.AsyncClient, events: Iterable) -> int:
+        """Replace the ML service's catalog with `events`."""
+        async with self._lock:
+            await skill_ids.load(client)
+            response = await client.put(
+                f"{ML_SERVICE_URL}/catalog",
+                **msgpack_body({"events": [skill_ids.encode_event(ml_event(event)) for event in events]}),
+                timeout=30.0,
+            )
+            response.raise_for_status()
+            self.version = decode_response(response)["version"]
+            return self.version
+
+    async def push_delta(self, upsert: Iterable[Dict] = (), remove: Iterable[int] = ()) -> None:
+        """Send changed events to the ML service.
+
+        Meant to run as a background task after an event is created or
+        updated; `upsert` holds events already mapped with `ml_event`.
+        """
+        if self.version is None:
+            # Nothing has been pushed yet; the next request sends the full catalog.
+            return
+        async with self._lock:
+            try:
+                async with httpx.AsyncClient() as client:
+                    await skill_ids.load(client)
+                    response = await client.patch(
+                        f"{ML_SERVICE_URL}/catalog",
+                        **msgpack_body({
+                            "base_version": self.version,
+                            "upsert": [skill_ids.encode_event(event) for event in upsert],
+                            "remove": list(remove),
+                        }),
+                        timeout=10.0,
+                    )
+                response.raise_for_status()
+                self.version = decode_response(response)["version"]
+            except (httpx.HTTPStatusError, httpx.RequestError) as e:
+                logger.warning("ML catalog delta failed, will resync on next request: %s", e)
+                self.version = None
+
+
+catalog_sync = MLCatalogSync()
+
+
+def visit_feedback(user_id: int, event_id: int, signed_up: bool, review_rating: Optional[int]) -> Dict:
+    """Map a user's current sign-up and review for one event to an ML `/feedback` body.
+
+    Uses the same rules as `ml_user_profile`, so the ML service's running
+    statistics stay equal to what it would compute from the full history.
+    """
+    if review_rating is not None:
+        return {"user_id": user_id, "event_id": event_id, "attended": True, "rating": review_rating}
+    if signed_up:
+        return {"user_id": user_id, "event_id": event_id, "attended": True, "rating": DEFAULT_SIGNUP_RATING}
+    return {"user_id": user_id, "event_id": event_id, "removed": True}
+
+
+async def send_feedback(feedback: Dict) -> None:
+    """Report a changed visit to the ML service's incremental statistics.
+
+    Meant to run as a background task after a sign-up, unsubscribe or
+    review. Failures are only logged: the ML service rebuilds a user's
+    statistics from the full history whenever they fall out of date.
+    """
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(f"{ML_SERVICE_URL}/feedback", **msgpack_body(feedback), timeout=5.0)
+        response.raise_for_status()
+    except (httpx.HTTPStatusError, httpx.RequestError) as e:
+        logger.warning("ML feedback failed: %s", e)
@@ -2,4 +2,5 @@ from . import event
 from . import schedule
 from . import university
 from . import user
-from . import review
\ No newline at end of file
+from . import review
+from . import recommendation
\ No newline at end of file
@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+
+
+def get_user_recommendations(db: Session, user_id: int) -> List[Tuple[models.UserRecommendation, schemas.EventOut]]:
+    """Return a user's precomputed recommendations, best first, in a single query.
+
+    Sign-up counts and the user's own sign-up flag are joined in as
+    subqueries, so no per-event queries follow.
+    """
+    signup_counts = (
+        db.query(models.EventSignup.event_id, func.count(models.EventSignup.id).label("signup_count"))
+        .group_by(models.EventSignup.event_id)
+        .subquery()
+    )
+    user_signups = (
+        db.query(models.EventSignup.event_id)
+        .filter(models.EventSignup.user_id == user_id)
+        .distinct()
+        .subquery()
+    )
+    rows = (
+        db.query(
+            models.UserRecommendation,
+            models.Event,
+            func.coalesce(signup_counts.c.signup_count, 0),
+            user_signups.c.event_id.isnot(None),
+        )
+        .join(models.Event, models.Event.id == models.UserRecommendation.event_id)
+        .outerjoin(signup_counts, signup_counts.c.event_id == models.Event.id)
+        .outerjoin(user_signups, user_signups.c.event_id == models.Event.id)
+        .filter(models.UserRecommendation.user_id == user_id)
+        .order_by(models.UserRecommendation.rank)
+        .all()
+    )
+
+    result = []
+    for recommendation, event, signup_count, signed_up in rows:
+        event_dict = event.__dict__.copy()
+        event_dict["recommended_skills"] = event.recommended_skills.split(",") if event.recommended_skills else []
+        event_out = schemas.EventOut.model_validate(event_dict)
+        event_out = event_out.model_copy(update={"signup_count": signup_count, "signed_up": bool(signed_up)})
+        result.append((recommendation, event_out))
+    return result
+
+
+def replace_user_recommendations(
+    db: Session,
+    user_id: int,
+    recommendations: Iterable[Tuple[int, float]],
+    model_version: Optional[str],
+    history_fingerprint: str,
+    computed_at: Optional[datetime] = None,
+    commit: bool = True,
+) -> None:
+    """Replace a user's stored recommendations with (event_id, score) pairs in rank order."""
+    computed_at = computed_at or datetime.now(timezone.utc)
+    # "evaluate" also drops the old rows from the session, so reused ids do not clash.
+    db.query(models.UserRecommendation).filter(models.UserRecommendation.user_id == user_id).delete(
+        synchronize_session="evaluate"
+    )
+    db.add_all(
+        models.UserRecommendation(
+            user_id=user_id,
+            event_id=event_id,
+            rank=rank,
+            score=score,
+            model_version=model_version,
+            history_fingerprint=history_fingerprint,
+            computed_at=computed_at,
+        )
+        for rank, (event_id, score) in enumerate(recommendations)
+    )
+    if commit:
+        db.commit()
+
+
+def get_user_event_visit(db: Session, user_id: int, event_id: int) -> Tuple[bool, Optional[int]]:
+    """Return whether the user is signed up for the event and their latest review rating, if any."""
+    signed_up = (
+        db.query(models.EventSignup.id)
+        .filter(models.EventSignup.user_id == user_id, models.EventSignup.event_id == event_id)
+        .first()
+        is not None
+    )
+    review = (
+        db.query(models.EventReview.rating)
+        .filter(models.EventReview.user_id == user_id, models.EventReview.event_id == event_id)
+        .order_by(models.EventReview.id.desc())
+        .first()
+    )
+    return signed_up, review.rating if review else None
@@ -6,6 +6,14 @@ def get_user(db: Session, user_id: int) -> Optional[models.User]:
     """Retrieve a user by ID."""
     return db.query(models.User).filter(models.User.id == user_id).first()
 
+def get_user_with_history(db: Session, user_id: int) -> Optional[models.User]:
+    """Retrieve a user with their university, event sign-ups and event reviews loaded."""
+    return db.query(models.User).options(
+        joinedload(models.User.university),
+        joinedload(models.User.event_signups),
+        joinedload(models.User.event_reviews),
+    ).filter(models.User.id == user_id).first()
+
 def get_profile(db: Session, user_id: int) -> Optional[schemas.ProfileOut]:
     """Retrieve a user's profile by ID."""
     user = db.query(models.User).options(
@@ -0,0 +1 @@
+"""Offline batch jobs run outside the API process (e.g. from cron)."""
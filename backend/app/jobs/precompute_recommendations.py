@@ -0,0 +1,158 @@
+"""Nightly batch job that precomputes recommendations for every user.
+
+Run it from the backend container, e.g. from a nightly cron entry:
+
+    python -m app.jobs.precompute_recommendations --workers 4 --chunk-size 200
+
+The parent process pushes the event catalog to the ML service once. Worker processes then each take a chunk of
+user ids. A worker loads the chunk's sign-ups and reviews, asks
+`/recommend-events/batch` for the top N events per user, and replaces those
+users' rows in `user_recommendations`. `/recommendations/{user_id}` serves
+these rows until the user's history changes.
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import httpx
+from sqlalchemy.orm import joinedload
+
+from app import models
+from app.core.ml_client import (
+    ML_SERVICE_URL,
+    catalog_sync,
+    decode_response,
+    history_fingerprint,
+    ml_user_profile,
+    msgpack_body,
+    skill_ids,
+)
+from app.crud import recommendation as recommendation_crud
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Attempts per chunk when the ML service answers 503 (executor saturated) or 409 (catalog changed).
+MAX_ATTEMPTS = 3
+
+
+async def prepare_context() -> Dict:
+    """Push the catalog to the ML service; returns what every chunk request shares."""
+    db = SessionLocal()
+    try:
+        events = db.query(models.Event).all()
+        async with httpx.AsyncClient() as client:
+            catalog_version = await catalog_sync.push_full(client, events)
+        return {"catalog_version": catalog_version}
+    finally:
+        db.close()
+
+
+async def process_chunk(user_ids: List[int], context: Dict, top_n: int) -> int:
+    """Compute and store recommendations for one chunk of users; returns how many were stored."""
+    db = SessionLocal()
+    try:
+        users = db.query(models.User).options(
+            joinedload(models.User.university),
+            joinedload(models.User.event_signups),
+            joinedload(models.User.event_reviews),
+        ).filter(models.User.id.in_(user_ids)).all()
+        profiles = {user.id: ml_user_profile(user) for user in users}
+        if not profiles:
+            return 0
+
+        async with httpx.AsyncClient() as client:
+            await skill_ids.load(client)
+            payload = {
+                "user_profiles": [
+                    {**profile, "interesting_skills": skill_ids.encode(profile["interesting_skills"])}
+                    for profile in profiles.values()
+                ],
+                "catalog_version": context["catalog_version"],
+                "n_recommendations": top_n,
+            }
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                response = await client.post(
+                    f"{ML_SERVICE_URL}/recommend-events/batch", **msgpack_body(payload), timeout=300.0
+                )
+                if response.status_code not in (409, 503) or attempt == MAX_ATTEMPTS:
+                    break
+                if response.status_code == 409:
+                    # The catalog was pushed again during the run (an event edit, or the API server
+                    # resyncing after its own 409). Both push the database's events, so the job
+                    # continues on the current version.
+                    payload["catalog_version"] = decode_response(response)["detail"]["catalog_version"]
+                else:
+                    await asyncio.sleep(float(response.headers.get("Retry-After", 1)) * attempt)
+            response.raise_for_status()
+
+        body = decode_response(response)
+        computed_at = datetime.now(timezone.utc)
+        stored = 0
+        for result in body["results"]:
+            # Users answered by a degraded path (cached model or heuristic) or with an error
+            # keep their previous rows; requests refresh them on demand.
+            if result.get("path") != "full":
+                continue
+            recommendation_crud.replace_user_recommendations(
+                db,
+                result["user_id"],
+                result["recommendations"],
+                body.get("model_version"),
+                history_fingerprint(profiles[result["user_id"]]),
+                computed_at,
+                commit=False,
+            )
+            stored += 1
+        db.commit()
+        return stored
+    finally:
+        db.close()
+
+
+def _run_chunk(args) -> int:
+    user_ids, context, top_n = args
+    try:
+        return asyncio.run(process_chunk(user_ids, context, top_n))
+    except (httpx.HTTPStatusError, httpx.RequestError) as e:
+        # Users in a failed chunk keep yesterday's rows; requests refresh them on demand.
+        logger.error("Chunk of %d users starting at %d failed: %s", len(user_ids), user_ids[0], e)
+        return 0
+
+
+def run(workers: int, chunk_size: int, top_n: int) -> int:
+    db = SessionLocal()
+    try:
+        user_ids = [user_id for (user_id,) in db.query(models.User.id).order_by(models.User.id)]
+    finally:
+        db.close()
+    context = asyncio.run(prepare_context())
+
+    chunks = [(user_ids[i:i + chunk_size], context, top_n) for i in range(0, len(user_ids), chunk_size)]
+    stored = 0
+    # Spawned workers open their own database connections instead of inheriting the parent's pool.
+    with multiprocessing.get_context("spawn").Pool(processes=workers) as pool:
+        for done, count in enumerate(pool.imap_unordered(_run_chunk, chunks), start=1):
+            stored += count
+            logger.info("Chunk %d/%d done, %d users stored so far", done, len(chunks), stored)
+    return stored
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Precompute event recommendations for all users")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--top-n", type=int, default=10)
+    args = parser.parse_args()
+
+    stored = run(args.workers, args.chunk_size, args.top_n)
+    logger.info("Stored recommendations for %d users", stored)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ These models map to database tables and capture the core domain:
 * ScheduleItem – a single lesson or activity that appears in the schedule.
 * Event – a non‑academic event such as hackathons or seminars.
 * SignUp – a join table linking users to schedule items they have registered for.
+* UserRecommendation – a precomputed recommendation of an event for a user.
 
 All date/time fields use timezone‑aware UTC datetime values. When serializing
 these values to JSON they will be ISO‑8601 strings.
@@ -17,7 +18,7 @@ these values to JSON they will be ISO‑8601 strings.
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import Column, DateTime, Integer, String, ForeignKey, Enum as PgEnum
+from sqlalchemy import Column, DateTime, Float, Index, Integer, String, ForeignKey, Enum as PgEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -230,3 +231,26 @@ class CourseReview(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User", back_populates="course_reviews")
+
+
+class UserRecommendation(Base):
+    """Event recommended to a user by the nightly batch job.
+
+    Each row is one (user, event) pair ranked by the ML service. The history
+    fingerprint identifies the sign-ups and reviews the ranking was computed
+    from, so a request can tell whether the user's history changed since.
+    """
+
+    __tablename__ = "user_recommendations"
+    __table_args__ = (Index("ix_user_recommendations_user_rank", "user_id", "rank"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
+    rank = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+    model_version = Column(String, nullable=True)
+    history_fingerprint = Column(String, nullable=False)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    event = relationship("Event")
@@ -0,0 +1,158 @@
+"""Tests for on-demand and precomputed recommendations.
+
+The ML service is replaced by an httpx MockTransport, and the database is an
+in-memory SQLite shared by all sessions of a test.
+"""
+
+import asyncio
+import os
+
+import msgpack
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.api import recommendations
+from app.core import ml_client
+from app.crud import recommendation as recommendation_crud
+from app.db.session import Base
+from app.jobs import precompute_recommendations
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    session.add(models.User(id=1, first_name="Test"))
+    for event_id in (1, 2, 3):
+        session.add(models.Event(
+            id=event_id,
+            event_time=datetime.utcnow() + timedelta(days=event_id),
+            title=f"Event {event_id}",
+            description="Test description",
+        ))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def ml_service(monkeypatch):
+    """Fake ML service; tests set `reply["path"]` to the path it reports, `reply["batch"]` to batch
+    results and `reply["catalog_version"]` to the catalog version batch requests must reference."""
+    reply = {"path": "full", "batch": [], "catalog_version": 1, "requests": 0}
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/skills":
+            return httpx.Response(200, json={"skills": ml_client.ML_USER_SKILLS})
+        if request.url.path == "/catalog":
+            return httpx.Response(200, json={"version": 1})
+        reply["requests"] += 1
+        if request.url.path == "/recommend-events/batch":
+            version = msgpack.unpackb(request.content)["catalog_version"]
+            if version != reply["catalog_version"]:
+                return httpx.Response(409, json={"detail": {
+                    "msg": "Catalog version does not match", "catalog_version": reply["catalog_version"],
+                }})
+            return httpx.Response(200, json={"model_version": "test", "results": reply["batch"]})
+        return httpx.Response(200, json={
+            "model_version": "test",
+            "path": reply["path"],
+            "recommendations": [[2, 0.9], [3, 0.8]],
+        })
+
+    real_client = httpx.AsyncClient
+    transport = httpx.MockTransport(handle)
+    monkeypatch.setattr(httpx, "AsyncClient", lambda *args, **kwargs: real_client(*args, transport=transport, **kwargs))
+    monkeypatch.setattr(ml_client.catalog_sync, "version", None)
+    monkeypatch.setattr(ml_client.skill_ids, "_ids", None)
+    return reply
+
+
+def test_full_path_results_are_stored(db, ml_service):
+    served = asyncio.run(recommendations.get_recommendations(1, db=db))
+
+    assert [event.id for event in served] == [2, 3]
+    stored = recommendation_crud.get_user_recommendations(db, 1)
+    assert [event_out.id for _, event_out in stored] == [2, 3]
+
+    # Unchanged history: the stored rows are served without calling the ML service.
+    asyncio.run(recommendations.get_recommendations(1, db=db))
+    assert ml_service["requests"] == 1
+
+
+@pytest.mark.parametrize("path", ["cached", "heuristic"])
+def test_degraded_results_are_served_but_not_stored(db, ml_service, path):
+    ml_service["path"] = path
+
+    served = asyncio.run(recommendations.get_recommendations(1, db=db))
+
+    assert [event.id for event in served] == [2, 3]
+    assert recommendation_crud.get_user_recommendations(db, 1) == []
+
+
+def test_replacing_recommendations_drops_old_rows_and_keeps_rank_order(db):
+    recommendation_crud.replace_user_recommendations(db, 1, [(1, 0.9), (2, 0.5)], "v1", "old")
+    recommendation_crud.replace_user_recommendations(db, 1, [(3, 0.7), (1, 0.6)], "v2", "new")
+
+    stored = recommendation_crud.get_user_recommendations(db, 1)
+    assert [(row.rank, event_out.id) for row, event_out in stored] == [(0, 3), (1, 1)]
+    assert {(row.model_version, row.history_fingerprint) for row, _ in stored} == {("v2", "new")}
+    assert db.query(models.UserRecommendation).count() == 2
+
+
+def test_changed_history_invalidates_stored_rows(db, ml_service):
+    asyncio.run(recommendations.get_recommendations(1, db=db))
+    db.add(models.EventSignup(user_id=1, event_id=1))
+    db.commit()
+
+    asyncio.run(recommendations.get_recommendations(1, db=db))
+    assert ml_service["requests"] == 2
+    # The refreshed rows carry the new fingerprint, so the next request is served from them.
+    asyncio.run(recommendations.get_recommendations(1, db=db))
+    assert ml_service["requests"] == 2
+
+
+def test_batch_job_stores_only_full_path_results(db, ml_service, monkeypatch):
+    db.add_all([models.User(id=2, first_name="Second"), models.User(id=3, first_name="Third")])
+    db.commit()
+    recommendation_crud.replace_user_recommendations(db, 2, [(1, 0.4)], "old", "old")
+    ml_service["batch"] = [
+        {"user_id": 1, "path": "full", "recommendations": [[3, 0.9], [1, 0.2]]},
+        {"user_id": 2, "path": "heuristic", "recommendations": [[2, 0.5]]},
+        {"user_id": 3, "path": None, "recommendations": [], "error": "broken profile"},
+    ]
+    monkeypatch.setattr(precompute_recommendations, "SessionLocal", sessionmaker(bind=db.get_bind()))
+
+    stored = asyncio.run(precompute_recommendations.process_chunk([1, 2, 3], {"catalog_version": 1}, 10))
+
+    assert stored == 1
+    assert [event_out.id for _, event_out in recommendation_crud.get_user_recommendations(db, 1)] == [3, 1]
+    # Degraded and failed users keep their previous rows.
+    assert [event_out.id for _, event_out in recommendation_crud.get_user_recommendations(db, 2)] == [1]
+    assert recommendation_crud.get_user_recommendations(db, 3) == []
+
+    # The stored fingerprint matches the history, so the API serves the rows without the ML service.
+    requests = ml_service["requests"]
+    assert [event.id for event in asyncio.run(recommendations.get_recommendations(1, db=db))] == [3, 1]
+    assert ml_service["requests"] == requests
+
+
+def test_batch_job_follows_catalog_pushed_during_the_run(db, ml_service, monkeypatch):
+    ml_service["batch"] = [{"user_id": 1, "path": "full", "recommendations": [[3, 0.9]]}]
+    # Another push (an event edit or the API server resyncing) moved the catalog past the job's version.
+    ml_service["catalog_version"] = 5
+    monkeypatch.setattr(precompute_recommendations, "SessionLocal", sessionmaker(bind=db.get_bind()))
+
+    assert asyncio.run(precompute_recommendations.process_chunk([1], {"catalog_version": 1}, 10)) == 1
+    assert [event_out.id for _, event_out in recommendation_crud.get_user_recommendations(db, 1)] == [3]